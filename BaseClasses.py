@@ -3,23 +3,27 @@ from __future__ import annotations
 import collections
 import functools
 import logging
+import operator
 import random
 import secrets
+import threading
 from argparse import Namespace
 from collections import Counter, deque
 from collections.abc import Collection, MutableSequence
 from enum import IntEnum, IntFlag
-from typing import (AbstractSet, Any, Callable, ClassVar, Dict, Iterable, Iterator, List, Mapping, NamedTuple,
-                    Optional, Protocol, Set, Tuple, Union, TYPE_CHECKING)
+from typing import (AbstractSet, Any, Callable, ClassVar, Dict, FrozenSet, Iterable, Iterator, List, Mapping,
+                    NamedTuple, Optional, Protocol, Set, Tuple, Union, TYPE_CHECKING)
 
 from typing_extensions import NotRequired, TypedDict
 
 import NetUtils
 import Options
 import Utils
+from Validation import ValidationLevel
 
 if TYPE_CHECKING:
     from entrance_rando import ERPlacementState
+    from StageReport import StageReport
     from worlds import AutoWorld
 
 
@@ -65,8 +69,17 @@ class MultiWorld():
     regions: RegionManager
     itempool: List[Item]
     is_race: bool = False
+    validation: ValidationLevel = ValidationLevel.cheap
+    """How thoroughly generation sanity checks are run, see Validation.py"""
+    fill_seed: Optional[int] = None
+    """Seed the random state got reseeded with before plando and fill, set when portfolio generation picked one."""
+    sphere_workers: int = 0
+    """If above 1, the sphere loops check locations on up to this many cores, see ParallelReach.py"""
+    stage_report: Optional[StageReport] = None
+    """If set, the timing and memory of the generation stages get recorded to it, see StageReport.py"""
     precollected_items: Dict[int, List[Item]]
     state: CollectionState
+    sphere_cache: SphereCache
 
     plando_options: PlandoOptions
     early_items: Dict[int, Dict[str, int]]
@@ -156,6 +169,7 @@ class MultiWorld():
         self.customitemarray = []
         self.shuffle_ganon = True
         self.spoiler = Spoiler(self)
+        self.sphere_cache = SphereCache(self)
         self.early_items = {player: {} for player in self.player_ids}
         self.local_early_items = {player: {} for player in self.player_ids}
         self.indirect_connections = {}
@@ -539,6 +553,13 @@ class MultiWorld():
 
         return False
 
+    def _reachable(self, state: CollectionState, locations: Iterable[Location]) -> List[Location]:
+        """The locations state can reach, in iteration order."""
+        if self.sphere_workers > 1:
+            from ParallelReach import reachable_locations
+            return reachable_locations(state, list(locations), self.sphere_workers)
+        return [location for location in locations if location.can_reach(state)]
+
     def has_beaten_game(self, state: CollectionState, player: Optional[int] = None) -> bool:
         if player:
             return self.completion_condition[player](state)
@@ -546,24 +567,18 @@ class MultiWorld():
             return all((self.has_beaten_game(state, p) for p in range(1, self.players + 1)))
 
     def can_beat_game(self, starting_state: Optional[CollectionState] = None) -> bool:
-        if starting_state:
-            if self.has_beaten_game(starting_state):
-                return True
-            state = starting_state.copy()
-        else:
-            state = CollectionState(self)
-            if self.has_beaten_game(state):
-                return True
+        if not starting_state:
+            return self.has_beaten_game(self.sphere_cache.get_progression_spheres().state)
+        if self.has_beaten_game(starting_state):
+            return True
+        state = starting_state.copy()
         prog_locations = {location for location in self.get_locations() if location.item
                           and location.item.advancement and location not in state.locations_checked}
 
         while prog_locations:
-            sphere: Set[Location] = set()
             # build up spheres of collection radius.
             # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
-            for location in prog_locations:
-                if location.can_reach(state):
-                    sphere.add(location)
+            sphere: Set[Location] = set(self._reachable(state, prog_locations))
 
             if not sphere:
                 # ran out of places and did not finish yet, quit
@@ -586,15 +601,29 @@ class MultiWorld():
         locations is followed by an empty set, and then a set of all of the
         unreachable locations.
         """
-        state = CollectionState(self)
+        spheres = self.sphere_cache.get_spheres()
         locations = set(self.get_filled_locations())
-
+        for num, sphere in enumerate(spheres.spheres):
+            placement = [(location, location.item, location.item.classification) for location in sphere]
+            yield set(sphere)
+            locations -= sphere
+            if any(location.item is not item or item.classification != classification
+                   for location, item, classification in placement):
+                # the caller changed the yielded sphere, so continue from there like an uncached sweep would
+                self.sphere_cache.invalidate()
+                state = spheres.get_state_before(self, num)
+                for location in sphere:
+                    if location.item:
+                        state.collect(location.item, True, location)
+                yield from self._sweep_spheres(state, locations)
+                return
+        if spheres.unreachable:
+            yield set()
+            yield set(spheres.unreachable)
+
+    def _sweep_spheres(self, state: CollectionState, locations: Set[Location]) -> Iterator[Set[Location]]:
         while locations:
-            sphere: Set[Location] = set()
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
+            sphere: Set[Location] = set(self._reachable(state, locations))
             yield sphere
             if not sphere:
                 if locations:
@@ -612,41 +641,12 @@ class MultiWorld():
         If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
         and then a set of all of the unreachable locations.
         """
-        state = CollectionState(self)
-        locations: Set[Location] = set()
-        events: Set[Location] = set()
-        for location in self.get_filled_locations():
-            if type(location.item.code) is int:
-                locations.add(location)
-            else:
-                events.add(location)
-
-        while locations:
-            sphere: Set[Location] = set()
-
-            # cull events out
-            done_events: Set[Union[Location, None]] = {None}
-            while done_events:
-                done_events = set()
-                for event in events:
-                    if event.can_reach(state):
-                        state.collect(event.item, True, event)
-                        done_events.add(event)
-                events -= done_events
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+        spheres = self.sphere_cache.get_sendable_spheres()
+        for sphere in spheres.spheres:
+            yield set(sphere)
+        if spheres.unreachable:
+            yield set()
+            yield set(spheres.unreachable)
 
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
         """Check if accessibility rules are fulfilled with current or supplied state."""
@@ -682,10 +682,10 @@ class MultiWorld():
         locations = [location for location in self.get_locations() if location_relevant(location)]
 
         while locations:
-            sphere: List[Location] = []
-            for n in range(len(locations) - 1, -1, -1):
-                if locations[n].can_reach(state):
-                    sphere.append(locations.pop(n))
+            sphere: List[Location] = self._reachable(state, locations)[::-1]
+            if sphere:
+                reached = set(sphere)
+                locations = [location for location in locations if location not in reached]
 
             if not sphere:
                 # ran out of places and did not finish yet, quit
@@ -706,7 +706,399 @@ class MultiWorld():
         return False
 
 
+class Spheres(NamedTuple):
+    spheres: List[Set[Location]]
+    """each logical sphere, all of them non-empty"""
+    state: CollectionState
+    """the state after all spheres got collected, treat as read-only"""
+    unreachable: Set[Location]
+    """filled locations that are not in any sphere"""
+
+    def get_state_before(self, multiworld: MultiWorld, num: int) -> CollectionState:
+        """Returns a new state that collected the items of the spheres before sphere num."""
+        state = CollectionState(multiworld)
+        for sphere in self.spheres[:num]:
+            for location in sphere:
+                state.collect(location.item, True, location)
+        return state
+
+
+class SphereCache:
+    """
+    Computes the sphere decompositions of the current placement once, and shares them between get_spheres,
+    get_sendable_spheres, can_beat_game and Spoiler.create_playthrough.
+    Results are dropped once any item is placed, moved or reclassified, or precollected items change.
+    Changes to rules or entrances are not detected, call invalidate() after making those.
+    Every world step run through call_all invalidates the cache once it finishes.
+    """
+    multiworld: MultiWorld
+    _placement: Optional[Tuple[Tuple[Optional[Item], ...], Tuple[Any, ...], Tuple[Item, ...]]]
+    _spheres: Optional[Spheres]
+    _progression_spheres: Optional[Spheres]
+    _sendable_spheres: Optional[Spheres]
+
+    def __init__(self, multiworld: MultiWorld) -> None:
+        self.multiworld = multiworld
+        self._placement = None
+        self._spheres = None
+        self._progression_spheres = None
+        self._sendable_spheres = None
+        self._lock = threading.RLock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._placement = None
+            self._spheres = None
+            self._progression_spheres = None
+            self._sendable_spheres = None
+
+    def _get_placement(self) -> Tuple[Tuple[Optional[Item], ...], Tuple[Any, ...], Tuple[Item, ...]]:
+        items = tuple(location.item for location in self.multiworld.get_locations())
+        return (items, tuple(item.classification if item else None for item in items),
+                tuple(item for items in self.multiworld.precollected_items.values() for item in items))
+
+    def _check_placement(self) -> None:
+        placement = self._get_placement()
+        if self._placement is None or not (
+                len(placement[0]) == len(self._placement[0]) and
+                all(map(operator.is_, placement[0], self._placement[0])) and
+                placement[1] == self._placement[1] and
+                len(placement[2]) == len(self._placement[2]) and
+                all(map(operator.is_, placement[2], self._placement[2]))):
+            self._placement = placement
+            self._spheres = None
+            self._progression_spheres = None
+            self._sendable_spheres = None
+
+    def get_spheres(self) -> Spheres:
+        """Spheres of all filled locations, collecting every item found."""
+        with self._lock:
+            self._check_placement()
+            if self._spheres is None:
+                self._spheres = self._compute_spheres()
+            return self._spheres
+
+    def get_progression_spheres(self) -> Spheres:
+        """
+        Spheres of the locations holding progression items, collecting only those.
+        Worlds may count non-progression items in their collect, so these can differ from get_spheres.
+        """
+        with self._lock:
+            self._check_placement()
+            if self._progression_spheres is None:
+                self._progression_spheres = self._compute_spheres(progression_only=True)
+            return self._progression_spheres
+
+    def get_sendable_spheres(self) -> Spheres:
+        """Spheres of multiserver sendable locations, collecting events as soon as they can be reached."""
+        with self._lock:
+            self._check_placement()
+            if self._sendable_spheres is None:
+                self._sendable_spheres = self._compute_sendable_spheres()
+            return self._sendable_spheres
+
+    def _compute_spheres(self, progression_only: bool = False) -> Spheres:
+        state = CollectionState(self.multiworld)
+        locations = set(self.multiworld.get_filled_locations())
+        if progression_only:
+            locations = {location for location in locations if location.item.advancement}
+        spheres: List[Set[Location]] = []
+        while locations:
+            sphere = set(self.multiworld._reachable(state, locations))
+            if not sphere:
+                break
+            for location in sphere:
+                state.collect(location.item, True, location)
+            locations -= sphere
+            spheres.append(sphere)
+        return Spheres(spheres, state, locations)
+
+    def _compute_sendable_spheres(self) -> Spheres:
+        state = CollectionState(self.multiworld)
+        locations: Set[Location] = set()
+        events: Set[Location] = set()
+        for location in self.multiworld.get_filled_locations():
+            if type(location.item.code) is int:
+                locations.add(location)
+            else:
+                events.add(location)
+
+        spheres: List[Set[Location]] = []
+        while locations:
+            # cull events out
+            done_events: Set[Union[Location, None]] = {None}
+            while done_events:
+                done_events = set()
+                for event in events:
+                    if event.can_reach(state):
+                        state.collect(event.item, True, event)
+                        done_events.add(event)
+                events -= done_events
+
+            sphere = set(self.multiworld._reachable(state, locations))
+            if not sphere:
+                break
+            for location in sphere:
+                state.collect(location.item, True, location)
+            locations -= sphere
+            spheres.append(sphere)
+        return Spheres(spheres, state, locations)
+
+
 PathValue = Tuple[str, Optional["PathValue"]]
+RuleDependencies = FrozenSet[Union[str, "Region"]]
+"""item names and Regions a rule read from a CollectionState while being evaluated"""
+
+
+class _RuleReads:
+    """Collects what a rule reads of a player's data while it is evaluated on a CollectionState."""
+    __slots__ = ("keys", "unknown")
+
+    keys: Set[Union[str, Region]]
+    unknown: bool
+    """set if the rule read data that can't be tracked, such as another player's data or a whole container"""
+
+    def __init__(self) -> None:
+        self.keys = set()
+        self.unknown = False
+
+
+def _untracked_method(name: str) -> Callable[..., Any]:
+    """A method of the recording stand-ins below that passes through to the actual data, but can't be tracked."""
+    def method(self: Any, *args: Any, **kwargs: Any) -> Any:
+        self.reads.unknown = True
+        return getattr(self.data, name)(*args, **kwargs)
+
+    method.__name__ = name
+    return method
+
+
+class _RecordingItemCounts(dict):
+    """
+    Stands in for one player's prog_items Counter while a rule is evaluated. Item names are recorded on their first
+    read, which also copies their count over, so further reads don't need to go through Python code.
+    """
+    __slots__ = ("data", "reads")
+
+    def __init__(self, data: Any, reads: _RuleReads) -> None:
+        super().__init__()
+        self.data = data
+        self.reads = reads
+
+    def __missing__(self, key: str) -> int:
+        self.reads.keys.add(key)
+        count = self.data[key]
+        dict.__setitem__(self, key, count)
+        return count
+
+    def __setitem__(self, key: str, value: int) -> None:
+        self.reads.unknown = True
+        dict.__setitem__(self, key, value)
+        self.data[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        self.reads.unknown = True
+        dict.pop(self, key, None)
+        del self.data[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        self.reads.keys.add(key)
+        return self.data.get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        self.reads.keys.add(key)  # type: ignore[arg-type]
+        return key in self.data
+
+    def __iter__(self) -> Iterator[str]:
+        self.reads.unknown = True
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        self.reads.unknown = True
+        return len(self.data)
+
+    def __getattr__(self, name: str) -> Any:
+        # Counter methods like total() read the whole Counter
+        self.reads.unknown = True
+        return getattr(self.data, name)
+
+    keys, values, items, copy, pop, popitem, setdefault, update, clear = (
+        _untracked_method(name) for name in ("keys", "values", "items", "copy", "pop", "popitem", "setdefault",
+                                             "update", "clear"))
+
+
+class _RecordingView:
+    """Stands in for one player's reachable_regions set while a rule is evaluated, recording the regions read."""
+    __slots__ = ("data", "reads")
+
+    def __init__(self, data: Any, reads: _RuleReads) -> None:
+        self.data = data
+        self.reads = reads
+
+    def __contains__(self, key: Any) -> bool:
+        self.reads.keys.add(key)
+        return key in self.data
+
+    def __iter__(self) -> Iterator[Any]:
+        self.reads.unknown = True
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        self.reads.unknown = True
+        return len(self.data)
+
+    def __getattr__(self, name: str) -> Any:
+        self.reads.unknown = True
+        return getattr(self.data, name)
+
+
+class _RecordingPlayerData(dict):
+    """
+    Stands in for CollectionState.prog_items or CollectionState.reachable_regions while a rule is evaluated.
+    Only holds the recording view of the player, reading any other player's data can't be tracked.
+    """
+    __slots__ = ("data", "reads")
+
+    def __init__(self, data: Dict[int, Any], player: int, view: Any, reads: _RuleReads) -> None:
+        super().__init__(((player, view),))
+        self.data = data
+        self.reads = reads
+
+    def __missing__(self, player: int) -> Any:
+        self.reads.unknown = True
+        return self.data[player]
+
+    def __setitem__(self, player: int, value: Any) -> None:
+        self.reads.unknown = True
+        dict.pop(self, player, None)
+        self.data[player] = value
+
+    def __iter__(self) -> Iterator[int]:
+        self.reads.unknown = True
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    keys, values, items, get, copy, pop, popitem, setdefault, update, clear = (
+        _untracked_method(name) for name in ("keys", "values", "items", "get", "copy", "pop", "popitem", "setdefault",
+                                             "update", "clear"))
+
+
+class _RuleRecorder:
+    """The stand-ins CollectionState._can_reach_recorded hands to rules for one player's data, reused across rules."""
+    __slots__ = ("player", "reads", "item_counts", "regions", "prog_items", "reachable_regions")
+
+    def __init__(self, player: int) -> None:
+        self.player = player
+        self.reads = _RuleReads()
+        self.item_counts = _RecordingItemCounts(None, self.reads)
+        self.regions = _RecordingView(None, self.reads)
+        self.prog_items = _RecordingPlayerData({}, player, self.item_counts, self.reads)
+        self.reachable_regions = _RecordingPlayerData({}, player, self.regions, self.reads)
+
+    def start(self, prog_items: Dict[int, Any], reachable_regions: Dict[int, Any]) -> None:
+        player = self.player
+        reads = self.reads
+        reads.keys.clear()
+        reads.unknown = False
+        item_counts = self.item_counts
+        dict.clear(item_counts)
+        item_counts.data = prog_items[player]
+        self.regions.data = reachable_regions[player]
+        self.prog_items.data = prog_items
+        self.reachable_regions.data = reachable_regions
+        # in case the last rule replaced them
+        dict.__setitem__(self.prog_items, player, item_counts)
+        dict.__setitem__(self.reachable_regions, player, self.regions)
+
+    def get_dependencies(self) -> Optional[RuleDependencies]:
+        return None if self.reads.unknown else frozenset(self.reads.keys)
+
+
+class _ItemChanges:
+    """Collects which item names of a player World.collect changes on a CollectionState."""
+    __slots__ = ("names", "unknown_players")
+
+    names: Set[str]
+    unknown_players: Set[int]
+    """players whose items got changed in a way that can't be tracked, such as through a whole container"""
+
+    def __init__(self) -> None:
+        self.names = set()
+        self.unknown_players = set()
+
+
+class _ChangeRecordingView:
+    """Stands in for one player's prog_items Counter while World.collect runs, recording the keys that get changed."""
+    __slots__ = ("data", "player", "changes")
+
+    def __init__(self, data: Any, player: int, changes: _ItemChanges) -> None:
+        self.data = data
+        self.player = player
+        self.changes = changes
+
+    def __getitem__(self, key: str) -> int:
+        return self.data[key]
+
+    def __setitem__(self, key: str, value: int) -> None:
+        self.changes.names.add(key)
+        self.data[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        self.changes.names.add(key)
+        del self.data[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.data
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getattr__(self, name: str) -> Any:
+        # any other method, like update or clear, may change anything
+        self.changes.unknown_players.add(self.player)
+        return getattr(self.data, name)
+
+
+class _ChangeRecordingPlayerData:
+    """Stands in for CollectionState.prog_items while World.collect runs."""
+    __slots__ = ("data", "player", "view", "changes")
+
+    def __init__(self, data: Dict[int, Any], player: int, changes: _ItemChanges) -> None:
+        self.data = data
+        self.player = player
+        self.view = None
+        self.changes = changes
+
+    def __getitem__(self, player: int) -> Any:
+        if player == self.player:
+            if self.view is None:
+                self.view = _ChangeRecordingView(self.data[player], player, self.changes)
+            return self.view
+        self.changes.unknown_players.add(player)
+        return self.data[player]
+
+    def __setitem__(self, player: int, value: Any) -> None:
+        self.changes.unknown_players.add(player)
+        self.view = None
+        self.data[player] = value
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getattr__(self, name: str) -> Any:
+        self.changes.unknown_players.update(self.data)
+        return getattr(self.data, name)
 
 
 class CollectionState():
@@ -714,6 +1106,11 @@ class CollectionState():
     multiworld: MultiWorld
     reachable_regions: Dict[int, Set[Region]]
     blocked_connections: Dict[int, Set[Entrance]]
+    rule_dependencies: Dict[int, Dict[Entrance, RuleDependencies]]
+    """for worlds that track rule dependencies, what each blocked Entrance's access rule read when it last failed"""
+    changed_items: Dict[int, Optional[Set[str]]]
+    """for worlds that track rule dependencies, the item names of the player that World.collect changed since the last
+    region update, None if it changed them in a way that can't be tracked"""
     advancements: Set[Location]
     path: Dict[Union[Region, Entrance], PathValue]
     locations_checked: Set[Location]
@@ -727,6 +1124,8 @@ class CollectionState():
         self.multiworld = parent
         self.reachable_regions = {player: set() for player in parent.get_all_ids()}
         self.blocked_connections = {player: set() for player in parent.get_all_ids()}
+        self.rule_dependencies = {}
+        self.changed_items = {}
         self.advancements = set()
         self.path = {}
         self.locations_checked = set()
@@ -739,10 +1138,20 @@ class CollectionState():
                 self.collect(item, True)
 
     def update_reachable_regions(self, player: int):
+        self._update_reachable_regions(player)
+
+    def _update_reachable_regions(self, player: int) -> Collection[Region]:
+        """
+        Updates the reachable regions of player.
+        Returns the newly reached ones if its world tracks rule dependencies.
+        """
         self.stale[player] = False
         world: AutoWorld.World = self.multiworld.worlds[player]
         reachable_regions = self.reachable_regions[player]
-        queue = deque(self.blocked_connections[player])
+        if world.track_rule_dependencies:
+            queue = deque(self._get_affected_connections(player))
+        else:
+            queue = deque(self.blocked_connections[player])
         start: Region = world.get_region(world.origin_region_name)
 
         # init on first call - this can't be done on construction since the regions don't exist yet
@@ -751,10 +1160,13 @@ class CollectionState():
             self.blocked_connections[player].update(start.exits)
             queue.extend(start.exits)
 
-        if world.explicit_indirect_conditions:
+        if world.track_rule_dependencies:
+            return self._update_reachable_regions_tracked_dependencies(player, queue)
+        elif world.explicit_indirect_conditions:
             self._update_reachable_regions_explicit_indirect_conditions(player, queue)
         else:
             self._update_reachable_regions_auto_indirect_conditions(player, queue)
+        return ()
 
     def _update_reachable_regions_explicit_indirect_conditions(self, player: int, queue: deque):
         reachable_regions = self.reachable_regions[player]
@@ -805,13 +1217,107 @@ class CollectionState():
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
             queue.extend(blocked_connections)
 
+    def _update_reachable_regions_tracked_dependencies(self, player: int, queue: deque) -> Collection[Region]:
+        reachable_regions = self.reachable_regions[player]
+        blocked_connections = self.blocked_connections[player]
+        rule_dependencies = self._get_rule_dependencies(player)
+        recorder = _RuleRecorder(player)
+        # order in which regions were reached during this update, and how many were reached when a connection failed
+        reached_at: Dict[Region, int] = {}
+        checked_at: Dict[Entrance, int] = {}
+        # run BFS on all connections, and keep track of those blocked by missing items and what their rules read
+        while queue:
+            while queue:
+                connection = queue.popleft()
+                new_region = connection.connected_region
+                if new_region in reachable_regions:
+                    blocked_connections.remove(connection)
+                    rule_dependencies.pop(connection, None)
+                    continue
+                reached, dependencies = self._can_reach_recorded(connection, recorder)
+                if reached:
+                    if self.allow_partial_entrances and not new_region:
+                        continue
+                    assert new_region, f"tried to search through an Entrance \"{connection}\" with no connected Region"
+                    reachable_regions.add(new_region)
+                    blocked_connections.remove(connection)
+                    rule_dependencies.pop(connection, None)
+                    blocked_connections.update(new_region.exits)
+                    queue.extend(new_region.exits)
+                    self.path[new_region] = (new_region.name, self.path.get(connection, None))
+                    reached_at[new_region] = len(reached_at)
+                else:
+                    checked_at[connection] = len(reached_at)
+                    if dependencies is None:
+                        rule_dependencies.pop(connection, None)
+                    else:
+                        rule_dependencies[connection] = dependencies
+            # retry connections whose rules read a region that became reachable after they were last checked
+            for connection in blocked_connections:
+                last_checked = checked_at.get(connection, 0)
+                if last_checked == len(reached_at):
+                    continue
+                dependencies = rule_dependencies.get(connection, None)
+                if dependencies is None or any(reached_at.get(dependency, -1) >= last_checked
+                                               for dependency in dependencies):
+                    queue.append(connection)
+        return reached_at.keys()
+
+    def _get_rule_dependencies(self, player: int) -> Dict[Entrance, RuleDependencies]:
+        try:
+            return self.rule_dependencies[player]
+        except KeyError:
+            rule_dependencies = self.rule_dependencies[player] = {}
+            return rule_dependencies
+
+    def _get_affected_connections(self, player: int) -> List[Entrance]:
+        """Returns the blocked connections of player that have to be retried due to changed items."""
+        rule_dependencies = self._get_rule_dependencies(player)
+        changed = self.changed_items.pop(player, set())
+        if changed is None:
+            rule_dependencies.clear()
+            return list(self.blocked_connections[player])
+        return [connection for connection in self.blocked_connections[player]
+                if connection not in rule_dependencies or not rule_dependencies[connection].isdisjoint(changed)]
+
+    def _collect_recorded(self, world: AutoWorld.World, item: Item) -> bool:
+        """Runs World.collect, adding the item names it changed to changed_items."""
+        changes = _ItemChanges()
+        prog_items = self.prog_items
+        self.prog_items = _ChangeRecordingPlayerData(prog_items, item.player, changes)
+        try:
+            changed = world.collect(self, item)
+        finally:
+            self.prog_items = prog_items
+        player_changed = self.changed_items.setdefault(item.player, set())
+        if player_changed is not None:
+            player_changed.update(changes.names)
+        for player in changes.unknown_players:
+            self.changed_items[player] = None
+        return changed
+
+    def _can_reach_recorded(self, spot: Union[Location, Entrance], recorder: _RuleRecorder
+                            ) -> Tuple[bool, Optional[RuleDependencies]]:
+        """
+        Checks if spot can be reached, while recording which of the recorder's player's items and regions its rules
+        read. Dependencies are None if the rules read something that can't be tracked.
+        """
+        recorder.start(self.prog_items, self.reachable_regions)
+        reached = spot.can_reach(_RecordingCollectionState.wrap(self, recorder))
+        return reached, recorder.get_dependencies()
+
+    @staticmethod
+    def _copy_player_data(player_data: Dict[int, Any]) -> Dict[int, Any]:
+        return {player: data.copy() for player, data in player_data.items()}
+
     def copy(self) -> CollectionState:
         ret = CollectionState(self.multiworld)
-        ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
-        ret.reachable_regions = {player: region_set.copy() for player, region_set in
-                                 self.reachable_regions.items()}
-        ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
-                                   self.blocked_connections.items()}
+        ret.prog_items = self._copy_player_data(self.prog_items)
+        ret.reachable_regions = self._copy_player_data(self.reachable_regions)
+        ret.blocked_connections = self._copy_player_data(self.blocked_connections)
+        ret.rule_dependencies = self._copy_player_data(self.rule_dependencies)
+        ret.changed_items = {player: None if names is None else names.copy()
+                             for player, names in self.changed_items.items()}
         ret.advancements = self.advancements.copy()
         ret.path = self.path.copy()
         ret.locations_checked = self.locations_checked.copy()
@@ -856,6 +1362,11 @@ class CollectionState():
         reachable_advancements = True
         # since the loop has a good chance to run more than once, only filter the advancements once
         locations = {location for location in locations if location.advancement and location not in self.advancements}
+        tracked_players = {player for player in self.multiworld.player_ids
+                           if self.multiworld.worlds[player].track_rule_dependencies}
+        if tracked_players:
+            self._sweep_for_advancements_tracked_dependencies(locations, tracked_players)
+            return
 
         while reachable_advancements:
             reachable_advancements = {location for location in locations if location.can_reach(self)}
@@ -865,6 +1376,70 @@ class CollectionState():
                 assert isinstance(advancement.item, Item), "tried to collect Event with no Item"
                 self.collect(advancement.item, True, advancement)
 
+    def _sweep_for_advancements_tracked_dependencies(self, locations: Set[Location], tracked_players: Set[int]) -> None:
+        """
+        Sweeps like sweep_for_advancements, but for locations of players that track rule dependencies only re-tests
+        those whose rules read an item that was collected or a region that became reachable since they last failed.
+        """
+        recorders = {player: _RuleRecorder(player) for player in tracked_players}
+        # failed locations of tracked players, by the item names and regions their rules read
+        waiting: Dict[int, Dict[Union[str, Region], Set[Location]]] = {player: {} for player in tracked_players}
+        # locations that get re-tested on every pass, as it is not known what their rules read
+        untracked = {location for location in locations if location.player not in tracked_players}
+        to_check = set(locations)
+        while to_check:
+            # bring regions up to date first, so that they are not updated while rules are being recorded
+            for player in tracked_players:
+                if self.stale[player]:
+                    self.update_reachable_regions(player)
+            reachable_advancements: Set[Location] = set()
+            for location in to_check:
+                player = location.player
+                if player in tracked_players:
+                    reached, dependencies = self._can_reach_recorded(location, recorders[player])
+                    if reached:
+                        reachable_advancements.add(location)
+                    elif dependencies is None:
+                        untracked.add(location)
+                    else:
+                        untracked.discard(location)
+                        player_waiting = waiting[player]
+                        for dependency in dependencies:
+                            if dependency in player_waiting:
+                                player_waiting[dependency].add(location)
+                            else:
+                                player_waiting[dependency] = {location}
+                elif location.can_reach(self):
+                    reachable_advancements.add(location)
+            if not reachable_advancements:
+                break
+            locations -= reachable_advancements
+            untracked -= reachable_advancements
+
+            for advancement in reachable_advancements:
+                self.advancements.add(advancement)
+                assert isinstance(advancement.item, Item), "tried to collect Event with no Item"
+                self.collect(advancement.item, True, advancement)
+            to_check = set(untracked)
+            for player in tracked_players:
+                if not self.stale[player]:
+                    continue
+                player_waiting = waiting[player]
+                # the names World.collect changed, before the region update consumes them
+                changed_items = self.changed_items.get(player, None)
+                if changed_items is None:
+                    # collecting changed this player's state in some untracked way, so re-test all of its locations
+                    for waiting_locations in player_waiting.values():
+                        to_check.update(waiting_locations)
+                    player_waiting.clear()
+                else:
+                    for item_name in changed_items:
+                        to_check.update(player_waiting.pop(item_name, ()))
+                for region in self._update_reachable_regions(player):
+                    to_check.update(player_waiting.pop(region, ()))
+            # locations stay waiting on the other things they read after they were reached or re-tested
+            to_check &= locations
+
     # item name related
     def has(self, item: str, player: int, count: int = 1) -> bool:
         return self.prog_items[player][item] >= count
@@ -990,7 +1565,11 @@ class CollectionState():
         if location:
             self.locations_checked.add(location)
 
-        changed = self.multiworld.worlds[item.player].collect(self, item)
+        world = self.multiworld.worlds[item.player]
+        if world.track_rule_dependencies:
+            changed = self._collect_recorded(world, item)
+        else:
+            changed = world.collect(self, item)
 
         self.stale[item.player] = True
 
@@ -1005,6 +1584,9 @@ class CollectionState():
             # invalidate caches, nothing can be trusted anymore now
             self.reachable_regions[item.player] = set()
             self.blocked_connections[item.player] = set()
+            self.rule_dependencies[item.player] = {}
+            # everything gets retried anyway
+            self.changed_items.pop(item.player, None)
             self.stale[item.player] = True
 
 
@@ -1014,6 +1596,8 @@ class EntranceType(IntEnum):
 
 
 class Entrance:
+    __slots__ = ("player", "name", "parent_region", "randomization_group", "randomization_type", "__dict__")
+
     access_rule: Callable[[CollectionState], bool] = staticmethod(lambda state: True)
     hide_path: bool = False
     player: int
@@ -1080,7 +1664,76 @@ class Entrance:
         return multiworld.get_name_string_for_object(self) if multiworld else f'{self.name} (Player {self.player})'
 
 
+def _untracked_attribute(name: str) -> property:
+    """An attribute of the recording CollectionState classes that reads the wrapped state's, but can't be tracked."""
+    def get(recording_state: _RecordingCollectionState) -> Any:
+        recording_state._rule_reads.unknown = True
+        return getattr(recording_state._state, name)
+
+    return property(get)
+
+
+class _RecordingCollectionState(CollectionState):
+    """
+    Stands in for a CollectionState while CollectionState._can_reach_recorded evaluates a rule, recording which of one
+    player's items and regions the rule reads without changing the state itself.
+    A class deriving from the state's class is built per set of state attributes. In it, everything but the tracked
+    attributes is a property that reads the wrapped state's attribute and marks the rule as untracked, such as
+    attributes added by a LogicMixin, so the tracked ones are read at full speed. Writing any attribute writes it to
+    the wrapped state, and can't be tracked either.
+    """
+    tracked_attributes: ClassVar[FrozenSet[str]] = frozenset((
+        "_state", "_rule_reads", "multiworld", "prog_items", "reachable_regions", "stale",
+        "can_reach", "can_reach_location", "can_reach_entrance", "can_reach_region",
+        "has", "has_all", "has_any", "has_all_counts", "has_any_count", "count", "has_from_list",
+        "has_from_list_unique", "count_from_list", "count_from_list_unique", "has_group", "has_group_unique",
+        "count_group", "count_group_unique",
+    ))
+    classes: ClassVar[Dict[Tuple[type, Tuple[str, ...], int], type]] = {}
+    """by the class and instance attributes of the state, and the number of attributes of CollectionState,
+    which grows as LogicMixins get registered"""
+    _state: CollectionState
+    _rule_reads: _RuleReads
+
+    def __init__(self, state: CollectionState, recorder: _RuleRecorder) -> None:
+        # skips CollectionState.__init__, all other attributes are read from state
+        self.__dict__.update(_state=state, _rule_reads=recorder.reads, multiworld=state.multiworld,
+                             prog_items=recorder.prog_items, reachable_regions=recorder.reachable_regions,
+                             stale=state.stale)
+
+    def __getattr__(self, name: str) -> Any:
+        # attributes the state didn't have when the class got built, like a cache that a rule is about to create
+        self._rule_reads.unknown = True
+        return getattr(self._state, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self._rule_reads.unknown = True
+        setattr(self._state, name, value)
+
+    def __delattr__(self, name: str) -> None:
+        self._rule_reads.unknown = True
+        delattr(self._state, name)
+
+    @staticmethod
+    def wrap(state: CollectionState, recorder: _RuleRecorder) -> _RecordingCollectionState:
+        state_class = type(state)
+        key = state_class, tuple(state.__dict__), len(CollectionState.__dict__)
+        recording_class = _RecordingCollectionState.classes.get(key, None)
+        if recording_class is None:
+            names = set(state.__dict__)
+            for cls in state_class.__mro__[:-1]:
+                names.update(name for name in cls.__dict__ if not (name.startswith("__") and name.endswith("__")))
+            names -= _RecordingCollectionState.tracked_attributes
+            attributes: Dict[str, Any] = {name: _untracked_attribute(name) for name in names}
+            recording_class = type(f"_Recording{state_class.__name__}", (_RecordingCollectionState, state_class),
+                                   attributes)
+            _RecordingCollectionState.classes[key] = recording_class
+        return recording_class(state, recorder)
+
+
 class Region:
+    __slots__ = ("name", "_hint_text", "player", "multiworld", "entrances", "_exits", "_locations", "__dict__")
+
     name: str
     _hint_text: str
     player: int
@@ -1091,6 +1744,8 @@ class Region:
     entrance_type: ClassVar[type[Entrance]] = Entrance
 
     class Register(MutableSequence):
+        __slots__ = ("_list", "region_manager")
+
         region_manager: MultiWorld.RegionManager
 
         def __init__(self, region_manager: MultiWorld.RegionManager):
@@ -1114,6 +1769,8 @@ class Region:
             return self._list.copy()
 
     class LocationRegister(Register):
+        __slots__ = ()
+
         def __delitem__(self, index: int) -> None:
             location: Location = self._list.__getitem__(index)
             self._list.__delitem__(index)
@@ -1126,6 +1783,8 @@ class Region:
             self.region_manager.location_cache[value.player][value.name] = value
 
     class EntranceRegister(Register):
+        __slots__ = ()
+
         def __delitem__(self, index: int) -> None:
             entrance: Entrance = self._list.__getitem__(index)
             self._list.__delitem__(index)
@@ -1474,43 +2133,49 @@ class Spoiler:
         # get locations containing progress items
         multiworld = self.multiworld
         prog_locations = {location for location in multiworld.get_filled_locations() if location.item.advancement}
-        state_cache: List[Optional[CollectionState]] = [None]
+        state_cache: List[CollectionState] = []
         collection_spheres: List[Set[Location]] = []
-        state = CollectionState(multiworld)
         sphere_candidates = set(prog_locations)
         logging.debug('Building up collection spheres.')
-        while sphere_candidates:
-
-            # build up spheres of collection radius.
-            # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
-
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-
+        # build up spheres of collection radius.
+        # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
+        spheres = multiworld.sphere_cache.get_progression_spheres()
+        state = CollectionState(multiworld)
+        for cached_sphere in spheres.spheres:
+            # keep the iteration order of sets built from sphere_candidates, which decides which items get culled
+            sphere = {location for location in sphere_candidates if location in cached_sphere}
             sphere_candidates -= sphere
             collection_spheres.append(sphere)
+            # update the regions once here, instead of in every copy the culling below makes of this state
+            for player, stale in state.stale.items():
+                if stale:
+                    state.update_reachable_regions(player)
             state_cache.append(state.copy())
+            for location in sphere:
+                state.collect(location.item, True, location)
 
             logging.debug('Calculated sphere %i, containing %i of %i progress items.', len(collection_spheres),
                           len(sphere),
                           len(prog_locations))
-            if not sphere:
-                logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
-                    location.item.name, location.item.player, location.name, location.player) for location in
-                                                                               sphere_candidates])
-                if any([multiworld.worlds[location.item.player].options.accessibility != 'minimal' for location in sphere_candidates]):
-                    raise RuntimeError(f'Not all progression items reachable ({sphere_candidates}). '
-                                       f'Something went terribly wrong here.')
-                else:
-                    self.unreachables = sphere_candidates
-                    break
+        if sphere_candidates:
+            collection_spheres.append(set())
+            state_cache.append(state)
+            logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
+                location.item.name, location.item.player, location.name, location.player) for location in
+                                                                           sphere_candidates])
+            if any([multiworld.worlds[location.item.player].options.accessibility != 'minimal' for location in sphere_candidates]):
+                raise RuntimeError(f'Not all progression items reachable ({sphere_candidates}). '
+                                   f'Something went terribly wrong here.')
+            else:
+                self.unreachables = sphere_candidates
 
         # in the second phase, we cull each sphere such that the game is still beatable,
         # reducing each range of influence to the bare minimum required inside it
         restore_later: Dict[Location, Item] = {}
+        # the progression locations not collected into each cached state, unreachable ones included
+        uncollected_locations: List[Location] = list(sphere_candidates)
         for num, sphere in reversed(tuple(enumerate(collection_spheres))):
+            uncollected_locations = list(sphere) + uncollected_locations
             to_delete: Set[Location] = set()
             for location in sphere:
                 # we remove the item at location and check if game is still beatable
@@ -1518,7 +2183,7 @@ class Spoiler:
                               location.item.player)
                 old_item = location.item
                 location.item = None
-                if multiworld.can_beat_game(state_cache[num]):
+                if self._can_beat_game_from(state_cache[num], uncollected_locations):
                     to_delete.add(location)
                     restore_later[location] = old_item
                 else:
@@ -1540,7 +2205,7 @@ class Spoiler:
                 logging.debug('Checking if %s (Player %d) is required to beat the game.', item.name, item.player)
                 precollected_items.remove(item)
                 multiworld.state.remove(item)
-                if not multiworld.can_beat_game():
+                if not self._can_beat_game_from(CollectionState(multiworld), uncollected_locations):
                     # Add the item back into `precollected_items` and collect it into `multiworld.state`.
                     multiworld.push_precollected(item)
                 else:
@@ -1588,6 +2253,32 @@ class Spoiler:
         for item in removed_precollected:
             multiworld.push_precollected(item)
 
+    def _can_beat_game_from(self, starting_state: CollectionState, locations: List[Location]) -> bool:
+        """
+        Same result as multiworld.can_beat_game(starting_state), for progression locations that are known ahead of time.
+        Locations are collected as soon as they are reached instead of sphere by sphere, which reaches the same final
+        state in fewer passes.
+        """
+        multiworld = self.multiworld
+        if multiworld.has_beaten_game(starting_state):
+            return True
+        state = starting_state.copy()
+        locations = [location for location in locations if location.item]
+        while locations:
+            remaining: List[Location] = []
+            for location in locations:
+                if location.can_reach(state):
+                    state.collect(location.item, True, location)
+                else:
+                    remaining.append(location)
+            if len(remaining) == len(locations):
+                # ran out of places and did not finish yet, quit
+                return False
+            if multiworld.has_beaten_game(state):
+                return True
+            locations = remaining
+        return False
+
     def create_paths(self, state: CollectionState, collection_spheres: List[Set[Location]]) -> None:
         from itertools import zip_longest
         multiworld = self.multiworld
@@ -1639,6 +2330,8 @@ class Spoiler:
             outfile.write(
                 'Archipelago Version %s  -  Seed: %s\n\n' % (
                     Utils.__version__, self.multiworld.seed))
+            if self.multiworld.fill_seed is not None:
+                outfile.write('Fill Seed:                       %s\n' % self.multiworld.fill_seed)
             outfile.write('Filling Algorithm:               %s\n' % self.multiworld.algorithm)
             outfile.write('Players:                         %d\n' % self.multiworld.players)
             outfile.write(f'Plando Options:                  {self.multiworld.plando_options}\n')
@@ -0,0 +1,270 @@
+"""
+Snapshots of a MultiWorld part way through generation, to resume from instead of running the earlier steps again.
+
+Rules are mostly lambdas and closures created by the worlds, which pickle can't store by reference. The
+CheckpointPickler stores those by value instead: their code is marshalled and their globals are referenced by module,
+while closure cells, defaults and attributes are pickled like any other object. Locks get recreated, modules are
+referenced by name and option classes created at runtime through their world. Anything else has to be picklable the
+usual way.
+
+Regions, entrances and locations link to each other in long chains, and pickle recurses once per link. They are
+pickled first, with only their plain attributes such as names, and their other attributes after all of them, so the
+depth of the recursion doesn't grow with the number of regions.
+
+Checkpoints contain marshalled code, so they can only be loaded by the same Python and Archipelago version that saved
+them. Like any pickle, only load checkpoints you created yourself.
+Data that worlds keep on their class or in module globals during generation is not part of the checkpoint.
+"""
+from __future__ import annotations
+
+import copyreg
+import importlib
+import io
+import logging
+import marshal
+import pickle
+import random
+import sys
+import threading
+import types
+import typing
+import zlib
+
+from BaseClasses import Entrance, Location, Region, ThreadBarrierProxy
+from Utils import version_tuple
+
+if typing.TYPE_CHECKING:
+    from BaseClasses import MultiWorld
+
+__all__ = ["CHECKPOINT_STAGES", "CheckpointError", "CheckpointPickler", "load_graph", "save_checkpoint",
+           "load_checkpoint"]
+
+logger = logging.getLogger("Checkpoint")
+
+CHECKPOINT_STAGES: typing.Tuple[str, ...] = ("generate_early", "create_regions", "create_items", "set_rules",
+                                             "connect_entrances", "generate_basic", "plando", "pre_fill")
+"""Generation stages a checkpoint can be saved after, in the order Main runs them."""
+
+_lock_factories: typing.Dict[type, typing.Callable[[], typing.Any]] = {
+    type(threading.Lock()): threading.Lock,
+    type(threading.RLock()): threading.RLock,
+}
+_dict_view_types = (type({}.keys()), type({}.values()), type({}.items()))
+_graph_types = (Region, Entrance, Location)
+_plain_types = (str, int, float, bool, bytes, type(None))
+
+_Attributes = typing.Optional[typing.Dict[str, typing.Any]]
+_AttributeState = typing.Tuple[_Attributes, _Attributes]
+"""the __dict__ and __slots__ attributes of an object, as __reduce_ex__ returns them"""
+
+
+class CheckpointError(Exception):
+    pass
+
+
+def _is_importable(obj: typing.Union[types.FunctionType, type]) -> bool:
+    """Whether pickle can store a function or class by reference."""
+    module = sys.modules.get(obj.__module__, None)
+    found: typing.Any = module
+    for name in obj.__qualname__.split("."):
+        found = getattr(found, name, None)
+    return found is obj
+
+
+def _find_world_class(cls: type) -> typing.Optional[typing.Tuple[str, str]]:
+    """Finds the game and option name of an options dataclass or option class that worlds created dynamically."""
+    from worlds.AutoWorld import AutoWorldRegister
+    for game, world_type in AutoWorldRegister.world_types.items():
+        if world_type.options_dataclass is cls:
+            return game, ""
+        for option_name, option in world_type.options_dataclass.type_hints.items():
+            if option is cls:
+                return game, option_name
+    return None
+
+
+def _get_world_class(game: str, option_name: str) -> type:
+    from worlds.AutoWorld import AutoWorldRegister
+    options_dataclass = AutoWorldRegister.world_types[game].options_dataclass
+    return options_dataclass.type_hints[option_name] if option_name else options_dataclass
+
+
+def _get_dict_view(mapping: typing.Dict[typing.Any, typing.Any], view: str) -> typing.Any:
+    return getattr(mapping, view)()
+
+
+def _make_mapping_proxy(mapping: typing.Dict[typing.Any, typing.Any]) -> types.MappingProxyType:
+    return types.MappingProxyType(mapping)
+
+
+def _make_function(code: bytes, module_name: str, cell_count: int) -> types.FunctionType:
+    globals_ = vars(importlib.import_module(module_name)) if module_name else {"__builtins__": __builtins__}
+    closure = tuple(types.CellType() for _ in range(cell_count)) or None
+    return types.FunctionType(marshal.loads(code), globals_, None, None, closure)
+
+
+def _set_function_state(function: types.FunctionType, state: typing.Dict[str, typing.Any]) -> None:
+    for cell, value in zip(function.__closure__ or (), state.pop("cells")):
+        if value is not _empty_cell:
+            cell.cell_contents = value
+    for name, value in state.items():
+        setattr(function, name, value)
+
+
+class _EmptyCell:
+    def __reduce__(self) -> str:
+        return "_empty_cell"
+
+
+_empty_cell = _EmptyCell()
+
+
+def _split_state(state: typing.Any) -> typing.Tuple[_AttributeState, _AttributeState]:
+    """Splits the state of an object into its plain attributes and the rest."""
+    dict_state, slot_state = state if isinstance(state, tuple) else (state, None)
+    plain: typing.List[_Attributes] = []
+    rest: typing.List[_Attributes] = []
+    for attributes in (dict_state, slot_state):
+        if attributes is None:
+            plain.append(None)
+            rest.append(None)
+        else:
+            plain.append({name: value for name, value in attributes.items() if type(value) in _plain_types})
+            rest.append({name: value for name, value in attributes.items() if type(value) not in _plain_types})
+    return (plain[0], plain[1]), (rest[0], rest[1])
+
+
+def _set_state(obj: typing.Any, dict_state: _Attributes, slot_state: _Attributes) -> None:
+    if dict_state:
+        obj.__dict__.update(dict_state)
+    if slot_state:
+        for name, value in slot_state.items():
+            setattr(obj, name, value)
+
+
+def _make_graph_object(cls: type, dict_state: _Attributes, slot_state: _Attributes) -> typing.Any:
+    obj = cls.__new__(cls)
+    _set_state(obj, dict_state, slot_state)
+    return obj
+
+
+def _make_thread_barrier_proxy(obj: object, passthrough: bool) -> ThreadBarrierProxy:
+    proxy = ThreadBarrierProxy(obj)
+    proxy.passthrough = passthrough
+    return proxy
+
+
+class CheckpointPickler(pickle.Pickler):
+    """
+    Pickler that also stores lambdas and closures, locks, dict views and modules, and options classes that worlds
+    created dynamically. See the module docstring.
+    """
+    _deferred: typing.Optional[typing.List[typing.Tuple[typing.Any, _AttributeState]]] = None
+    """while dump_graph pickles the graph objects, their attributes left to pickle after them"""
+
+    def dump_graph(self, obj: typing.Any, graph: typing.Iterable[typing.Any]) -> None:
+        """
+        Pickles obj like dump, but pickles the Regions, Entrances and Locations in graph first, with only their plain
+        attributes, and their other attributes after them. Load with load_graph.
+        """
+        self._deferred = deferred = []
+        try:
+            self.dump([graph_object for graph_object in graph if isinstance(graph_object, _graph_types)])
+        finally:
+            self._deferred = None
+        self.dump(deferred)
+        self.dump(obj)
+
+    def reducer_override(self, obj: typing.Any) -> typing.Any:
+        obj_type = type(obj)
+        if self._deferred is not None and isinstance(obj, _graph_types) and not hasattr(obj, "__setstate__"):
+            reduced = obj.__reduce_ex__(pickle.HIGHEST_PROTOCOL)
+            if reduced[0] is copyreg.__newobj__ and reduced[1] == (obj_type,) and len(reduced) > 2 \
+                    and not any(reduced[3:]):
+                plain, rest = _split_state(reduced[2])
+                self._deferred.append((obj, rest))
+                return _make_graph_object, (obj_type, *plain)
+        if obj_type is types.FunctionType and not _is_importable(obj):
+            cells = []
+            for cell in obj.__closure__ or ():
+                try:
+                    cells.append(cell.cell_contents)
+                except ValueError:  # not assigned yet
+                    cells.append(_empty_cell)
+            state = {
+                "cells": cells,
+                "__name__": obj.__name__,
+                "__qualname__": obj.__qualname__,
+                "__module__": obj.__module__,
+                "__defaults__": obj.__defaults__,
+                "__kwdefaults__": obj.__kwdefaults__,
+                "__doc__": obj.__doc__,
+                "__dict__": obj.__dict__,
+            }
+            # the state gets set after the function is memoized, so closures can reference themselves
+            return (_make_function, (marshal.dumps(obj.__code__), obj.__module__, len(cells)),
+                    state, None, None, _set_function_state)
+        if isinstance(obj, type) and not _is_importable(obj):
+            world_class = _find_world_class(obj)
+            if world_class:
+                return _get_world_class, world_class
+            return NotImplemented
+        if obj_type in _lock_factories:
+            return _lock_factories[obj_type], ()
+        if obj_type is types.MappingProxyType:
+            return _make_mapping_proxy, (dict(obj),)
+        if obj_type in _dict_view_types:
+            return _get_dict_view, (obj.mapping, obj_type.__name__[len("dict_"):])
+        if obj_type is types.ModuleType:
+            return importlib.import_module, (obj.__name__,)
+        if obj_type is ThreadBarrierProxy:
+            return _make_thread_barrier_proxy, (obj.obj, obj.passthrough)
+        return NotImplemented
+
+
+def load_graph(unpickler: pickle.Unpickler) -> typing.Any:
+    """Loads what CheckpointPickler.dump_graph pickled."""
+    unpickler.load()
+    for obj, (dict_state, slot_state) in unpickler.load():
+        _set_state(obj, dict_state, slot_state)
+    return unpickler.load()
+
+
+def save_checkpoint(multiworld: MultiWorld, stage: str, path: str) -> None:
+    """Saves multiworld as it is after stage to path."""
+    header = {
+        "version": version_tuple,
+        "python": sys.version,
+        "stage": stage,
+    }
+    buffer = io.BytesIO()
+    pickle.dump(header, buffer, pickle.HIGHEST_PROTOCOL)
+    try:
+        graph = [graph_object for region in multiworld.get_regions()
+                 for graph_object in (region, *region.exits, *region.locations)]
+        CheckpointPickler(buffer, pickle.HIGHEST_PROTOCOL).dump_graph((random.getstate(), multiworld), graph)
+    except (pickle.PicklingError, TypeError, AttributeError, RecursionError) as e:
+        raise CheckpointError(f"Could not save a checkpoint after {stage}, "
+                              f"some world stored something that can't be pickled: {e}") from e
+    with open(path, "wb") as f:
+        f.write(zlib.compress(buffer.getvalue(), 1))
+    logger.info(f"Saved checkpoint after {stage} to {path}")
+
+
+def load_checkpoint(path: str) -> typing.Tuple[MultiWorld, str]:
+    """Loads a checkpoint saved by save_checkpoint and returns the multiworld and the stage it was saved after."""
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        buffer = io.BytesIO(zlib.decompress(data))
+        header = pickle.load(buffer)
+    except (zlib.error, pickle.UnpicklingError) as e:
+        raise CheckpointError(f"{path} is not a checkpoint.") from e
+    # the header is checked before any of the code stored in the checkpoint gets loaded
+    if header["version"] != version_tuple or header["python"] != sys.version:
+        raise CheckpointError(f"Checkpoint {path} was saved by Archipelago {header['version']} "
+                              f"on Python {header['python']}, which can't load it.")
+    global_random_state, multiworld = load_graph(pickle.Unpickler(buffer))
+    random.setstate(global_random_state)
+    logger.info(f"Loaded checkpoint after {header['stage']} from {path}")
+    return multiworld, header["stage"]
@@ -0,0 +1,104 @@
+"""
+Data packages keyed by their checksum, see worlds.AutoWorld.data_package_checksum.
+
+The data package with a given checksum never changes, so a process only needs one copy of it, no matter how many
+multidata or rooms use it. Multidata format 4 references data packages by checksum and load_multidata,
+the WebHost room hosts and trackers get them from data_package_store. It keeps the data packages used most recently,
+up to its max_size, so long-running hosts don't keep every data package they ever loaded. An evicted data package
+stays alive as long as a room still uses it, but is loaded again for the next one.
+Rooms hosted by the same process share their data packages, so data packages handed out must not be modified.
+"""
+from __future__ import annotations
+
+import collections
+import logging
+import threading
+import typing
+
+if typing.TYPE_CHECKING:
+    from worlds import GamesPackage
+
+__all__ = ["DataPackageStore", "data_package_store"]
+
+logger = logging.getLogger("DataPackageStore")
+
+
+class DataPackageStore:
+    """
+    Data packages by checksum, checking the checksum of each data package before keeping it.
+    Keeps up to `max_size` data packages, dropping the least recently used ones first.
+    """
+    max_size: int
+    _data_packages: collections.OrderedDict[str, GamesPackage]
+    _lock: threading.Lock
+
+    def __init__(self, max_size: int = 256) -> None:
+        self.max_size = max_size
+        self._data_packages = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, checksum: str) -> bool:
+        return checksum in self._data_packages
+
+    def __len__(self) -> int:
+        return len(self._data_packages)
+
+    def get(self, checksum: str) -> typing.Optional[GamesPackage]:
+        with self._lock:
+            data_package = self._data_packages.get(checksum)
+            if data_package is not None:
+                self._data_packages.move_to_end(checksum)
+            return data_package
+
+    def add(self, data_package: GamesPackage) -> GamesPackage:
+        """
+        Returns the stored data package with the checksum of `data_package`, storing `data_package` if there is none.
+        `data_package` is returned without storing it if its checksum is missing or doesn't match its content.
+        """
+        checksum = data_package.get("checksum")
+        if not checksum:
+            return data_package
+        stored = self.get(checksum)
+        if stored is not None:
+            return stored
+        if not _valid_checksum(data_package):
+            logger.warning(f"Not storing data package with mismatching checksum {checksum}.")
+            return data_package
+        with self._lock:
+            stored = self._data_packages.setdefault(checksum, data_package)
+            while len(self._data_packages) > self.max_size:
+                self._data_packages.popitem(last=False)
+            return stored
+
+    def load(self, checksum: str,
+             loader: typing.Callable[[], typing.Optional[GamesPackage]]) -> typing.Optional[GamesPackage]:
+        """
+        Returns the data package with `checksum`, calling `loader` to load it if it's not stored yet.
+        Returns None if `loader` did.
+        """
+        stored = self.get(checksum)
+        if stored is not None:
+            return stored
+        data_package = loader()
+        if data_package is None:
+            return None
+        if data_package.get("checksum") != checksum:
+            raise ValueError(f"Loaded data package for {checksum} has checksum {data_package.get('checksum')}.")
+        return self.add(data_package)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data_packages.clear()
+
+
+def _valid_checksum(data_package: GamesPackage) -> bool:
+    from worlds.AutoWorld import data_package_checksum
+
+    content = {key: value for key, value in data_package.items() if key != "checksum"}
+    if sorted(content) != list(content):
+        return False
+    return data_package_checksum(content) == data_package["checksum"]
+
+
+data_package_store = DataPackageStore()
+"""data packages of this process"""
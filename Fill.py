@@ -1,11 +1,14 @@
+import bisect
 import collections
+import heapq
 import itertools
 import logging
 import typing
 from collections import Counter, deque
 
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld
+from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, Region
 from Options import Accessibility
+from StageReport import report_stage
 
 from worlds.AutoWorld import call_all
 from worlds.generic.Rules import add_item_rule
@@ -20,8 +23,14 @@ class FillError(RuntimeError):
         super().__init__(*args)
 
 
-def _log_fill_progress(name: str, placed: int, total_items: int) -> None:
-    logging.info(f"Current fill step ({name}) at {placed}/{total_items} items placed.")
+def _log_fill_progress(name: str, placed: int, total_items: int,
+                       swap_stats: typing.Optional[typing.Counter[str]] = None) -> None:
+    if swap_stats:
+        logging.info(f"Current fill step ({name}) at {placed}/{total_items} items placed. "
+                     f"Swaps: {swap_stats['swaps']} done out of {swap_stats['attempts']} attempts, "
+                     f"{swap_stats['sweeps']} sweeps.")
+    else:
+        logging.info(f"Current fill step ({name}) at {placed}/{total_items} items placed.")
 
 
 def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item] = tuple(),
@@ -33,6 +42,162 @@ def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item]
     return new_state
 
 
+class _LocationGroup:
+    __slots__ = ("item_rule", "always_allow", "excluded", "shared", "positions", "locations")
+
+    item_rule: typing.Callable[[Item], bool]
+    always_allow: typing.Callable[[CollectionState, Item], bool]
+    excluded: bool
+    shared: bool
+    """if False, the rules of each location are tested on their own"""
+    positions: typing.List[int]
+    locations: typing.List[Location]
+
+    def __init__(self, location: Location, shared: bool) -> None:
+        self.item_rule = location.item_rule
+        self.always_allow = location.always_allow
+        self.excluded = location.progress_type == LocationProgressType.EXCLUDED
+        self.shared = shared
+        self.positions = []
+        self.locations = []
+
+
+class LocationIndex:
+    """
+    Index over the locations of a placement scan, returning the same location as testing each of them in list order.
+    Locations of one player that share their item_rule, always_allow and exclusion accept or reject an item together,
+    so those checks are done once per group and only the groups that can take the item get scanned.
+    Rules that are shared between locations are expected to give the same result for the same item during a scan.
+    Locations need to be removed from the indexed list through `remove`, new ones are not picked up.
+    """
+    _reject: typing.ClassVar[int] = 0
+    _accept: typing.ClassVar[int] = 1
+    _reach: typing.ClassVar[int] = 2
+    _per_location: typing.ClassVar[int] = 3
+
+    locations: typing.List[Location]
+    groups_by_player: typing.Dict[int, typing.List[_LocationGroup]]
+    groups: typing.List[_LocationGroup]
+    location_groups: typing.Dict[int, typing.Tuple[_LocationGroup, int]]
+    """location id -> group and position"""
+    _removed: typing.List[int]
+    """Fenwick tree counting removed locations by position, to find the current index of a location in the list"""
+
+    def __init__(self, locations: typing.List[Location]) -> None:
+        self.locations = locations
+        self.groups_by_player = {}
+        self.groups = []
+        self.location_groups = {}
+        self._removed = [0] * (len(locations) + 1)
+        rule_users: typing.Counter[typing.Tuple[int, int]] = Counter()
+        # bound methods are created on access, so hold on to the rules while counting by id
+        rules = [(location.item_rule, location.always_allow) for location in locations]
+        for item_rule, always_allow in rules:
+            rule_users[id(item_rule), id(always_allow)] += 1
+        groups: typing.Dict[typing.Tuple[typing.Any, ...], _LocationGroup] = {}
+        for position, (location, (item_rule, always_allow)) in enumerate(zip(locations, rules)):
+            shared = type(location).can_fill is Location.can_fill and rule_users[id(item_rule), id(always_allow)] > 1
+            excluded = location.progress_type == LocationProgressType.EXCLUDED
+            key = (location.player, excluded, id(item_rule), id(always_allow)) if shared else \
+                (location.player, excluded)
+            group = groups.get(key)
+            if not group:
+                group = groups[key] = _LocationGroup(location, shared)
+                self.groups.append(group)
+                self.groups_by_player.setdefault(location.player, []).append(group)
+            group.positions.append(position)
+            group.locations.append(location)
+            self.location_groups[id(location)] = group, position
+
+    def _verdict(self, group: _LocationGroup, state: CollectionState, item: Item, check_access: bool,
+                 item_rule_only: bool) -> int:
+        if not group.shared:
+            return self._per_location
+        if item_rule_only:
+            return self._accept if group.item_rule(item) else self._reject
+        if group.always_allow(state, item) and item.name not in state.multiworld.worlds[item.player].options.non_local_items:
+            return self._accept
+        if (not group.excluded or not (item.advancement or item.useful)) and group.item_rule(item):
+            return self._reach if check_access else self._accept
+        return self._reject
+
+    def find(self, state: CollectionState, item: Item, check_access: bool = True,
+             player: typing.Optional[int] = None, item_rule_only: bool = False) -> typing.Optional[Location]:
+        """
+        Returns the first location in list order that can be filled with item, without removing it.
+        :param player: only consider locations of this player
+        :param item_rule_only: only test item_rule, instead of can_fill
+        """
+        candidates: typing.List[typing.Tuple[_LocationGroup, int]] = []
+        for group in self.groups if player is None else self.groups_by_player.get(player, ()):
+            if group.locations:
+                verdict = self._verdict(group, state, item, check_access, item_rule_only)
+                if verdict != self._reject:
+                    candidates.append((group, verdict))
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            group, verdict = candidates[0]
+            ordered_locations: typing.Iterable[typing.Tuple[int, int, Location]] = \
+                zip(group.positions, itertools.repeat(verdict), group.locations)
+        else:
+            ordered_locations = heapq.merge(*(zip(group.positions, itertools.repeat(verdict), group.locations)
+                                              for group, verdict in candidates))
+        for _, verdict, location in ordered_locations:
+            if verdict == self._accept:
+                return location
+            if verdict == self._reach:
+                if location.can_reach(state):
+                    return location
+            elif item_rule_only:
+                if location.item_rule(item):
+                    return location
+            elif location.can_fill(state, item, check_access):
+                return location
+        return None
+
+    def _mark_removed(self, position: int) -> None:
+        tree_index = position + 1
+        while tree_index < len(self._removed):
+            self._removed[tree_index] += 1
+            tree_index += tree_index & -tree_index
+
+    def remove(self, location: Location) -> None:
+        """Removes location from the index and from the indexed list."""
+        group, position = self.location_groups.pop(id(location))
+        index = bisect.bisect_left(group.positions, position)
+        del group.positions[index]
+        del group.locations[index]
+
+        removed_before = 0
+        tree_index = position
+        while tree_index:
+            removed_before += self._removed[tree_index]
+            tree_index &= tree_index - 1
+        self._mark_removed(position)
+
+        list_index = position - removed_before
+        if list_index < len(self.locations) and self.locations[list_index] is location:
+            del self.locations[list_index]
+        else:  # the list got changed outside of the index
+            self.locations.remove(location)
+
+    def remove_first(self, count: int) -> typing.List[Location]:
+        """Removes the first count locations from the index and from the indexed list and returns them."""
+        removed = self.locations[:count]
+        del self.locations[:count]
+        # the first locations of the list are the first ones of their groups
+        group_counts: typing.Counter[_LocationGroup] = Counter()
+        for location in removed:
+            group, position = self.location_groups.pop(id(location))
+            self._mark_removed(position)
+            group_counts[group] += 1
+        for group, group_count in group_counts.items():
+            del group.positions[:group_count]
+            del group.locations[:group_count]
+        return removed
+
+
 def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locations: typing.List[Location],
                      item_pool: typing.List[Item], single_player_placement: bool = False, lock: bool = False,
                      swap: bool = True, on_place: typing.Optional[typing.Callable[[Location], None]] = None,
@@ -55,10 +220,13 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     placements: typing.List[Location] = []
     cleanup_required = False
     swapped_items: typing.Counter[typing.Tuple[int, str, bool]] = Counter()
+    swap_stats: typing.Counter[str] = Counter()
     reachable_items: typing.Dict[int, typing.Deque[Item]] = {}
     for item in item_pool:
         reachable_items.setdefault(item.player, deque()).append(item)
 
+    location_index = LocationIndex(locations)
+
     # for progress logging
     total = min(len(item_pool), len(locations))
     placed = 0
@@ -93,8 +261,6 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                 break
             item_to_place = items_to_place.pop(0)
 
-            spot_to_fill: typing.Optional[Location] = None
-
             # if minimal accessibility, only check whether location is reachable if game not beatable
             if multiworld.worlds[item_to_place.player].options.accessibility == Accessibility.option_minimal:
                 perform_access_check = not multiworld.has_beaten_game(maximum_exploration_state,
@@ -103,14 +269,11 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             else:
                 perform_access_check = True
 
-            for i, location in enumerate(locations):
-                if (not single_player_placement or location.player == item_to_place.player) \
-                        and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
-                    # popping by index is faster than removing by content,
-                    spot_to_fill = locations.pop(i)
-                    # skipping a scan for the element
-                    break
-
+            spot_to_fill: typing.Optional[Location] = location_index.find(
+                maximum_exploration_state, item_to_place, perform_access_check,
+                item_to_place.player if single_player_placement else None)
+            if spot_to_fill is not None:
+                location_index.remove(spot_to_fill)
             else:
                 # we filled all reachable spots.
                 if swap:
@@ -118,6 +281,11 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                     swap_attempts = ((i, location, unsafe)
                                      for unsafe in (False, True)
                                      for i, location in enumerate(placements))
+                    # the sweep with all placements in place, shared by the attempts that it also applies to
+                    full_state: typing.Optional[CollectionState] = None
+                    # reachable location counts of full_state without and with item_to_place
+                    full_state_counts: typing.Optional[typing.Tuple[int, int]] = None
+                    swept_locations = multiworld.get_filled_locations(item.player) if single_player_placement else None
                     for (i, location, unsafe) in swap_attempts:
                         placed_item = location.item
                         # Unplaceable items can sometimes be swapped infinitely. Limit the
@@ -125,26 +293,48 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                         swap_count = swapped_items[placed_item.player, placed_item.name, unsafe]
                         if swap_count > 1:
                             continue
-
+                        if single_player_placement and location.player != item_to_place.player:
+                            continue
+                        # without always_allow, whether the location takes the item at all doesn't depend on state
+                        if location.always_allow is Location.always_allow and type(location).can_fill is \
+                                Location.can_fill and not location.can_fill(base_state, item_to_place, False):
+                            continue
+                        swap_stats["attempts"] += 1
+
+                        if not full_state:
+                            full_state = sweep_from_pool(base_state, item_pool, swept_locations)
+                            swap_stats["sweeps"] += 1
+                        # If full_state didn't collect placed_item, taking it out changes nothing for the safe swap.
+                        # If it did, the unsafe swap that starts out with placed_item ends up with the same items.
+                        reuse_full_state = (location in full_state.advancements) == unsafe
                         location.item = None
                         placed_item.location = None
-                        swap_state = sweep_from_pool(base_state, [placed_item, *item_pool] if unsafe else item_pool,
-                                                     multiworld.get_filled_locations(item.player)
-                                                     if single_player_placement else None)
+                        if reuse_full_state:
+                            swap_state = full_state
+                        elif unsafe:
+                            # placed_item is all that the unsafe swap has on top of full_state
+                            swap_state = full_state.copy()
+                            swap_state.collect(placed_item, True)
+                            swap_state.sweep_for_advancements(swept_locations)
+                            swap_stats["sweeps"] += 1
+                        else:
+                            swap_state = sweep_from_pool(base_state, item_pool, swept_locations)
+                            swap_stats["sweeps"] += 1
                         # unsafe means swap_state assumes we can somehow collect placed_item before item_to_place
                         # by continuing to swap, which is not guaranteed. This is unsafe because there is no mechanic
                         # to clean that up later, so there is a chance generation fails.
-                        if (not single_player_placement or location.player == item_to_place.player) \
-                                and location.can_fill(swap_state, item_to_place, perform_access_check):
+                        if location.can_fill(swap_state, item_to_place, perform_access_check):
 
                             # Verify placing this item won't reduce available locations, which would be a useless swap.
-                            prev_state = swap_state.copy()
-                            prev_loc_count = len(
-                                multiworld.get_reachable_locations(prev_state))
-
-                            swap_state.collect(item_to_place, True)
-                            new_loc_count = len(
-                                multiworld.get_reachable_locations(swap_state))
+                            if reuse_full_state and full_state_counts:
+                                prev_loc_count, new_loc_count = full_state_counts
+                            else:
+                                prev_loc_count = len(multiworld.get_reachable_locations(swap_state))
+                                new_state = swap_state.copy()
+                                new_state.collect(item_to_place, True)
+                                new_loc_count = len(multiworld.get_reachable_locations(new_state))
+                                if reuse_full_state:
+                                    full_state_counts = prev_loc_count, new_loc_count
 
                             if new_loc_count >= prev_loc_count:
                                 # Add this item to the existing placement, and
@@ -153,6 +343,7 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
 
                                 swap_count += 1
                                 swapped_items[placed_item.player, placed_item.name, unsafe] = swap_count
+                                swap_stats["swaps"] += 1
 
                                 reachable_items[placed_item.player].appendleft(
                                     placed_item)
@@ -179,12 +370,12 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             placements.append(spot_to_fill)
             placed += 1
             if not placed % 1000:
-                _log_fill_progress(name, placed, total)
+                _log_fill_progress(name, placed, total, swap_stats)
             if on_place:
                 on_place(spot_to_fill)
 
-    if total > 1000:
-        _log_fill_progress(name, placed, total)
+    if total > 1000 or swap_stats:
+        _log_fill_progress(name, placed, total, swap_stats)
 
     if cleanup_required:
         # validate all placements and remove invalid ones
@@ -231,6 +422,28 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     item_pool.extend(unplaced_items)
 
 
+_scan_before_indexing = 8
+"""Locations remaining_fill tests one by one for an item, before building a LocationIndex to find a spot"""
+
+
+def _open_location_ids(locations: typing.Iterable[Location], check_location_can_fill: bool) -> typing.Set[int]:
+    """Ids of the locations that accept any item in remaining_fill."""
+    default_item_rule = Location.item_rule
+    open_types: typing.Dict[type, bool] = {}
+    open_locations: typing.Set[int] = set()
+    for location in locations:
+        if location.item_rule is not default_item_rule:
+            continue
+        if check_location_can_fill:
+            location_type = type(location)
+            if location_type not in open_types:
+                open_types[location_type] = location_type.can_fill is Location.can_fill
+            if not open_types[location_type] or location.progress_type == LocationProgressType.EXCLUDED:
+                continue
+        open_locations.add(id(location))
+    return open_locations
+
+
 def remaining_fill(multiworld: MultiWorld,
                    locations: typing.List[Location],
                    itempool: typing.List[Item],
@@ -250,21 +463,55 @@ def remaining_fill(multiworld: MultiWorld,
         def location_can_fill_item(location_to_fill: Location, item_to_fill: Item):
             return location_to_fill.can_fill(state, item_to_fill, check_access=False)
     else:
+        state = multiworld.state  # not used for item rules
+
         def location_can_fill_item(location_to_fill: Location, item_to_fill: Item):
             return location_to_fill.item_rule(item_to_fill)
+    # Optimisation: Locations without item rules accept any item, so a run of them at the front of the list takes the
+    # next items in one go. Scanning for each item would fill them the same way, as each one is the first that fits.
+    open_locations = _open_location_ids(locations, check_location_can_fill)
+    # Most other items also fit into one of the first few locations, the index only gets built once they don't
+    location_index: typing.Optional[LocationIndex] = None
 
     while locations and itempool:
+        run = 0
+        run_limit = min(len(locations), len(itempool))
+        while run < run_limit and id(locations[run]) in open_locations:
+            run += 1
+        if run:
+            if location_index:
+                batch = location_index.remove_first(run)
+            else:
+                batch = locations[:run]
+                del locations[:run]
+            for location in batch:
+                multiworld.push_item(location, itempool.pop(), False)
+            placements += batch
+            placed += run
+            if placed // 1000 != (placed - run) // 1000:
+                _log_fill_progress(name, placed, total)
+            continue
+
         item_to_place = itempool.pop()
         spot_to_fill: typing.Optional[Location] = None
-
-        for i, location in enumerate(locations):
+        for index, location in enumerate(itertools.islice(locations, _scan_before_indexing)):
             if location_can_fill_item(location, item_to_place):
-                # popping by index is faster than removing by content,
-                spot_to_fill = locations.pop(i)
-                # skipping a scan for the element
+                spot_to_fill = location
+                if location_index:
+                    location_index.remove(location)
+                else:
+                    del locations[index]
                 break
-
         else:
+            if len(locations) > _scan_before_indexing:
+                if not location_index:
+                    location_index = LocationIndex(locations)
+                spot_to_fill = location_index.find(
+                    state, item_to_place, check_access=False, item_rule_only=not check_location_can_fill)
+                if spot_to_fill is not None:
+                    location_index.remove(spot_to_fill)
+
+        if spot_to_fill is None:
             # we filled all reachable spots.
             # try swapping this item with previously placed items
 
@@ -463,7 +710,8 @@ def distribute_items_restrictive(multiworld: MultiWorld,
     itempool = sorted(multiworld.itempool)
     multiworld.random.shuffle(itempool)
 
-    fill_locations, itempool = distribute_early_items(multiworld, fill_locations, itempool)
+    with report_stage(multiworld, "fill_early_items"):
+        fill_locations, itempool = distribute_early_items(multiworld, fill_locations, itempool)
 
     progitempool: typing.List[Item] = []
     usefulitempool: typing.List[Item] = []
@@ -499,49 +747,51 @@ def distribute_items_restrictive(multiworld: MultiWorld,
     single_player = multiworld.players == 1 and not multiworld.groups
 
     if prioritylocations:
-        # "priority fill"
-        fill_restrictive(multiworld, multiworld.state, prioritylocations, progitempool,
-                         single_player_placement=single_player, swap=False, on_place=mark_for_locking,
-                         name="Priority", one_item_per_player=True, allow_partial=True)
-
-        if prioritylocations:
-            # retry with one_item_per_player off because some priority fills can fail to fill with that optimization
+        with report_stage(multiworld, "fill_priority"):
+            # "priority fill"
             fill_restrictive(multiworld, multiworld.state, prioritylocations, progitempool,
-                            single_player_placement=single_player, swap=False, on_place=mark_for_locking,
-                            name="Priority Retry", one_item_per_player=False)
-        accessibility_corrections(multiworld, multiworld.state, prioritylocations, progitempool)
+                             single_player_placement=single_player, swap=False, on_place=mark_for_locking,
+                             name="Priority", one_item_per_player=True, allow_partial=True)
+
+            if prioritylocations:
+                # retry with one_item_per_player off because some priority fills can fail to fill with that optimization
+                fill_restrictive(multiworld, multiworld.state, prioritylocations, progitempool,
+                                single_player_placement=single_player, swap=False, on_place=mark_for_locking,
+                                name="Priority Retry", one_item_per_player=False)
+            accessibility_corrections(multiworld, multiworld.state, prioritylocations, progitempool)
         defaultlocations = prioritylocations + defaultlocations
 
     if progitempool:
-        # "advancement/progression fill"
-        if panic_method == "swap":
-            fill_restrictive(multiworld, multiworld.state, defaultlocations, progitempool, swap=True,
-                             name="Progression", single_player_placement=single_player)
-        elif panic_method == "raise":
-            fill_restrictive(multiworld, multiworld.state, defaultlocations, progitempool, swap=False,
-                             name="Progression", single_player_placement=single_player)
-        elif panic_method == "start_inventory":
-            fill_restrictive(multiworld, multiworld.state, defaultlocations, progitempool, swap=False,
-                             allow_partial=True, name="Progression", single_player_placement=single_player)
-            if progitempool:
-                for item in progitempool:
-                    logging.debug(f"Moved {item} to start_inventory to prevent fill failure.")
-                    multiworld.push_precollected(item)
-                    filleritempool.append(multiworld.worlds[item.player].create_filler())
-                logging.warning(f"{len(progitempool)} items moved to start inventory,"
-                                f" due to failure in Progression fill step.")
-                progitempool[:] = []
+        with report_stage(multiworld, "fill_progression"):
+            # "advancement/progression fill"
+            if panic_method == "swap":
+                fill_restrictive(multiworld, multiworld.state, defaultlocations, progitempool, swap=True,
+                                 name="Progression", single_player_placement=single_player)
+            elif panic_method == "raise":
+                fill_restrictive(multiworld, multiworld.state, defaultlocations, progitempool, swap=False,
+                                 name="Progression", single_player_placement=single_player)
+            elif panic_method == "start_inventory":
+                fill_restrictive(multiworld, multiworld.state, defaultlocations, progitempool, swap=False,
+                                 allow_partial=True, name="Progression", single_player_placement=single_player)
+                if progitempool:
+                    for item in progitempool:
+                        logging.debug(f"Moved {item} to start_inventory to prevent fill failure.")
+                        multiworld.push_precollected(item)
+                        filleritempool.append(multiworld.worlds[item.player].create_filler())
+                    logging.warning(f"{len(progitempool)} items moved to start inventory,"
+                                    f" due to failure in Progression fill step.")
+                    progitempool[:] = []
 
-        else:
-            raise ValueError(f"Generator Panic Method {panic_method} not recognized.")
-        if progitempool:
-            raise FillError(
-                f"Not enough locations for progression items. "
-                f"There are {len(progitempool)} more progression items than there are available locations.\n"
-                f"Unfilled locations:\n{multiworld.get_unfilled_locations()}.",
-                multiworld=multiworld,
-            )
-        accessibility_corrections(multiworld, multiworld.state, defaultlocations)
+            else:
+                raise ValueError(f"Generator Panic Method {panic_method} not recognized.")
+            if progitempool:
+                raise FillError(
+                    f"Not enough locations for progression items. "
+                    f"There are {len(progitempool)} more progression items than there are available locations.\n"
+                    f"Unfilled locations:\n{multiworld.get_unfilled_locations()}.",
+                    multiworld=multiworld,
+                )
+            accessibility_corrections(multiworld, multiworld.state, defaultlocations)
 
     for location in lock_later:
         if location.item:
@@ -550,8 +800,9 @@ def distribute_items_restrictive(multiworld: MultiWorld,
 
     inaccessible_location_rules(multiworld, multiworld.state, defaultlocations)
 
-    remaining_fill(multiworld, excludedlocations, filleritempool, "Remaining Excluded",
-                   move_unplaceable_to_start_inventory=panic_method=="start_inventory")
+    with report_stage(multiworld, "fill_remaining_excluded"):
+        remaining_fill(multiworld, excludedlocations, filleritempool, "Remaining Excluded",
+                       move_unplaceable_to_start_inventory=panic_method=="start_inventory")
 
     if excludedlocations:
         raise FillError(
@@ -562,8 +813,9 @@ def distribute_items_restrictive(multiworld: MultiWorld,
 
     restitempool = filleritempool + usefulitempool
 
-    remaining_fill(multiworld, defaultlocations, restitempool,
-                   move_unplaceable_to_start_inventory=panic_method=="start_inventory")
+    with report_stage(multiworld, "fill_remaining"):
+        remaining_fill(multiworld, defaultlocations, restitempool,
+                       move_unplaceable_to_start_inventory=panic_method=="start_inventory")
 
     unplaced = restitempool
     unfilled = defaultlocations
@@ -659,6 +911,80 @@ def flood_items(multiworld: MultiWorld) -> None:
                 break
 
 
+class _SphereFrontier:
+    """
+    The locations progression balancing did not reach yet, grouped by parent region. Finding the next sphere checks
+    each region once and only evaluates the access rules of locations in reachable regions.
+    """
+    __slots__ = ("locations", "by_region", "others")
+
+    locations: typing.Set[Location]
+    by_region: typing.Dict[Region, typing.Set[Location]]
+    others: typing.Set[Location]
+    """locations that override can_reach, or lack a parent_region, which get tested as a whole"""
+
+    def __init__(self, locations: typing.Iterable[Location] = ()) -> None:
+        self.locations = set(locations)
+        self.by_region = {}
+        self.others = set()
+        plain_types: typing.Dict[type, bool] = {}
+        for location in self.locations:
+            location_type = type(location)
+            if location_type not in plain_types:
+                plain_types[location_type] = location_type.can_reach is Location.can_reach
+            if plain_types[location_type] and location.parent_region:
+                self.by_region.setdefault(location.parent_region, set()).add(location)
+            else:
+                self.others.add(location)
+
+    def copy(self) -> "_SphereFrontier":
+        frontier = _SphereFrontier()
+        frontier.locations = self.locations.copy()
+        frontier.by_region = {region: locations.copy() for region, locations in self.by_region.items()}
+        frontier.others = self.others.copy()
+        return frontier
+
+    def __contains__(self, location: Location) -> bool:
+        return location in self.locations
+
+    def remove(self, location: Location) -> None:
+        self.locations.remove(location)
+        if location in self.others:
+            self.others.remove(location)
+            return
+        region_locations = self.by_region[location.parent_region]
+        region_locations.remove(location)
+        if not region_locations:
+            del self.by_region[location.parent_region]
+
+    def get_sphere(self, state: CollectionState) -> typing.Set[Location]:
+        """Returns the locations that state can reach."""
+        sphere = {location for location in self.others if location.can_reach(state)}
+        for region, locations in self.by_region.items():
+            if region.can_reach(state):
+                sphere.update(location for location in locations if location.access_rule(state))
+        return sphere
+
+    def pop_sphere(self, state: CollectionState) -> typing.Set[Location]:
+        """Removes and returns the locations that state can reach."""
+        sphere = self.get_sphere(state)
+        for location in sphere:
+            self.remove(location)
+        return sphere
+
+    def sweep_for_advancements(self, state: CollectionState) -> None:
+        """Like CollectionState.sweep_for_advancements for these locations, removing the ones it collects."""
+        for location in [location for location in self.locations if location in state.advancements]:
+            self.remove(location)
+        while True:
+            sphere = self.pop_sphere(state)
+            if not sphere:
+                break
+            for location in sphere:
+                state.advancements.add(location)
+                state.collect(location.item, True, location)
+
+
 def balance_multiworld_progression(multiworld: MultiWorld) -> None:
     # A system to reduce situations where players have no checks remaining, popularly known as "BK mode."
     # Overall progression balancing algorithm:
@@ -678,7 +1004,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         logging.debug(balanceable_players)
         state: CollectionState = CollectionState(multiworld)
         checked_locations: typing.Set[Location] = set()
-        unchecked_locations: typing.Set[Location] = set(multiworld.get_locations())
+        unchecked_locations = _SphereFrontier(multiworld.get_locations())
 
         total_locations_count: typing.Counter[int] = Counter(
             location.player
@@ -697,6 +1023,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         }
         sphere_num: int = 1
         moved_item_count: int = 0
+        # worlds that track rule dependencies sweep with their own incremental approach
+        tracked_players = any(multiworld.worlds[player].track_rule_dependencies for player in multiworld.player_ids)
 
         def get_sphere_locations(sphere_state: CollectionState,
                                  locations: typing.Set[Location]) -> typing.Set[Location]:
@@ -705,6 +1033,14 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         def item_percentage(player: int, num: int) -> float:
             return num / total_locations_count[player]
 
+        def sweep_locations(frontier: _SphereFrontier, sweep_state: CollectionState) -> _SphereFrontier:
+            """Sweeps the locations of frontier, returns the ones that are left."""
+            if tracked_players:
+                sweep_state.sweep_for_advancements(locations=frontier.locations)
+                return _SphereFrontier(l for l in frontier.locations if l not in sweep_state.advancements)
+            frontier.sweep_for_advancements(sweep_state)
+            return frontier
+
         # If there are no locations that aren't locked, there's no point in attempting to balance progression.
         if len(total_locations_count) == 0:
             return
@@ -713,9 +1049,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
             # Gather non-locked locations.
             # This ensures that only shuffled locations get counted for progression balancing,
             #   i.e. the items the players will be checking.
-            sphere_locations = get_sphere_locations(state, unchecked_locations)
+            sphere_locations = unchecked_locations.pop_sphere(state)
             for location in sphere_locations:
-                unchecked_locations.remove(location)
                 if not location.locked:
                     reachable_locations_count[location.player] += 1
 
@@ -761,9 +1096,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                                         location.progress_type != LocationProgressType.PRIORITY):
                                     candidate_items[player].add(location)
                                     logging.debug(f"Candidate item: {location.name}, {location.item.name}")
-                        balancing_sphere = get_sphere_locations(balancing_state, balancing_unchecked_locations)
+                        balancing_sphere = balancing_unchecked_locations.pop_sphere(balancing_state)
                         for location in balancing_sphere:
-                            balancing_unchecked_locations.remove(location)
                             if not location.locked:
                                 balancing_reachables[location.player] += 1
                         if multiworld.has_beaten_game(balancing_state) or all(
@@ -775,34 +1109,61 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                             raise RuntimeError('Not all required items reachable. Something went terribly wrong here.')
                     # Gather a set of locations which we can swap items into
                     unlocked_locations: typing.Dict[int, typing.Set[Location]] = collections.defaultdict(set)
-                    for l in unchecked_locations:
-                        if l not in balancing_unchecked_locations:
-                            unlocked_locations[l.player].add(l)
+                    for l in unchecked_locations.locations - balancing_unchecked_locations.locations:
+                        unlocked_locations[l.player].add(l)
                     items_to_replace: typing.List[Location] = []
+                    balancing_beats_game = multiworld.has_beaten_game(balancing_state)
                     for player in balancing_players:
                         locations_to_test = unlocked_locations[player]
                         items_to_test = list(candidate_items[player])
                         items_to_test.sort()
                         multiworld.random.shuffle(items_to_test)
+                        if not items_to_test:
+                            continue
+                        # Every test collects the items being replaced and a subset of the other candidates, so
+                        # whatever the items being replaced reach is reachable in every test, and nothing is
+                        # reachable that isn't with all candidates. The swept state without any other candidates
+                        # is shared between the tests, which then only look at locations in between.
+                        # The sweep only picks up advancements, and whatever it picked up is reachable,
+                        # so only the other locations need to be tested for the reduced sphere.
+                        candidates_state = state.copy()
+                        for location in items_to_test:
+                            candidates_state.collect(location.item, True, location)
+                        advancements_to_test = _SphereFrontier(l for l in locations_to_test if l.advancement)
+                        sweep_locations(advancements_to_test.copy(), candidates_state)
+                        candidate_advancements = [l for l in advancements_to_test.locations
+                                                  if l in candidates_state.advancements]
+                        other_locations_to_test = _SphereFrontier(_SphereFrontier(
+                            l for l in locations_to_test if not l.advancement).get_sphere(candidates_state))
+                        del candidates_state
+
+                        base_state = state.copy()
+                        advancements_to_test = sweep_locations(_SphereFrontier(candidate_advancements), base_state)
+                        other_locations_reached = len(other_locations_to_test.pop_sphere(base_state))
+
                         while items_to_test:
                             testing = items_to_test.pop()
-                            reducing_state = state.copy()
-                            for location in itertools.chain((
-                                l for l in items_to_replace
-                                if l.item.player == player
-                            ), items_to_test):
+                            reducing_state = base_state.copy()
+                            for location in items_to_test:
                                 reducing_state.collect(location.item, True, location)
 
-                            reducing_state.sweep_for_advancements(locations=locations_to_test)
+                            sweep_locations(advancements_to_test.copy(), reducing_state)
 
-                            if multiworld.has_beaten_game(balancing_state):
-                                if not multiworld.has_beaten_game(reducing_state):
-                                    items_to_replace.append(testing)
+                            if balancing_beats_game:
+                                replace = not multiworld.has_beaten_game(reducing_state)
                             else:
-                                reduced_sphere = get_sphere_locations(reducing_state, locations_to_test)
-                                p = item_percentage(player, reachable_locations_count[player] + len(reduced_sphere))
-                                if p < threshold_percentages[player]:
-                                    items_to_replace.append(testing)
+                                reduced_sphere_count = sum(l in reducing_state.advancements
+                                                           for l in candidate_advancements)
+                                reduced_sphere_count += other_locations_reached + \
+                                    len(other_locations_to_test.get_sphere(reducing_state))
+                                p = item_percentage(player, reachable_locations_count[player] + reduced_sphere_count)
+                                replace = p < threshold_percentages[player]
+
+                            if replace:
+                                items_to_replace.append(testing)
+                                base_state.collect(testing.item, True, testing)
+                                advancements_to_test = sweep_locations(advancements_to_test, base_state)
+                                other_locations_reached += len(other_locations_to_test.pop_sphere(base_state))
 
                     old_moved_item_count = moved_item_count
 
@@ -875,16 +1236,48 @@ def distribute_planned(multiworld: MultiWorld) -> None:
         else:
             warn(warning, force)
 
-    swept_state = multiworld.state.copy()
-    swept_state.sweep_for_advancements()
-    reachable = frozenset(multiworld.get_reachable_locations(swept_state))
     early_locations: typing.Dict[int, typing.List[str]] = collections.defaultdict(list)
     non_early_locations: typing.Dict[int, typing.List[str]] = collections.defaultdict(list)
-    for loc in multiworld.get_unfilled_locations():
-        if loc in reachable:
-            early_locations[loc.player].append(loc.name)
-        else:  # not reachable with swept state
-            non_early_locations[loc.player].append(loc.name)
+    swept = False
+
+    def sort_by_reachability() -> None:
+        """Sorts the unfilled locations into early and non-early ones, with one sweep shared by all blocks."""
+        nonlocal swept
+        if swept:
+            return
+        swept = True
+        swept_state = multiworld.state.copy()
+        swept_state.sweep_for_advancements()
+        reachable = frozenset(multiworld.get_reachable_locations(swept_state))
+        for loc in multiworld.get_unfilled_locations():
+            if loc in reachable:
+                early_locations[loc.player].append(loc.name)
+            else:  # not reachable with swept state
+                non_early_locations[loc.player].append(loc.name)
+
+    # Indexes of the item pool and the unfilled locations, built on first use and kept up to date while placing
+    pool_items: typing.Dict[typing.Tuple[int, str], typing.Deque[Item]] = {}
+    """items of the item pool by player and name, in pool order"""
+    taken_from_pool: typing.Set[int] = set()
+    unfilled_locations: typing.Dict[int, typing.Dict[str, Location]] = {}
+    """unfilled locations by player and name, in get_unfilled_locations order"""
+
+    def get_pool_items(item_player: int, item_name: str) -> typing.Deque[Item]:
+        if not pool_items:
+            for pool_item in multiworld.itempool:
+                pool_items.setdefault((pool_item.player, pool_item.name), deque()).append(pool_item)
+        return pool_items.get((item_player, item_name), deque())
+
+    def remove_taken_from_pool() -> None:
+        if taken_from_pool:
+            multiworld.itempool[:] = [item for item in multiworld.itempool if id(item) not in taken_from_pool]
+            taken_from_pool.clear()
+
+    def get_unfilled_locations(target_player: int) -> typing.Dict[str, Location]:
+        if target_player not in unfilled_locations:
+            unfilled_locations[target_player] = {location.name: location
+                                                 for location in multiworld.get_unfilled_locations(target_player)}
+        return unfilled_locations[target_player]
 
     world_name_lookup = multiworld.world_name_lookup
 
@@ -951,7 +1344,8 @@ def distribute_planned(multiworld: MultiWorld) -> None:
                 item_list: typing.List[str] = []
                 for key, value in items.items():
                     if value is True:
-                        value = multiworld.itempool.count(multiworld.worlds[player].create_item(key))
+                        pool_item = multiworld.worlds[player].create_item(key)
+                        value = len(get_pool_items(pool_item.player, pool_item.name))
                     item_list += [key] * value
                 items = item_list
             if isinstance(items, str):
@@ -972,6 +1366,8 @@ def distribute_planned(multiworld: MultiWorld) -> None:
                     location_list += [key] * value
                 locations = location_list
 
+            if "early_locations" in locations or "non_early_locations" in locations:
+                sort_by_reachability()
             if "early_locations" in locations:
                 locations.remove("early_locations")
                 for target_player in worlds:
@@ -1011,7 +1407,7 @@ def distribute_planned(multiworld: MultiWorld) -> None:
     multiworld.random.shuffle(plando_blocks)
     plando_blocks.sort(key=lambda block: (len(block['locations']) - block['count']['target']
                                           if len(block['locations']) > 0
-                                          else len(multiworld.get_unfilled_locations(player)) - block['count']['target']))
+                                          else len(get_unfilled_locations(player)) - block['count']['target']))
 
     for placement in plando_blocks:
         player = placement['player']
@@ -1022,23 +1418,26 @@ def distribute_planned(multiworld: MultiWorld) -> None:
             maxcount = placement['count']['target']
             from_pool = placement['from_pool']
 
-            candidates = list(multiworld.get_unfilled_locations_for_players(locations, sorted(worlds)))
+            if locations:
+                candidates = list(multiworld.get_unfilled_locations_for_players(locations, sorted(worlds)))
+            else:
+                candidates = [location for target_player in sorted(worlds)
+                              for location in get_unfilled_locations(target_player).values()]
             multiworld.random.shuffle(candidates)
             multiworld.random.shuffle(items)
             count = 0
             err: typing.List[str] = []
-            successful_pairs: typing.List[typing.Tuple[int, Item, Location]] = []
-            claimed_indices: typing.Set[typing.Optional[int]] = set()
+            successful_pairs: typing.List[typing.Tuple[bool, Item, Location]] = []
+            claimed: typing.Counter[str] = Counter()
             for item_name in items:
-                index_to_delete: typing.Optional[int] = None
+                from_pool_item = False
                 if from_pool:
-                    try:
-                        # If from_pool, try to find an existing item with this name & player in the itempool and use it
-                        index_to_delete, item = next(
-                            (i, item) for i, item in enumerate(multiworld.itempool)
-                            if item.player == player and item.name == item_name and i not in claimed_indices
-                        )
-                    except StopIteration:
+                    # If from_pool, try to find an existing item with this name & player in the itempool and use it
+                    player_pool_items = get_pool_items(player, item_name)
+                    if len(player_pool_items) > claimed[item_name]:
+                        item = player_pool_items[claimed[item_name]]
+                        from_pool_item = True
+                    else:
                         warn(
                         f"Could not remove {item_name} from pool for {multiworld.player_name[player]} as it's already missing from it.",
                         placement['force'])
@@ -1046,14 +1445,16 @@ def distribute_planned(multiworld: MultiWorld) -> None:
                 else:
                     item = multiworld.worlds[player].create_item(item_name)
 
-                for location in reversed(candidates):
+                for index in range(len(candidates) - 1, -1, -1):
+                    location = candidates[index]
                     if (location.address is None) == (item.code is None):  # either both None or both not None
                         if not location.item:
                             if location.item_rule(item):
                                 if location.can_fill(multiworld.state, item, False):
-                                    successful_pairs.append((index_to_delete, item, location))
-                                    claimed_indices.add(index_to_delete)
-                                    candidates.remove(location)
+                                    successful_pairs.append((from_pool_item, item, location))
+                                    if from_pool_item:
+                                        claimed[item_name] += 1
+                                    del candidates[index]
                                     count = count + 1
                                     break
                                 else:
@@ -1073,16 +1474,19 @@ def distribute_planned(multiworld: MultiWorld) -> None:
                     f"Plando block failed to place {m - count} of {m} item(s) for {multiworld.player_name[player]}, error(s): {' '.join(err)}",
                     placement['force'])
 
-            # Sort indices in reverse so we can remove them one by one
-            successful_pairs = sorted(successful_pairs, key=lambda successful_pair: successful_pair[0] or 0, reverse=True)
-
-            for (index, item, location) in successful_pairs:
+            for (from_pool_item, item, location) in successful_pairs:
                 multiworld.push_item(location, item, collect=False)
                 location.locked = True
                 logging.debug(f"Plando placed {item} at {location}")
-                if index is not None:  # If this item is from_pool and was found in the pool, remove it.
-                    multiworld.itempool.pop(index)
+                if location.player in unfilled_locations:
+                    unfilled_locations[location.player].pop(location.name, None)
+                if from_pool_item:  # If this item is from_pool and was found in the pool, remove it.
+                    get_pool_items(item.player, item.name).popleft()
+                    taken_from_pool.add(id(item))
 
         except Exception as e:
+            remove_taken_from_pool()
             raise Exception(
                 f"Error running plando for player {player} ({multiworld.player_name[player]})") from e
+
+    remove_taken_from_pool()
@@ -1,16 +1,20 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
 import copy
+import hashlib
 import logging
+import multiprocessing
 import os
+import pickle
 import random
 import string
 import sys
 import urllib.parse
 import urllib.request
 from collections import Counter
-from typing import Any, Dict, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 from itertools import chain
 
 import ModuleUpdate
@@ -19,6 +23,7 @@ ModuleUpdate.update()
 
 import Utils
 import Options
+from Checkpoint import CHECKPOINT_STAGES
 from BaseClasses import seeddigits, get_seed, PlandoOptions
 from Utils import parse_yamls, version_tuple, __version__, tuplize_version
 
@@ -54,6 +59,35 @@ def mystery_argparse():
     parser.add_argument("--skip_output", action="store_true",
                         help="Skips generation assertion and output stages and skips multidata and spoiler output. "
                              "Intended for debugging and testing purposes.")
+    parser.add_argument("--validation", default=defaults.validation, choices=("off", "cheap", "exhaustive"),
+                        help="How thoroughly to check the generated multiworld for errors made by worlds.")
+    parser.add_argument("--profile_rules", action="store_true",
+                        help="Count calls and time spent in location and entrance rules during fill, balancing and "
+                             "output, and write a report next to the output zip.")
+    parser.add_argument("--stage_report", action="store_true",
+                        help="Record wall time, CPU time and memory use of each generation stage and write them as "
+                             "JSON next to the output zip. Set PYTHONTRACEMALLOC=1 to include Python allocation peaks.")
+    parser.add_argument("--portfolio", default=defaults.portfolio, type=lambda value: max(int(value), 0),
+                        help="Run this many fill attempts with seeds derived from the seed in parallel processes and "
+                             "keep the first one that succeeds. 0 or 1 to fill once.")
+    parser.add_argument("--fill_seed", type=int,
+                        help="Reseed right before plando and fill, to reproduce the result of a portfolio attempt.")
+    parser.add_argument("--sphere_workers", default=defaults.sphere_workers, type=lambda value: max(int(value), 0),
+                        help="Check location rules on this many cores while computing spheres. 0 or 1 for one core.")
+    parser.add_argument("--output_processes", default=defaults.output_processes,
+                        type=lambda value: max(int(value), 0),
+                        help="Run the output of worlds that support it in this many processes. 0 or 1 for threads.")
+    parser.add_argument("--yaml_workers", default=defaults.yaml_workers, type=lambda value: max(int(value), 0),
+                        help="Parse and roll player files in this many processes. Above 0, each file rolls with its "
+                             "own seed, so the results don't depend on the number of processes. 0 for one process.")
+    parser.add_argument("--yaml_cache", default=defaults.yaml_cache, action=argparse.BooleanOptionalAction,
+                        help="Keep parsed player files in the user cache directory to skip parsing them again.")
+    parser.add_argument("--checkpoint", choices=CHECKPOINT_STAGES,
+                        help="Save a checkpoint of the multiworld to the output folder after this generation stage.")
+    parser.add_argument("--resume",
+                        help="Resume generation from a checkpoint instead of running the stages up to it again. "
+                             "Requires the same player files, only fill options like progression balancing and "
+                             "accessibility may change. Can be combined with --fill_seed and --portfolio.")
     args = parser.parse_args()
     if not os.path.isabs(args.weights_file_path):
         args.weights_file_path = os.path.join(args.player_files_path, args.weights_file_path)
@@ -88,7 +122,7 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
     weights_cache: Dict[str, Tuple[Any, ...]] = {}
     if args.weights_file_path and os.path.exists(args.weights_file_path):
         try:
-            weights_cache[args.weights_file_path] = read_weights_yamls(args.weights_file_path)
+            weights_cache[args.weights_file_path] = read_weights_yamls(args.weights_file_path, args.yaml_cache)
         except Exception as e:
             raise ValueError(f"File {args.weights_file_path} is invalid. Please fix your yaml.") from e
         logging.info(f"Weights: {args.weights_file_path} >> "
@@ -96,7 +130,7 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
 
     if args.meta_file_path and os.path.exists(args.meta_file_path):
         try:
-            meta_weights = read_weights_yamls(args.meta_file_path)[-1]
+            meta_weights = read_weights_yamls(args.meta_file_path, args.yaml_cache)[-1]
         except Exception as e:
             raise ValueError(f"File {args.meta_file_path} is invalid. Please fix your yaml.") from e
         logging.info(f"Meta: {args.meta_file_path} >> {get_choice('meta_description', meta_weights)}")
@@ -110,22 +144,27 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
         meta_weights = None
     player_id = 1
     player_files = {}
+    player_file_paths: Dict[str, str] = {}
     for file in os.scandir(args.player_files_path):
         fname = file.name
         if file.is_file() and not fname.startswith(".") and not fname.lower().endswith(".ini") and \
                 os.path.join(args.player_files_path, fname) not in {args.meta_file_path, args.weights_file_path}:
-            path = os.path.join(args.player_files_path, fname)
-            try:
-                weights_for_file = []
-                for doc_idx, yaml in enumerate(read_weights_yamls(path)):
-                    if yaml is None:
-                        logging.warning(f"Ignoring empty yaml document #{doc_idx + 1} in {fname}")
-                    else:
-                        weights_for_file.append(yaml)
-                weights_cache[fname] = tuple(weights_for_file)
-                        
-            except Exception as e:
-                raise ValueError(f"File {fname} is invalid. Please fix your yaml.") from e
+            player_file_paths[fname] = os.path.join(args.player_files_path, fname)
+    parsed_player_files = map_in_processes(read_weights_yamls,
+                                           [(path, args.yaml_cache) for path in player_file_paths.values()],
+                                           args.yaml_workers)
+    for fname, parsed in zip(player_file_paths, parsed_player_files):
+        try:
+            weights_for_file = []
+            for doc_idx, yaml in enumerate(parsed.result()):
+                if yaml is None:
+                    logging.warning(f"Ignoring empty yaml document #{doc_idx + 1} in {fname}")
+                else:
+                    weights_for_file.append(yaml)
+            weights_cache[fname] = tuple(weights_for_file)
+                    
+        except Exception as e:
+            raise ValueError(f"File {fname} is invalid. Please fix your yaml.") from e
 
     # sort dict for consistent results across platforms:
     weights_cache = {key: value for key, value in sorted(weights_cache.items(), key=lambda k: k[0].casefold())}
@@ -164,12 +203,26 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
     erargs.outputpath = args.outputpath
     erargs.skip_prog_balancing = args.skip_prog_balancing
     erargs.skip_output = args.skip_output
+    erargs.profile_rules = args.profile_rules
+    erargs.stage_report = args.stage_report
+    erargs.validation = args.validation
+    erargs.portfolio = args.portfolio
+    erargs.fill_seed = args.fill_seed
+    erargs.sphere_workers = args.sphere_workers
+    erargs.output_processes = args.output_processes
+    erargs.checkpoint = args.checkpoint
+    erargs.resume = args.resume
     erargs.name = {}
     erargs.csv_output = args.csv_output
 
-    settings_cache: Dict[str, Tuple[argparse.Namespace, ...]] = \
-        {fname: (tuple(roll_settings(yaml, args.plando) for yaml in yamls) if args.sameoptions else None)
-         for fname, yamls in weights_cache.items()}
+    settings_cache: Dict[str, Optional[RolledWeights]]
+    if args.yaml_workers and args.sameoptions:
+        settings_cache = dict(zip(weights_cache, roll_weights(list(weights_cache.values()), args.plando,
+                                                              args.yaml_workers)))
+    else:
+        settings_cache = \
+            {fname: (tuple(roll_settings(yaml, args.plando) for yaml in yamls) if args.sameoptions else None)
+             for fname, yamls in weights_cache.items()}
 
     if meta_weights:
         for category_name, category_dict in meta_weights.items():
@@ -194,13 +247,29 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
     name_counter = Counter()
     erargs.player_options = {}
 
+    # the files of all players rolled ahead in processes, by the first player of each file
+    rolled_players: Dict[int, RolledWeights] = {}
+    if args.yaml_workers and not args.sameoptions:
+        player = 1
+        while player <= args.multi and player_path_cache[player]:
+            rolled_players[player] = weights_cache[player_path_cache[player]]
+            player += len(weights_cache[player_path_cache[player]]) or 1
+        rolled_players = dict(zip(rolled_players, roll_weights(list(rolled_players.values()), args.plando,
+                                                               args.yaml_workers)))
+
     player = 1
     while player <= args.multi:
         path = player_path_cache[player]
         if path:
             try:
-                settings: Tuple[argparse.Namespace, ...] = settings_cache[path] if settings_cache[path] else \
-                    tuple(roll_settings(yaml, args.plando) for yaml in weights_cache[path])
+                if settings_cache[path]:
+                    settings = settings_cache[path]
+                elif player in rolled_players:
+                    settings = rolled_players[player]
+                else:
+                    settings = tuple(roll_settings(yaml, args.plando) for yaml in weights_cache[path])
+                if isinstance(settings, concurrent.futures.Future):
+                    settings = settings.result()
                 for settingsObject in settings:
                     for k, v in vars(settingsObject).items():
                         if v is not None:
@@ -229,17 +298,105 @@ def main(args=None) -> Tuple[argparse.Namespace, int]:
     return erargs, seed
 
 
-def read_weights_yamls(path) -> Tuple[Any, ...]:
+def read_weights_yamls(path, cache: bool = False) -> Tuple[Any, ...]:
     try:
         if urllib.parse.urlparse(path).scheme in ('https', 'file'):
-            yaml = str(urllib.request.urlopen(path).read(), "utf-8-sig")
+            data = urllib.request.urlopen(path).read()
         else:
             with open(path, 'rb') as f:
-                yaml = str(f.read(), "utf-8-sig")
+                data = f.read()
     except Exception as e:
         raise Exception(f"Failed to read weights ({path})") from e
 
-    return tuple(parse_yamls(yaml))
+    if cache:
+        return parse_yamls_cached(data)
+    return tuple(parse_yamls(str(data, "utf-8-sig")))
+
+
+class _YamlCacheUnpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str) -> type:
+        # yaml's safe loader creates only builtin containers and scalars, besides dates
+        if module == "datetime" and name in {"date", "datetime", "time", "timedelta", "timezone"}:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"{module}.{name} is not allowed in the yaml cache")
+
+
+def parse_yamls_cached(data: bytes) -> Tuple[Any, ...]:
+    """
+    Parses all yaml documents in `data`, keeping the result in Utils.cache_path("yaml"), keyed by the hash of `data`
+    and the Archipelago and PyYAML versions, to return it from there for the same `data` again.
+    """
+    import yaml
+    key = hashlib.sha256(f"{__version__} {yaml.__version__} {Utils.SafeLoader.__name__}\n".encode() + data)
+    cache_file = Utils.cache_path("yaml", f"{key.hexdigest()}.pickle")
+    try:
+        with open(cache_file, "rb") as f:
+            return _YamlCacheUnpickler(f).load()
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logging.debug(f"Could not load cached yaml {cache_file}: {e}")
+
+    yamls = tuple(parse_yamls(str(data, "utf-8-sig")))
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        temp_file = f"{cache_file}.{os.getpid()}"
+        with open(temp_file, "wb") as f:
+            pickle.dump(yamls, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+    except Exception as e:
+        logging.debug(f"Could not cache yaml {cache_file}: {e}")
+    return yamls
+
+
+RolledWeights = Union[Tuple[argparse.Namespace, ...], "concurrent.futures.Future[Tuple[argparse.Namespace, ...]]"]
+"""the rolled options of each yaml in a weights file, or the future of them"""
+
+
+def map_in_processes(function: Callable[..., Any], arguments: Sequence[Tuple[Any, ...]],
+                     processes: int) -> List[concurrent.futures.Future[Any]]:
+    """
+    Calls `function` with each of `arguments` in up to `processes` forked processes, or in this process if there is
+    only one or forking is not available. Returns the futures of the calls, in order.
+    """
+    if processes > 1 and len(arguments) > 1:
+        if "fork" in multiprocessing.get_all_start_methods():
+            with concurrent.futures.ProcessPoolExecutor(min(processes, len(arguments)),
+                                                        mp_context=multiprocessing.get_context("fork")) as executor:
+                futures = [executor.submit(function, *args) for args in arguments]
+            return futures
+        logging.warning("Parsing and rolling player files in processes requires forking processes, "
+                        "which this platform does not support. Using one process instead.")
+
+    futures = []
+    for args in arguments:
+        future: concurrent.futures.Future[Any] = concurrent.futures.Future()
+        try:
+            future.set_result(function(*args))
+        except Exception as e:
+            future.set_exception(e)
+        futures.append(future)
+    return futures
+
+
+def _roll_weights(yamls: Tuple[Any, ...], plando_options: PlandoOptions, seed: int) -> Tuple[argparse.Namespace, ...]:
+    random.seed(seed)
+    return tuple(roll_settings(yaml, plando_options) for yaml in yamls)
+
+
+def roll_weights(weights: Sequence[Tuple[Any, ...]], plando_options: PlandoOptions,
+                 processes: int) -> List[concurrent.futures.Future[Tuple[argparse.Namespace, ...]]]:
+    """
+    Rolls the yamls of each weights file of `weights` in up to `processes` forked processes. Each file rolls with its
+    own seed drawn from random, so the results only depend on the state of random, not on the number of processes.
+    """
+    seeds = [random.getrandbits(64) for _ in weights]
+    state = random.getstate()
+    try:
+        return map_in_processes(_roll_weights, [(yamls, plando_options, seed)
+                                                for yamls, seed in zip(weights, seeds)], processes)
+    finally:
+        random.setstate(state)  # rolling in this process reseeded random
 
 
 def interpret_on_off(value) -> bool:
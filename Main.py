@@ -2,18 +2,23 @@ import collections
 import concurrent.futures
 import logging
 import os
-import pickle
 import tempfile
 import time
-import zipfile
-import zlib
-from typing import Dict, List, Optional, Set, Tuple, Union
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
 
 import worlds
 from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, Region
+from Checkpoint import CHECKPOINT_STAGES, CheckpointError, load_checkpoint, save_checkpoint
 from Fill import FillError, balance_multiworld_progression, distribute_items_restrictive, distribute_planned, \
     flood_items
+from Multidata import dump_multidata
 from Options import StartInventoryPool
+from OutputArchive import OutputArchive
+from OutputProcesses import OutputProcessPool, process_output_players
+from Portfolio import placement_digest, reseed_fill, run_portfolio
+from RuleProfiler import RuleProfiler
+from StageReport import StageReport, report_stage, report_task
+from Validation import ValidationLevel, validate_placements
 from Utils import __version__, output_path, version_tuple, get_settings
 from settings import get_settings
 from worlds import AutoWorld
@@ -31,11 +36,255 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
         output_path.cached_path = args.outputpath
 
     start = time.perf_counter()
-    # initialize the multiworld
+    logger = logging.getLogger()
+    stage_report: Optional[StageReport] = StageReport() if args.stage_report else None
+    multiworld, completed_stage = set_up_multiworld(args, seed, stage_report, args.checkpoint)
+
+    rule_profiler: Optional[RuleProfiler] = RuleProfiler(multiworld) if args.profile_rules else None
+
+    def fill(fill_multiworld: MultiWorld, attempt: int = 0) -> None:
+        # only the generating process' own attempt gets profiled and checkpointed
+        if attempt:
+            run_fill_stages(fill_multiworld, args, completed_stage=completed_stage)
+        else:
+            run_fill_stages(fill_multiworld, args, rule_profiler, completed_stage, args.checkpoint)
+
+    if args.fill_seed is not None:
+        reseed_fill(multiworld, args.fill_seed)
+        fill(multiworld)
+    elif args.portfolio > 1:
+        with report_stage(multiworld, "portfolio"):
+            winner, portfolio_result = run_portfolio(multiworld, args.portfolio, fill)
+        if winner is None:
+            logger.info(f"Replaying fill attempt {portfolio_result.attempt}.")
+            multiworld, _ = set_up_multiworld(args, seed, stage_report, None)
+            reseed_fill(multiworld, portfolio_result.fill_seed)
+            rule_profiler = RuleProfiler(multiworld) if args.profile_rules else None
+            run_fill_stages(multiworld, args, rule_profiler, completed_stage)
+            if placement_digest(multiworld) != portfolio_result.digest:
+                logger.warning("Replaying the successful fill attempt resulted in different placements. "
+                               "Some world's fill is not deterministic, so the fill seed may not reproduce this "
+                               "result.")
+        elif winner is not multiworld:
+            multiworld = winner
+            multiworld.stage_report = stage_report
+            if rule_profiler:
+                logger.warning("The successful fill attempt ran in a worker process, "
+                               "so the rule profile only covers the output.")
+                rule_profiler = RuleProfiler(multiworld)
+                rule_profiler.install()
+    else:
+        fill(multiworld)
+    if multiworld.fill_seed is not None:
+        logger.info(f"Using fill seed {multiworld.fill_seed}. "
+                    f"Generate seed {multiworld.seed} with --fill_seed {multiworld.fill_seed} to reproduce it.")
+
+    # we're about to output using multithreading, so we're removing the global random state to prevent accidental use
+    multiworld.random.passthrough = False
+
+    if args.skip_output:
+        if rule_profiler:
+            write_rule_profile(rule_profiler, multiworld)
+        if stage_report:
+            write_stage_report(stage_report, multiworld)
+        logger.info('Done. Skipped output/spoiler generation. Total Time: %s', time.perf_counter() - start)
+        return multiworld
+
+    if rule_profiler:
+        rule_profiler.set_stage("output")
+    logger.info(f'Beginning output...')
+    outfilebase = 'AP_' + multiworld.seed_name
+
+    zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
+    logger.info(f"Creating final archive at {zipfilename}")
+    generator_settings = get_settings().generator
+    output = tempfile.TemporaryDirectory()
+    with output as temp_dir, \
+            OutputArchive(zipfilename, generator_settings.zip_compression_level) as archive:
+        output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
+                          is not multiworld.worlds[player].generate_output.__code__]
+        # each output task writes to a directory of its own, which gets archived once the task is done
+        output_directories: Dict[Union[int, str], str] = {
+            task: os.path.join(temp_dir, str(task)) for task in ("stage", "multidata", *output_players)}
+        for directory in output_directories.values():
+            os.mkdir(directory)
+        process_players = process_output_players(multiworld, output_players, args.output_processes)
+        # the workers get forked before the output threads start
+        with report_stage(multiworld, "output"), \
+                OutputProcessPool(multiworld, {player: output_directories[player] for player in process_players},
+                                  args.output_processes) as process_pool, \
+                concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
+            def output_task(name: str, directory: Optional[str], task: Callable[..., object],
+                            *task_args: object) -> object:
+                with report_task(multiworld, name, "output"):
+                    result = task(*task_args)
+                if directory:
+                    archive.add_directory(directory)
+                return result
+
+            check_accessibility_task = pool.submit(output_task, "fulfills_accessibility", None,
+                                                   multiworld.fulfills_accessibility)
+
+            output_file_futures = [pool.submit(output_task, "stage_generate_output", output_directories["stage"],
+                                               AutoWorld.call_stage, multiworld, "generate_output",
+                                               output_directories["stage"])]
+            for player in output_players:
+                # skip starting a thread for methods that say "pass".
+                if player in process_pool.futures:
+                    # waits for the worker process and applies its results to the world
+                    output_file_futures.append(
+                        pool.submit(output_task, f"generate_output player {player}", output_directories[player],
+                                    process_pool.result, player))
+                else:
+                    output_file_futures.append(
+                        pool.submit(output_task, f"generate_output player {player}", output_directories[player],
+                                    AutoWorld.call_single, multiworld, "generate_output", player,
+                                    output_directories[player]))
+
+            # collect ER hint info
+            er_hint_data: Dict[int, Dict[int, str]] = {}
+            AutoWorld.call_all(multiworld, 'extend_hint_information', er_hint_data)
+
+            def write_multidata():
+                import NetUtils
+                from NetUtils import HintStatus
+                slot_data = {}
+                client_versions = {}
+                games = {}
+                minimum_versions = {"server": AutoWorld.World.required_server_version, "clients": client_versions}
+                slot_info = {}
+                names = [[name for player, name in sorted(multiworld.player_name.items())]]
+                for slot in multiworld.player_ids:
+                    player_world: AutoWorld.World = multiworld.worlds[slot]
+                    minimum_versions["server"] = max(minimum_versions["server"], player_world.required_server_version)
+                    client_versions[slot] = player_world.required_client_version
+                    games[slot] = multiworld.game[slot]
+                    slot_info[slot] = NetUtils.NetworkSlot(names[0][slot - 1], multiworld.game[slot],
+                                                           multiworld.player_types[slot])
+                for slot, group in multiworld.groups.items():
+                    games[slot] = multiworld.game[slot]
+                    slot_info[slot] = NetUtils.NetworkSlot(group["name"], multiworld.game[slot], multiworld.player_types[slot],
+                                                           group_members=sorted(group["players"]))
+                precollected_items = {player: [item.code for item in world_precollected if type(item.code) == int]
+                                      for player, world_precollected in multiworld.precollected_items.items()}
+                precollected_hints = {player: set() for player in range(1, multiworld.players + 1 + len(multiworld.groups))}
+
+                for slot in multiworld.player_ids:
+                    slot_data[slot] = multiworld.worlds[slot].fill_slot_data()
+
+                def precollect_hint(location: Location, auto_status: HintStatus):
+                    entrance = er_hint_data.get(location.player, {}).get(location.address, "")
+                    hint = NetUtils.Hint(location.item.player, location.player, location.address,
+                                         location.item.code, False, entrance, location.item.flags, auto_status)
+                    precollected_hints[location.player].add(hint)
+                    if location.item.player not in multiworld.groups:
+                        precollected_hints[location.item.player].add(hint)
+                    else:
+                        for player in multiworld.groups[location.item.player]["players"]:
+                            precollected_hints[player].add(hint)
+
+                locations_data: Dict[int, Dict[int, Tuple[int, int, int]]] = {player: {} for player in multiworld.player_ids}
+                validate_placements(multiworld)
+                for location in multiworld.get_filled_locations():
+                    if type(location.address) == int:
+                        locations_data[location.player][location.address] = \
+                            location.item.code, location.item.player, location.item.flags
+                        auto_status = HintStatus.HINT_AVOID if location.item.trap else HintStatus.HINT_PRIORITY
+                        if location.name in multiworld.worlds[location.player].options.start_location_hints:
+                            if not location.item.trap:  # Unspecified status for location hints, except traps
+                                auto_status = HintStatus.HINT_UNSPECIFIED
+                            precollect_hint(location, auto_status)
+                        elif location.item.name in multiworld.worlds[location.item.player].options.start_hints:
+                            precollect_hint(location, auto_status)
+                        elif any([location.item.name in multiworld.worlds[player].options.start_hints
+                                  for player in multiworld.groups.get(location.item.player, {}).get("players", [])]):
+                            precollect_hint(location, auto_status)
+
+                # embedded data package
+                data_package = {
+                    game_world.game: worlds.network_data_package["games"][game_world.game]
+                    for game_world in multiworld.worlds.values()
+                }
+
+                checks_in_area: Dict[int, Dict[str, Union[int, List[int]]]] = {}
+
+                # get spheres -> filter address==None -> skip empty
+                spheres: List[Dict[int, Set[int]]] = []
+                for sphere in multiworld.get_sendable_spheres():
+                    current_sphere: Dict[int, Set[int]] = collections.defaultdict(set)
+                    for sphere_location in sphere:
+                        current_sphere[sphere_location.player].add(sphere_location.address)
+
+                    if current_sphere:
+                        spheres.append(dict(current_sphere))
+
+                multidata = {
+                    "slot_data": slot_data,
+                    "slot_info": slot_info,
+                    "connect_names": {name: (0, player) for player, name in multiworld.player_name.items()},
+                    "locations": locations_data,
+                    "checks_in_area": checks_in_area,
+                    "server_options": baked_server_options,
+                    "er_hint_data": er_hint_data,
+                    "precollected_items": precollected_items,
+                    "precollected_hints": precollected_hints,
+                    "version": tuple(version_tuple),
+                    "tags": ["AP"],
+                    "minimum_versions": minimum_versions,
+                    "seed_name": multiworld.seed_name,
+                    "spheres": spheres,
+                    "datapackage": data_package,
+                    "race_mode": int(multiworld.is_race),
+                }
+                AutoWorld.call_all(multiworld, "modify_multidata", multidata)
+
+                with open(os.path.join(output_directories["multidata"], f'{outfilebase}.archipelago'), 'wb') as f:
+                    f.write(dump_multidata(multidata, generator_settings.multidata_format))
+
+            output_file_futures.append(pool.submit(output_task, "write_multidata", output_directories["multidata"],
+                                                   write_multidata))
+            if not check_accessibility_task.result():
+                if not multiworld.can_beat_game():
+                    raise FillError("Game appears as unbeatable. Aborting.", multiworld=multiworld)
+                else:
+                    logger.warning("Location Accessibility requirements not fulfilled.")
+
+            # retrieve exceptions via .result() if they occurred.
+            for i, future in enumerate(concurrent.futures.as_completed(output_file_futures), start=1):
+                if i % 10 == 0 or i == len(output_file_futures):
+                    logger.info(f'Generating output files ({i}/{len(output_file_futures)}).')
+                future.result()
+
+        if args.spoiler > 1:
+            logger.info('Calculating playthrough.')
+            with report_stage(multiworld, "playthrough"):
+                multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+
+        if args.spoiler:
+            with report_stage(multiworld, "spoiler"):
+                spoiler_name = '%s_Spoiler.txt' % outfilebase
+                multiworld.spoiler.to_file(os.path.join(temp_dir, spoiler_name))
+                archive.add(os.path.join(temp_dir, spoiler_name), spoiler_name)
+
+        with report_stage(multiworld, "zip"):
+            archive.close()
+
+    if rule_profiler:
+        write_rule_profile(rule_profiler, multiworld)
+    if stage_report:
+        write_stage_report(stage_report, multiworld)
+    logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
+    return multiworld
+
+
+def create_multiworld(args, seed: Optional[int]) -> MultiWorld:
+    """Creates the multiworld and its worlds from the rolled options, up to the first generation stage."""
     multiworld = MultiWorld(args.multi)
 
     logger = logging.getLogger()
     multiworld.set_seed(seed, args.race, str(args.outputname) if args.outputname else None)
+    multiworld.validation = ValidationLevel.from_any(args.validation)
+    multiworld.sphere_workers = args.sphere_workers
     multiworld.plando_options = args.plando_options
     multiworld.plando_items = args.plando_items.copy()
     multiworld.plando_texts = args.plando_texts.copy()
@@ -84,6 +333,57 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     if not args.skip_output:
         AutoWorld.call_stage(multiworld, "assert_generate")
 
+    return multiworld
+
+
+def set_up_multiworld(args, seed: Optional[int], stage_report: Optional[StageReport],
+                      checkpoint_stage: Optional[str]) -> Tuple[MultiWorld, Optional[str]]:
+    """
+    Creates the multiworld, or resumes it from a checkpoint, and runs the setup stages that are still pending.
+    Returns it together with the stage the checkpoint was saved after, if any.
+    """
+    completed_stage: Optional[str] = None
+    if args.resume:
+        multiworld, completed_stage = load_checkpoint(args.resume)
+        resume_multiworld(multiworld, args)
+    else:
+        multiworld = create_multiworld(args, seed)
+    multiworld.stage_report = stage_report
+    if checkpoint_stage and not _stage_pending(completed_stage, checkpoint_stage):
+        logging.warning(f"Not saving a checkpoint after {checkpoint_stage}, "
+                        f"the checkpoint being resumed is already past it.")
+
+    for stage, run_stage in setup_stages.items():
+        if _stage_pending(completed_stage, stage):
+            with report_stage(multiworld, stage):
+                run_stage(multiworld)
+            _checkpoint_after(multiworld, stage, checkpoint_stage)
+    return multiworld, completed_stage
+
+
+def resume_multiworld(multiworld: MultiWorld, args) -> None:
+    """
+    Prepares a multiworld loaded from a checkpoint for the remaining stages.
+    The options that only affect fill and balancing are taken from the newly rolled options.
+    """
+    players = {player: multiworld.game[player] for player in multiworld.player_ids}
+    if players != {player: args.game.get(player) for player in range(1, args.multi + 1)}:
+        raise CheckpointError(f"The checkpoint was created for {len(players)} players playing "
+                              f"{', '.join(players.values())}, which does not match the player files.")
+    multiworld.validation = ValidationLevel.from_any(args.validation)
+    multiworld.sphere_workers = args.sphere_workers
+    for player in multiworld.player_ids:
+        options = multiworld.worlds[player].options
+        for option_key in fill_option_keys:
+            option = getattr(args, option_key)[player]
+            setattr(options, option_key, option)
+            getattr(multiworld, option_key)[player] = option
+    logging.info('Archipelago Version %s  -  Seed: %s  -  Resuming\n', __version__, multiworld.seed)
+
+
+def _run_generate_early(multiworld: MultiWorld) -> None:
+    logger = logging.getLogger()
+
     AutoWorld.call_all(multiworld, "generate_early")
 
     logger.info('')
@@ -110,12 +410,24 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
                     del local_early
             del early
 
+
+def _run_create_regions(multiworld: MultiWorld) -> None:
+    logger = logging.getLogger()
+
     logger.info('Creating MultiWorld.')
     AutoWorld.call_all(multiworld, "create_regions")
 
+
+def _run_create_items(multiworld: MultiWorld) -> None:
+    logger = logging.getLogger()
+
     logger.info('Creating Items.')
     AutoWorld.call_all(multiworld, "create_items")
 
+
+def _run_set_rules(multiworld: MultiWorld) -> None:
+    logger = logging.getLogger()
+
     logger.info('Calculating Access Rules.')
 
     for player in multiworld.player_ids:
@@ -149,7 +461,14 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
         multiworld.worlds[1].options.non_local_items.value = set()
         multiworld.worlds[1].options.local_items.value = set()
 
+
+def _run_connect_entrances(multiworld: MultiWorld) -> None:
     AutoWorld.call_all(multiworld, "connect_entrances")
+
+
+def _run_generate_basic(multiworld: MultiWorld) -> None:
+    logger = logging.getLogger()
+
     AutoWorld.call_all(multiworld, "generate_basic")
 
     # remove starting inventory from pool items.
@@ -192,185 +511,89 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     if any(multiworld.item_links.values()):
         multiworld._all_state = None
 
-    logger.info("Running Item Plando.")
 
-    distribute_planned(multiworld)
+setup_stages: Dict[str, Callable[[MultiWorld], None]] = {
+    "generate_early": _run_generate_early,
+    "create_regions": _run_create_regions,
+    "create_items": _run_create_items,
+    "set_rules": _run_set_rules,
+    "connect_entrances": _run_connect_entrances,
+    "generate_basic": _run_generate_basic,
+}
+"""The stages before plando and fill, each with the steps Main runs between it and the next stage."""
 
-    logger.info('Running Pre Main Fill.')
+fill_option_keys: Tuple[str, ...] = ("progression_balancing", "accessibility")
+"""Options that only affect fill and balancing, which can be changed when resuming from a checkpoint."""
 
-    AutoWorld.call_all(multiworld, "pre_fill")
 
-    logger.info(f'Filling the multiworld with {len(multiworld.itempool)} items.')
+def _stage_pending(completed_stage: Optional[str], stage: str) -> bool:
+    return completed_stage is None or CHECKPOINT_STAGES.index(stage) > CHECKPOINT_STAGES.index(completed_stage)
 
-    if multiworld.algorithm == 'flood':
-        flood_items(multiworld)  # different algo, biased towards early game progress items
-    elif multiworld.algorithm == 'balanced':
-        distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
 
-    AutoWorld.call_all(multiworld, 'post_fill')
+def _checkpoint_after(multiworld: MultiWorld, stage: str, checkpoint_stage: Optional[str]) -> None:
+    if stage == checkpoint_stage:
+        save_checkpoint(multiworld, stage, output_path(f"AP_{multiworld.seed_name}_{stage}.checkpoint"))
 
-    if multiworld.players > 1 and not args.skip_prog_balancing:
-        balance_multiworld_progression(multiworld)
-    else:
-        logger.info("Progression balancing skipped.")
 
-    # we're about to output using multithreading, so we're removing the global random state to prevent accidental use
-    multiworld.random.passthrough = False
-
-    if args.skip_output:
-        logger.info('Done. Skipped output/spoiler generation. Total Time: %s', time.perf_counter() - start)
-        return multiworld
-
-    logger.info(f'Beginning output...')
-    outfilebase = 'AP_' + multiworld.seed_name
-
-    output = tempfile.TemporaryDirectory()
-    with output as temp_dir:
-        output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
-                          is not multiworld.worlds[player].generate_output.__code__]
-        with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
-            check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
-
-            output_file_futures = [pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)]
-            for player in output_players:
-                # skip starting a thread for methods that say "pass".
-                output_file_futures.append(
-                    pool.submit(AutoWorld.call_single, multiworld, "generate_output", player, temp_dir))
-
-            # collect ER hint info
-            er_hint_data: Dict[int, Dict[int, str]] = {}
-            AutoWorld.call_all(multiworld, 'extend_hint_information', er_hint_data)
-
-            def write_multidata():
-                import NetUtils
-                from NetUtils import HintStatus
-                slot_data = {}
-                client_versions = {}
-                games = {}
-                minimum_versions = {"server": AutoWorld.World.required_server_version, "clients": client_versions}
-                slot_info = {}
-                names = [[name for player, name in sorted(multiworld.player_name.items())]]
-                for slot in multiworld.player_ids:
-                    player_world: AutoWorld.World = multiworld.worlds[slot]
-                    minimum_versions["server"] = max(minimum_versions["server"], player_world.required_server_version)
-                    client_versions[slot] = player_world.required_client_version
-                    games[slot] = multiworld.game[slot]
-                    slot_info[slot] = NetUtils.NetworkSlot(names[0][slot - 1], multiworld.game[slot],
-                                                           multiworld.player_types[slot])
-                for slot, group in multiworld.groups.items():
-                    games[slot] = multiworld.game[slot]
-                    slot_info[slot] = NetUtils.NetworkSlot(group["name"], multiworld.game[slot], multiworld.player_types[slot],
-                                                           group_members=sorted(group["players"]))
-                precollected_items = {player: [item.code for item in world_precollected if type(item.code) == int]
-                                      for player, world_precollected in multiworld.precollected_items.items()}
-                precollected_hints = {player: set() for player in range(1, multiworld.players + 1 + len(multiworld.groups))}
-
-                for slot in multiworld.player_ids:
-                    slot_data[slot] = multiworld.worlds[slot].fill_slot_data()
-
-                def precollect_hint(location: Location, auto_status: HintStatus):
-                    entrance = er_hint_data.get(location.player, {}).get(location.address, "")
-                    hint = NetUtils.Hint(location.item.player, location.player, location.address,
-                                         location.item.code, False, entrance, location.item.flags, auto_status)
-                    precollected_hints[location.player].add(hint)
-                    if location.item.player not in multiworld.groups:
-                        precollected_hints[location.item.player].add(hint)
-                    else:
-                        for player in multiworld.groups[location.item.player]["players"]:
-                            precollected_hints[player].add(hint)
-
-                locations_data: Dict[int, Dict[int, Tuple[int, int, int]]] = {player: {} for player in multiworld.player_ids}
-                for location in multiworld.get_filled_locations():
-                    if type(location.address) == int:
-                        assert location.item.code is not None, "item code None should be event, " \
-                                                               "location.address should then also be None. Location: " \
-                                                               f" {location}, Item: {location.item}"
-                        assert location.address not in locations_data[location.player], (
-                            f"Locations with duplicate address. {location} and "
-                            f"{locations_data[location.player][location.address]}")
-                        locations_data[location.player][location.address] = \
-                            location.item.code, location.item.player, location.item.flags
-                        auto_status = HintStatus.HINT_AVOID if location.item.trap else HintStatus.HINT_PRIORITY
-                        if location.name in multiworld.worlds[location.player].options.start_location_hints:
-                            if not location.item.trap:  # Unspecified status for location hints, except traps
-                                auto_status = HintStatus.HINT_UNSPECIFIED
-                            precollect_hint(location, auto_status)
-                        elif location.item.name in multiworld.worlds[location.item.player].options.start_hints:
-                            precollect_hint(location, auto_status)
-                        elif any([location.item.name in multiworld.worlds[player].options.start_hints
-                                  for player in multiworld.groups.get(location.item.player, {}).get("players", [])]):
-                            precollect_hint(location, auto_status)
+def run_fill_stages(multiworld: MultiWorld, args, rule_profiler: Optional[RuleProfiler] = None,
+                    completed_stage: Optional[str] = None, checkpoint_stage: Optional[str] = None) -> None:
+    """
+    Plando, fill and progression balancing. Portfolio generation runs these once per attempt.
+    Skips plando and pre_fill if the multiworld was resumed from a checkpoint after them.
+    """
+    logger = logging.getLogger()
 
-                # embedded data package
-                data_package = {
-                    game_world.game: worlds.network_data_package["games"][game_world.game]
-                    for game_world in multiworld.worlds.values()
-                }
+    if _stage_pending(completed_stage, "plando"):
+        logger.info("Running Item Plando.")
 
-                checks_in_area: Dict[int, Dict[str, Union[int, List[int]]]] = {}
+        with report_stage(multiworld, "plando"):
+            distribute_planned(multiworld)
+        _checkpoint_after(multiworld, "plando", checkpoint_stage)
 
-                # get spheres -> filter address==None -> skip empty
-                spheres: List[Dict[int, Set[int]]] = []
-                for sphere in multiworld.get_sendable_spheres():
-                    current_sphere: Dict[int, Set[int]] = collections.defaultdict(set)
-                    for sphere_location in sphere:
-                        current_sphere[sphere_location.player].add(sphere_location.address)
+    if rule_profiler:
+        rule_profiler.install()
+        rule_profiler.set_stage("pre_fill")
 
-                    if current_sphere:
-                        spheres.append(dict(current_sphere))
+    if _stage_pending(completed_stage, "pre_fill"):
+        logger.info('Running Pre Main Fill.')
 
-                multidata = {
-                    "slot_data": slot_data,
-                    "slot_info": slot_info,
-                    "connect_names": {name: (0, player) for player, name in multiworld.player_name.items()},
-                    "locations": locations_data,
-                    "checks_in_area": checks_in_area,
-                    "server_options": baked_server_options,
-                    "er_hint_data": er_hint_data,
-                    "precollected_items": precollected_items,
-                    "precollected_hints": precollected_hints,
-                    "version": tuple(version_tuple),
-                    "tags": ["AP"],
-                    "minimum_versions": minimum_versions,
-                    "seed_name": multiworld.seed_name,
-                    "spheres": spheres,
-                    "datapackage": data_package,
-                    "race_mode": int(multiworld.is_race),
-                }
-                AutoWorld.call_all(multiworld, "modify_multidata", multidata)
+        with report_stage(multiworld, "pre_fill"):
+            AutoWorld.call_all(multiworld, "pre_fill")
+        _checkpoint_after(multiworld, "pre_fill", checkpoint_stage)
 
-                multidata = zlib.compress(pickle.dumps(multidata), 9)
+    if rule_profiler:
+        rule_profiler.set_stage("fill")
+    logger.info(f'Filling the multiworld with {len(multiworld.itempool)} items.')
 
-                with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
-                    f.write(multidata)
+    with report_stage(multiworld, "fill"):
+        if multiworld.algorithm == 'flood':
+            flood_items(multiworld)  # different algo, biased towards early game progress items
+        elif multiworld.algorithm == 'balanced':
+            distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
 
-            output_file_futures.append(pool.submit(write_multidata))
-            if not check_accessibility_task.result():
-                if not multiworld.can_beat_game():
-                    raise FillError("Game appears as unbeatable. Aborting.", multiworld=multiworld)
-                else:
-                    logger.warning("Location Accessibility requirements not fulfilled.")
+    if rule_profiler:
+        rule_profiler.set_stage("post_fill")
+    with report_stage(multiworld, "post_fill"):
+        AutoWorld.call_all(multiworld, 'post_fill')
 
-            # retrieve exceptions via .result() if they occurred.
-            for i, future in enumerate(concurrent.futures.as_completed(output_file_futures), start=1):
-                if i % 10 == 0 or i == len(output_file_futures):
-                    logger.info(f'Generating output files ({i}/{len(output_file_futures)}).')
-                future.result()
+    if rule_profiler:
+        rule_profiler.set_stage("balancing")
+    if multiworld.players > 1 and not args.skip_prog_balancing:
+        with report_stage(multiworld, "balancing"):
+            balance_multiworld_progression(multiworld)
+    else:
+        logger.info("Progression balancing skipped.")
 
-        if args.spoiler > 1:
-            logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
 
-        if args.spoiler:
-            multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
+def write_rule_profile(rule_profiler: RuleProfiler, multiworld: MultiWorld) -> None:
+    """Writes the rule profile next to the output zip and restores the profiled rules."""
+    json_path, text_path = rule_profiler.write_report(output_path(f"AP_{multiworld.seed_name}_rule_profile"))
+    rule_profiler.uninstall()
+    logging.info(f"Wrote rule profile to {json_path} and {text_path}")
 
-        zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
-        logger.info(f"Creating final archive at {zipfilename}")
-        with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
-                             compresslevel=9) as zf:
-            for file in os.scandir(temp_dir):
-                zf.write(file.path, arcname=file.name)
 
-    logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
-    return multiworld
+def write_stage_report(stage_report: StageReport, multiworld: MultiWorld) -> None:
+    """Writes the timing and memory report of the generation stages next to the output zip."""
+    path = output_path(f"AP_{multiworld.seed_name}_stage_report.json")
+    stage_report.write_report(multiworld, path)
+    logging.info(f"Wrote stage report to {path}")
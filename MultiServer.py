@@ -12,6 +12,7 @@ import inspect
 import itertools
 import logging
 import math
+import mmap
 import operator
 import pickle
 import random
@@ -45,6 +46,7 @@ from Utils import version_tuple, restricted_loads, Version, async_start, get_int
 from NetUtils import Endpoint, ClientStatus, NetworkItem, decode, encode, NetworkPlayer, Permission, NetworkSlot, \
     SlotType, LocationStore, Hint, HintStatus
 from BaseClasses import ItemClassification
+from Multidata import LocationColumns, load_multidata
 
 min_client_version = Version(0, 1, 6)
 colorama.init()
@@ -428,17 +430,15 @@ class Context:
                     raise Exception("No .archipelago found in archive.")
         else:
             with open(multidatapath, 'rb') as f:
-                data = f.read()
+                # the locations of format 4 get read from the mapped file without copying them first
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
         self._load(self.decompress(data), {}, use_embedded_server_options)
         self.data_filename = multidatapath
 
     @staticmethod
     def decompress(data: bytes) -> dict:
-        format_version = data[0]
-        if format_version > 3:
-            raise Utils.VersionException("Incompatible multidata.")
-        return restricted_loads(zlib.decompress(data[1:]))
+        return load_multidata(data)
 
     def _load(self, decoded_obj: dict, game_data_packages: typing.Dict[str, typing.Any],
               use_embedded_server_options: bool):
@@ -478,7 +478,11 @@ class Context:
         self.seed_name = decoded_obj["seed_name"]
         self.random.seed(self.seed_name)
         self.connect_names = decoded_obj['connect_names']
-        self.locations = LocationStore(decoded_obj.pop("locations"))  # pre-emptively free memory
+        locations = decoded_obj.pop("locations")  # pre-emptively free memory
+        self.locations = LocationStore(locations)
+        if isinstance(locations, LocationColumns):
+            locations.release()  # the store has its own copy, release the multidata for it to be freed
+        del locations
         self.slot_data = decoded_obj['slot_data']
         for slot, data in self.slot_data.items():
             self.read_data[f"slot_data_{slot}"] = lambda data=data: data
@@ -507,12 +511,12 @@ class Context:
             if game_name in game_data_packages:
                 data = game_data_packages[game_name]
             self.logger.info(f"Loading embedded data package for game {game_name}")
-            self.gamespackage[game_name] = data
+            # data packages are shared with other rooms, so remove the groups from a copy
+            self.gamespackage[game_name] = {key: value for key, value in data.items()
+                                            if key not in ("item_name_groups", "location_name_groups")}
             self.item_name_groups[game_name] = data["item_name_groups"]
             if "location_name_groups" in data:
                 self.location_name_groups[game_name] = data["location_name_groups"]
-                del data["location_name_groups"]
-            del data["item_name_groups"]  # remove from data package, but keep in self.item_name_groups
         self._init_game_data()
         for game_name, data in self.item_name_groups.items():
             self.read_data[f"item_name_groups_{game_name}"] = lambda lgame=game_name: self.item_name_groups[lgame]
@@ -0,0 +1,271 @@
+"""
+Reading and writing the multidata (.archipelago) that Main outputs for MultiServer and the WebHost.
+
+Format 3 is a version byte followed by the zlib compressed pickle of the whole multidata. It is written by default,
+Main writes format 4 if the multidata_format generator setting asks for it.
+
+Format 4 splits the multidata into sections, so the biggest parts can be read without unpickling everything:
+    u8      format version, 4
+    3 bytes padding
+    u32     size of the table of contents, little endian
+    pickle  table of contents, {section name: (offset from the start, size, compressed)}
+    ...     sections, each aligned to 8 bytes
+
+slot_data, precollected_hints, er_hint_data and datapackage are zlib compressed pickles in sections of the same name,
+everything else but the locations is in the "multidata" section. datapackage only references each data package by its
+checksum, the data packages are in sections "datapackage.<checksum>" that are only read if the process doesn't have
+that data package in DataPackageStore.data_package_store yet. The locations are uncompressed little endian
+fixed-width columns, sorted by sender, then location, that LocationStore builds from without creating Python objects.
+As they are read in place, a MultiServer loading from a memory mapped file never holds the locations twice.
+"""
+from __future__ import annotations
+
+import array
+import bisect
+import collections.abc
+import mmap
+import pickle
+import struct
+import sys
+import typing
+import zlib
+
+from DataPackageStore import data_package_store
+from Utils import VersionException, restricted_loads
+
+__all__ = ["format_version", "pickled_sections", "LocationColumns", "dump_multidata", "load_multidata",
+           "load_multidata_section"]
+
+format_version = 3
+"""format version written by dump_multidata by default, format 4 has to be asked for until every host reads it"""
+
+pickled_sections: typing.Tuple[str, ...] = ("slot_data", "precollected_hints", "er_hint_data", "datapackage")
+"""keys of the multidata that get their own section in format 4"""
+
+location_columns: typing.Tuple[typing.Tuple[str, str], ...] = (
+    ("senders", "I"),  # every sender, including those without locations
+    ("sender", "I"),
+    ("location", "q"),
+    ("item", "q"),
+    ("receiver", "I"),
+    ("flags", "I"),
+)
+"""names and array typecodes of the location columns, in the order LocationStore takes them"""
+
+_header = struct.Struct("<B3xI")
+_alignment = 8
+_little_endian = sys.byteorder == "little"
+
+Section = typing.Tuple[int, int, bool]
+"""offset from the start of the multidata, size and whether it is zlib compressed"""
+Buffer = typing.Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+class LocationColumns(collections.abc.Mapping):  # Mapping[int, Dict[int, Tuple[int, int, int]]]
+    """
+    The locations of a format 4 multidata as columns, viewing the multidata without copying it where the host is
+    little endian. Behaves like the {sender: {location: (item, receiver, flags)}} of format 3, building the
+    dict of a sender on first access.
+    """
+    columns: typing.Tuple[typing.Sequence[int], ...]
+    """senders, sender, location, item, receiver and flags, see location_columns"""
+    _senders: typing.Dict[int, typing.Dict[int, typing.Tuple[int, int, int]]]
+
+    def __init__(self, columns: typing.Sequence[typing.Sequence[int]]) -> None:
+        self.columns = tuple(columns)
+        self._senders = {}
+
+    @classmethod
+    def from_dict(cls, locations: typing.Mapping[int, typing.Mapping[int, typing.Sequence[int]]]) -> LocationColumns:
+        columns = tuple(array.array(typecode) for _, typecode in location_columns)
+        senders, sender_column, location_column, item_column, receiver_column, flags_column = columns
+        for sender, sender_locations in sorted(locations.items()):
+            senders.append(sender)
+            for location, data in sorted(sender_locations.items()):
+                sender_column.append(sender)
+                location_column.append(location)
+                item_column.append(data[0])
+                receiver_column.append(data[1])
+                flags_column.append(data[2] if len(data) > 2 else 0)
+        return cls(columns)
+
+    @classmethod
+    def from_buffers(cls, buffers: typing.Sequence[memoryview]) -> LocationColumns:
+        columns: typing.List[typing.Sequence[int]] = []
+        for buffer, (_, typecode) in zip(buffers, location_columns):
+            if _little_endian:
+                columns.append(buffer.cast(typecode))
+            else:
+                column = array.array(typecode)
+                column.frombytes(buffer)
+                column.byteswap()
+                columns.append(column)
+        return cls(columns)
+
+    def to_bytes(self) -> typing.List[bytes]:
+        """Returns the columns as little endian bytes."""
+        buffers: typing.List[bytes] = []
+        for column, (_, typecode) in zip(self.columns, location_columns):
+            if _little_endian:
+                buffers.append(memoryview(column).cast("B").tobytes())
+            else:
+                column = array.array(typecode, column)
+                column.byteswap()
+                buffers.append(column.tobytes())
+        return buffers
+
+    def release(self) -> None:
+        """Releases the views of the multidata, so a memory map can be closed."""
+        for column in self.columns:
+            if isinstance(column, memoryview):
+                column.release()
+        self.columns = ()
+
+    def __getitem__(self, sender: int) -> typing.Dict[int, typing.Tuple[int, int, int]]:
+        if sender in self._senders:
+            return self._senders[sender]
+        senders, sender_column, location_column, item_column, receiver_column, flags_column = self.columns
+        if sender not in senders:
+            raise KeyError(sender)
+        start = bisect.bisect_left(sender_column, sender)
+        end = bisect.bisect_right(sender_column, sender, start)
+        locations = self._senders[sender] = {
+            location_column[i]: (item_column[i], receiver_column[i], flags_column[i]) for i in range(start, end)
+        }
+        return locations
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(self.columns[0])
+
+    def __len__(self) -> int:
+        return len(self.columns[0])
+
+
+def _compress(value: typing.Any) -> bytes:
+    return zlib.compress(pickle.dumps(value), 9)
+
+
+def _is_reference(data_package: typing.Dict[str, typing.Any]) -> bool:
+    """Whether `data_package` only references a data package by checksum, like those stripped by the WebHost."""
+    return "item_name_to_id" not in data_package
+
+
+def _share_data_packages(multidata: typing.Dict[str, typing.Any]) -> None:
+    data_packages = multidata.get("datapackage", {})
+    for game, data_package in data_packages.items():
+        if not _is_reference(data_package):
+            data_packages[game] = data_package_store.add(data_package)
+
+
+def dump_multidata(multidata: typing.Dict[str, typing.Any], version: int = format_version) -> bytes:
+    """Encodes `multidata` in format `version`. Formats before 4 are all written like format 3."""
+    if version < 4:
+        if isinstance(multidata.get("locations"), LocationColumns):
+            multidata = {**multidata, "locations": dict(multidata["locations"])}
+        return bytes([version]) + _compress(multidata)
+    if version != 4:
+        raise ValueError(f"Can't write multidata format {version}.")
+
+    locations = multidata["locations"]
+    if not isinstance(locations, LocationColumns):
+        locations = LocationColumns.from_dict(locations)
+    sections: typing.Dict[str, typing.Tuple[bytes, bool]] = {
+        "multidata": (_compress({key: value for key, value in multidata.items()
+                                 if key != "locations" and key not in pickled_sections}), True),
+    }
+    if "datapackage" in multidata:
+        references: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+        for game, data_package in multidata["datapackage"].items():
+            checksum = data_package.get("checksum")
+            if checksum and not _is_reference(data_package):
+                references[game] = {"checksum": checksum}
+                sections[f"datapackage.{checksum}"] = (_compress(data_package), True)
+            else:
+                references[game] = data_package
+        multidata = {**multidata, "datapackage": references}
+    for key in pickled_sections:
+        if key in multidata:
+            sections[key] = (_compress(multidata[key]), True)
+    for (name, _), column in zip(location_columns, locations.to_bytes()):
+        sections[f"locations.{name}"] = (column, False)
+
+    # the table of contents depends on the offsets, which depend on its size, so place with a large enough guess
+    toc_size = 0
+    while True:
+        offset = _header.size + toc_size
+        toc: typing.Dict[str, Section] = {}
+        for name, (data, compressed) in sections.items():
+            offset += -offset % _alignment
+            toc[name] = (offset, len(data), compressed)
+            offset += len(data)
+        toc_data = pickle.dumps(toc)
+        if len(toc_data) <= toc_size:
+            break
+        toc_size = len(toc_data) + 64
+
+    parts = [_header.pack(4, toc_size), toc_data.ljust(toc_size, b"\0")]
+    position = _header.size + toc_size
+    for name, (data, _) in sections.items():
+        offset = toc[name][0]
+        parts.append(bytes(offset - position))
+        parts.append(data)
+        position = offset + len(data)
+    return b"".join(parts)
+
+
+def _read_toc(data: Buffer) -> typing.Dict[str, Section]:
+    version = data[0]
+    if version != 4:
+        raise VersionException("Incompatible multidata.")
+    _, toc_size = _header.unpack_from(data)
+    return restricted_loads(bytes(data[_header.size:_header.size + toc_size]))
+
+
+def _read_section(data: Buffer, toc: typing.Dict[str, Section], name: str) -> typing.Any:
+    if name == "locations":
+        view = memoryview(data)
+        return LocationColumns.from_buffers([view[offset:offset + size] for offset, size, _ in
+                                             (toc[f"locations.{column}"] for column, _ in location_columns)])
+    offset, size, compressed = toc[name]
+    section = data[offset:offset + size]
+    value = restricted_loads(zlib.decompress(section) if compressed else section)
+    if name == "datapackage":
+        for game, reference in value.items():
+            data_package_name = f"datapackage.{reference.get('checksum')}"
+            if data_package_name in toc:
+                value[game] = data_package_store.load(reference["checksum"],
+                                                      lambda: _read_section(data, toc, data_package_name))
+    return value
+
+
+def load_multidata(data: Buffer) -> typing.Dict[str, typing.Any]:
+    """
+    Decodes the multidata `data` of format 3 or 4. The locations of format 4 are LocationColumns viewing `data`,
+    which has to stay unchanged while they are in use. The data packages are shared, see DataPackageStore.
+    """
+    version = data[0]
+    if version > 4:
+        raise VersionException("Incompatible multidata.")
+    if version < 4:
+        multidata = restricted_loads(zlib.decompress(data[1:]))
+        _share_data_packages(multidata)
+        return multidata
+    toc = _read_toc(data)
+    multidata = _read_section(data, toc, "multidata")
+    multidata["locations"] = _read_section(data, toc, "locations")
+    for key in pickled_sections:
+        if key in toc:
+            multidata[key] = _read_section(data, toc, key)
+    return multidata
+
+
+def load_multidata_section(data: Buffer, key: str) -> typing.Any:
+    """Decodes only `key` of the multidata `data`, raising KeyError if it doesn't have `key`."""
+    if data[0] < 4:
+        return load_multidata(data)[key]
+    toc = _read_toc(data)
+    if key == "locations" or key in pickled_sections:
+        if key not in toc and key != "locations":
+            raise KeyError(key)
+        return _read_section(data, toc, key)
+    return _read_section(data, toc, "multidata")[key]
@@ -0,0 +1,147 @@
+"""
+Writing the output zip while the output is still being generated.
+
+Main adds the files of each output task as soon as that task is done. Each file is deflated by a pool of compressing
+threads, zlib releases the GIL while compressing, so several files are compressed at once and the output threads keep
+running meanwhile. A single writer thread then appends the compressed entries to the archive in the order they were
+added. Files that are compressed already, like patch containers and bsdiff4 patches, are stored as they are.
+
+The archive is written next to its final path and only moved there once it is complete, so a generation failing
+during output doesn't leave a partial zip behind.
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import os
+import threading
+import typing
+import zipfile
+import zlib
+
+__all__ = ["OutputArchive", "is_compressed"]
+
+compressed_suffixes: typing.FrozenSet[str] = frozenset((".bsdiff4", ".zip"))
+"""suffixes of files stored without compressing them again, in addition to the .ap* patch containers"""
+
+
+def is_compressed(name: str) -> bool:
+    """Whether the file `name` is compressed already, judging by its suffix."""
+    suffix = os.path.splitext(name)[1].lower()
+    return suffix.startswith(".ap") or suffix in compressed_suffixes
+
+
+class _Entry(typing.NamedTuple):
+    info: zipfile.ZipInfo
+    data: bytes
+
+
+class OutputArchive:
+    """
+    Zip at `path` that files can be added to from any thread. `compresslevel` is the deflate level from 0 to 9,
+    0 stores all files. `compressors` is the number of files compressed at once, by default one per CPU.
+    Use as a context manager, leaving it without an exception completes the archive if `close` wasn't called already.
+    """
+    path: str
+    compresslevel: int
+    closed: bool
+    _part_path: str
+    _file: typing.BinaryIO
+    _entries: typing.List[zipfile.ZipInfo]
+    _arcnames: typing.Set[str]
+    _lock: threading.Lock
+    _compressors: concurrent.futures.ThreadPoolExecutor
+    _writer: concurrent.futures.ThreadPoolExecutor
+    _futures: typing.List[concurrent.futures.Future[None]]
+
+    def __init__(self, path: str, compresslevel: int, compressors: typing.Optional[int] = None) -> None:
+        self.path = path
+        self.compresslevel = compresslevel
+        self._part_path = path + ".part"
+        self._file = open(self._part_path, "wb")
+        self._entries = []
+        self._arcnames = set()
+        self._lock = threading.Lock()
+        self._compressors = concurrent.futures.ThreadPoolExecutor(compressors or os.cpu_count() or 1,
+                                                                  thread_name_prefix="OutputArchiveCompress")
+        # entries are appended one after another, so a single thread writes all of them
+        self._writer = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="OutputArchive")
+        self._futures = []
+        self.closed = False
+
+    def add(self, path: str, arcname: str) -> None:
+        """
+        Adds the file at `path` as `arcname` in the background. The file must not change afterwards.
+        Raises ValueError if `arcname` was added already.
+        """
+        with self._lock:
+            if arcname in self._arcnames:
+                raise ValueError(f"{arcname} was already added to {self.path}.")
+            self._arcnames.add(arcname)
+            entry = self._compressors.submit(self._compress, path, arcname)
+            self._futures.append(self._writer.submit(self._write, entry))
+
+    def add_directory(self, directory: str) -> None:
+        """Adds everything in `directory` to the root of the archive."""
+        for entry in os.scandir(directory):
+            self.add(entry.path, entry.name)
+
+    def _compress(self, path: str, arcname: str) -> _Entry:
+        info = zipfile.ZipInfo.from_file(path, arcname)
+        with open(path, "rb") as f:
+            data = f.read()
+        info.file_size = len(data)
+        info.CRC = zlib.crc32(data)
+        if self.compresslevel and not is_compressed(arcname):
+            info.compress_type = zipfile.ZIP_DEFLATED
+            # raw deflate stream, without the zlib header and checksum, as zip stores it
+            compressor = zlib.compressobj(self.compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+            data = compressor.compress(data) + compressor.flush()
+        else:
+            info.compress_type = zipfile.ZIP_STORED
+        info.compress_size = len(data)
+        return _Entry(info, data)
+
+    def _write(self, entry_future: concurrent.futures.Future[_Entry]) -> None:
+        info, data = entry_future.result()
+        info.header_offset = self._file.tell()
+        self._file.write(info.FileHeader(max(info.file_size, info.compress_size) > zipfile.ZIP64_LIMIT))
+        self._file.write(data)
+        self._entries.append(info)
+
+    def close(self) -> None:
+        """Waits for all added files, raising the first error, and moves the completed archive to its path."""
+        try:
+            for future in self._futures:
+                future.result()
+        except BaseException:
+            self.discard()
+            raise
+        self._shutdown()
+        # zipfile starts a new archive at the current position, only the central directory is left to write
+        with zipfile.ZipFile(self._file, mode="w") as zf:
+            zf.filelist.extend(self._entries)
+        self._file.close()
+        os.replace(self._part_path, self.path)
+        self.closed = True
+
+    def discard(self) -> None:
+        """Stops adding files and deletes the incomplete archive."""
+        self._shutdown(cancel_futures=True)
+        self._file.close()
+        os.remove(self._part_path)
+        self.closed = True
+
+    def _shutdown(self, cancel_futures: bool = False) -> None:
+        self._compressors.shutdown(wait=True, cancel_futures=cancel_futures)
+        self._writer.shutdown(wait=True, cancel_futures=cancel_futures)
+
+    def __enter__(self) -> OutputArchive:
+        return self
+
+    def __exit__(self, exc_type: typing.Optional[typing.Type[BaseException]], *args: typing.Any) -> None:
+        if self.closed:
+            return
+        if exc_type:
+            self.discard()
+        else:
+            self.close()
@@ -0,0 +1,131 @@
+"""
+Running generate_output of worlds in worker processes, for output that is CPU bound and holds the GIL, like patching
+ROMs in Python, which output threads would run one after another.
+
+The workers are forked from the generating process once fill and balancing are done, so they see the multiworld as
+it is without pickling it. Only worlds that set World.output_process_attributes take part, as anything else their
+generate_output changes on the world stays in the worker. The attributes named there are copied back afterwards and
+threading.Events of the world that got set in the worker get set in the generating process, so fill_slot_data and
+modify_multidata waiting on them continue like they do with threads. Errors are raised in the generating process,
+with the traceback of the worker as their cause.
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import logging
+import multiprocessing
+import pickle
+import threading
+import traceback
+import typing
+
+from worlds.AutoWorld import call_single
+
+if typing.TYPE_CHECKING:
+    from BaseClasses import MultiWorld
+
+__all__ = ["OutputProcessPool", "process_output_players"]
+
+logger = logging.getLogger("OutputProcesses")
+
+_multiworld: typing.Optional[MultiWorld] = None
+"""the multiworld being output, inherited by the forked workers"""
+
+OutputResult = typing.Tuple[typing.Dict[str, typing.Any], typing.List[str],
+                            typing.Optional[BaseException], typing.Optional[str]]
+"""attributes to copy back, names of the events that got set, the error and its formatted traceback"""
+
+
+class _RemoteTraceback(Exception):
+    def __init__(self, tb: str) -> None:
+        self.tb = tb
+
+    def __str__(self) -> str:
+        return self.tb
+
+
+def process_output_players(multiworld: MultiWorld, players: typing.Iterable[int],
+                           processes: int) -> typing.List[int]:
+    """Returns the players of `players` whose generate_output should run in one of `processes` worker processes."""
+    if processes <= 1:
+        return []
+    if "fork" not in multiprocessing.get_all_start_methods():
+        logger.warning("Outputting in processes requires forking processes, which this platform does not support. "
+                       "Outputting in threads instead.")
+        return []
+    return [player for player in players if multiworld.worlds[player].output_process_attributes is not None]
+
+
+def _set_events(world: typing.Any) -> typing.Set[str]:
+    return {name for name, value in vars(world).items() if isinstance(value, threading.Event) and value.is_set()}
+
+
+def _generate_output(player: int, output_directory: str) -> OutputResult:
+    assert _multiworld, "output workers have to be forked from the generating process"
+    world = _multiworld.worlds[player]
+    events_before = _set_events(world)
+    error: typing.Optional[BaseException] = None
+    formatted_traceback: typing.Optional[str] = None
+    try:
+        call_single(_multiworld, "generate_output", player, output_directory)
+    except Exception as e:
+        error = e
+        formatted_traceback = traceback.format_exc()
+        try:
+            pickle.dumps(e)
+        except Exception:
+            error = RuntimeError(f"{type(e).__name__}: {e}")
+            error.__dict__.update(getattr(e, "__dict__", {}))  # keeps the notes of call_single
+    results = {name: getattr(world, name) for name in world.output_process_attributes if hasattr(world, name)}
+    return results, sorted(_set_events(world) - events_before), error, formatted_traceback
+
+
+class OutputProcessPool:
+    """
+    Forks up to `processes` workers for the generate_output of the players in `output_directories`, if there are any,
+    each writing to its directory. Has to be created before the output threads start, as forking while other threads
+    run could leave locks held in the workers.
+    """
+    multiworld: MultiWorld
+    futures: typing.Dict[int, concurrent.futures.Future[OutputResult]]
+    _executor: typing.Optional[concurrent.futures.ProcessPoolExecutor]
+
+    def __init__(self, multiworld: MultiWorld, output_directories: typing.Mapping[int, str], processes: int) -> None:
+        global _multiworld
+        self.multiworld = multiworld
+        self.futures = {}
+        self._executor = None
+        if not output_directories:
+            return
+        _multiworld = multiworld
+        # with fork, all workers are started by the first submit, before the executor starts its own thread
+        processes = min(processes, len(output_directories))
+        self._executor = concurrent.futures.ProcessPoolExecutor(processes,
+                                                                mp_context=multiprocessing.get_context("fork"))
+        try:
+            self.futures = {player: self._executor.submit(_generate_output, player, output_directory)
+                            for player, output_directory in output_directories.items()}
+        finally:
+            _multiworld = None
+        logger.info(f"Generating output of {len(output_directories)} worlds in {processes} processes.")
+
+    def result(self, player: int) -> None:
+        """Waits for the output of `player` and applies its results to the world, raising its error if it failed."""
+        results, events, error, formatted_traceback = self.futures[player].result()
+        world = self.multiworld.worlds[player]
+        for name, value in results.items():
+            setattr(world, name, value)
+        for name in events:
+            getattr(world, name).set()
+        if error:
+            raise error from _RemoteTraceback(f'\n"""\n{formatted_traceback}"""')
+
+    def shutdown(self) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> OutputProcessPool:
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.shutdown()
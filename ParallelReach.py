@@ -0,0 +1,160 @@
+"""
+Evaluating which locations a CollectionState can reach on several cores, for the sphere loops of MultiWorld.
+
+The reachable regions of the state are brought up to date first, then the locations are split into partitions by
+player and each partition is checked on its own core. The generating process forks one child per partition, which
+sees the state as it is by copy-on-write and sends back the positions of the reachable locations. Anything rules
+store on the state in a child, like the caches some worlds keep there, stays in that child.
+Forking costs more the more memory the process has, and most sphere loop calls check too little to make up for it.
+So the generating process first checks the locations itself, and only forks for the rest once that took as long as
+forking the children would, by the fork time measured in this process.
+On free-threaded Python builds, the locations of worlds that declare World.read_only_rules are checked in threads
+sharing the state instead. Rules of other worlds may write to the state while checking, so their locations are
+checked by the generating thread afterwards, one after another.
+The results are merged in the order the locations were passed in, so spheres come out the same as when checking
+them one after another.
+
+A partition that fails in its child process, for example because a rule raised an exception, is checked again in the
+generating process. That way errors surface the same way as without workers.
+Forking is only done while no other threads run, as those could hold locks the children would need.
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import os
+import pickle
+import sys
+import threading
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    from BaseClasses import CollectionState, Location
+
+__all__ = ["reachable_locations", "parallel_mode", "fork_seconds", "min_locations"]
+
+min_locations = 2000
+"""Fewer locations than this are checked in the generating process when checking in threads"""
+
+_fork_seconds: typing.Optional[float] = None
+
+Partition = typing.List[typing.Tuple[int, "Location"]]
+
+
+def parallel_mode() -> typing.Optional[str]:
+    """How partitions can be checked in parallel right now: "threads", "fork" or None."""
+    if not getattr(sys, "_is_gil_enabled", lambda: True)():
+        return "threads"
+    if hasattr(os, "fork") and threading.active_count() == 1:
+        return "fork"
+    return None
+
+
+def fork_seconds() -> float:
+    """
+    Seconds it takes this process to fork a child. Measured on first use and again every time children get forked,
+    as it grows with the memory of the process.
+    """
+    global _fork_seconds
+    if _fork_seconds is None:
+        start = time.perf_counter()
+        pid = os.fork()
+        if not pid:
+            os._exit(0)
+        _fork_seconds = time.perf_counter() - start
+        os.waitpid(pid, 0)
+    return _fork_seconds
+
+
+def _partition(locations: Partition, workers: int) -> typing.List[Partition]:
+    """Splits indexed locations into up to `workers` partitions of whole players, the largest players first."""
+    by_player: typing.Dict[int, Partition] = {}
+    for index, location in locations:
+        by_player.setdefault(location.player, []).append((index, location))
+    partitions: typing.List[Partition] = [[] for _ in range(min(workers, len(by_player)))]
+    for player in sorted(by_player, key=lambda player: (-len(by_player[player]), player)):
+        min(partitions, key=len).extend(by_player[player])
+    return partitions
+
+
+def _check(state: CollectionState, partition: Partition) -> typing.List[int]:
+    return [index for index, location in partition if location.can_reach(state)]
+
+
+def _check_forked(state: CollectionState, partitions: typing.List[Partition]) -> typing.List[typing.List[int]]:
+    global _fork_seconds
+    children: typing.List[typing.Tuple[int, int]] = []
+    for partition in partitions[1:]:
+        read_fd, write_fd = os.pipe()
+        start = time.perf_counter()
+        pid = os.fork()
+        if not pid:
+            status = 1
+            try:
+                os.close(read_fd)
+                with os.fdopen(write_fd, "wb") as pipe:
+                    pickle.dump(_check(state, partition), pipe, pickle.HIGHEST_PROTOCOL)
+                status = 0
+            finally:
+                os._exit(status)
+        _fork_seconds = time.perf_counter() - start
+        os.close(write_fd)
+        children.append((pid, read_fd))
+
+    # the generating process checks the first partition while waiting
+    results = [_check(state, partitions[0])]
+    for partition, (pid, read_fd) in zip(partitions[1:], children):
+        with os.fdopen(read_fd, "rb") as pipe:
+            data = pipe.read()
+        _, status = os.waitpid(pid, 0)
+        results.append(pickle.loads(data) if status == 0 else _check(state, partition))
+    return results
+
+
+def reachable_locations(state: CollectionState, locations: typing.Sequence[Location],
+                        workers: int) -> typing.List[Location]:
+    """
+    Returns the locations that state can reach, in the order they were passed in.
+    Uses up to `workers` cores if parallel_mode allows it and checking takes long enough to make up for it.
+    """
+    mode = parallel_mode() if workers > 1 else None
+    if not mode or mode == "threads" and len(locations) < min_locations:
+        return [location for location in locations if location.can_reach(state)]
+
+    for player in state.multiworld.get_all_ids():
+        if state.stale[player]:
+            state.update_reachable_regions(player)
+    if mode == "threads":
+        results = _check_threaded(state, locations, workers)
+    else:
+        # check here until that took as long as forking the children, which then check the rest
+        deadline = time.perf_counter() + fork_seconds() * (workers - 1)
+        checked: typing.List[int] = []
+        for index, location in enumerate(locations):
+            if time.perf_counter() > deadline:
+                rest = [(rest_index, locations[rest_index]) for rest_index in range(index, len(locations))]
+                results = [checked, *_check_forked(state, _partition(rest, workers))]
+                break
+            if location.can_reach(state):
+                checked.append(index)
+        else:
+            return [locations[index] for index in checked]
+    reachable = sorted(index for result in results for index in result)
+    return [locations[index] for index in reachable]
+
+
+def _check_threaded(state: CollectionState, locations: typing.Sequence[Location],
+                    workers: int) -> typing.List[typing.List[int]]:
+    worlds = state.multiworld.worlds
+    read_only: Partition = []
+    others: Partition = []
+    for index, location in enumerate(locations):
+        (read_only if worlds[location.player].read_only_rules else others).append((index, location))
+    partitions = _partition(read_only, workers)
+    if not partitions:
+        return [_check(state, others)]
+    with concurrent.futures.ThreadPoolExecutor(len(partitions)) as pool:
+        results = list(pool.map(_check, [state] * len(partitions), partitions))
+    # the rules of the other worlds may write to the state, so they're checked once no thread reads it anymore
+    results.append(_check(state, others))
+    return results
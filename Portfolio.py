@@ -0,0 +1,180 @@
+"""
+Portfolio generation: running the fill of one multiworld with several seeds at once.
+
+Once the worlds are set up, the generator forks one worker process per additional attempt. Each worker reseeds the
+random state of its copy of the multiworld with a seed derived from the multiworld's seed, runs plando, fill and
+balancing and reports back whether that worked out. Meanwhile the generating process runs attempt 0 itself, which
+keeps the random state as is, so a multiworld that fills fine generates the same with and without portfolio.
+If attempt 0 succeeds, the workers get terminated. Otherwise the first successful worker sends its multiworld back,
+through a checkpoint, and generation continues with that. The winning fill seed can be passed as fill seed to
+reproduce the result.
+
+Forking is required, so on platforms without it generation falls back to a single attempt.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import tempfile
+import typing
+
+from BaseClasses import seeddigits
+from Checkpoint import load_checkpoint, save_checkpoint
+
+if typing.TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+    from multiprocessing.queues import Queue
+    from BaseClasses import MultiWorld
+
+__all__ = ["derive_fill_seed", "reseed_fill", "placement_digest", "run_portfolio", "AttemptResult", "PortfolioError"]
+
+logger = logging.getLogger("Portfolio")
+
+
+class PortfolioError(RuntimeError):
+    pass
+
+
+class AttemptResult(typing.NamedTuple):
+    attempt: int
+    fill_seed: typing.Optional[int]
+    error: typing.Optional[str]
+    """None if the attempt succeeded, otherwise the exception it failed with"""
+    digest: str
+    """placement_digest of a successful worker attempt, empty for attempt 0"""
+
+
+def derive_fill_seed(seed: int, attempt: int) -> typing.Optional[int]:
+    """The fill seed of portfolio attempt `attempt` for a multiworld with `seed`. None for attempt 0."""
+    if not attempt:
+        return None
+    return random.Random(f"{seed}-{attempt}").randint(0, pow(10, seeddigits) - 1)
+
+
+def reseed_fill(multiworld: MultiWorld, fill_seed: int) -> None:
+    """Reseeds the random state of the multiworld and its worlds, right before plando and fill."""
+    multiworld.fill_seed = fill_seed
+    multiworld.random.seed(fill_seed)
+    for player in sorted(multiworld.worlds):
+        multiworld.worlds[player].random.seed(multiworld.random.getrandbits(64))
+
+
+def placement_digest(multiworld: MultiWorld) -> str:
+    """Hash of all placements, to tell whether a replayed fill ended up the same."""
+    placements = sorted((location.player, location.name, location.item.player, location.item.name)
+                        for location in multiworld.get_filled_locations())
+    return hashlib.sha256(repr(placements).encode()).hexdigest()
+
+
+def _describe_error(e: Exception) -> str:
+    # only the first line, FillError includes all placements after that
+    return f"{type(e).__name__}: {(str(e).splitlines() or [''])[0]}"
+
+
+def _run_attempt(multiworld: MultiWorld, attempt: int, fill: typing.Callable[[MultiWorld, int], None],
+                 results: Queue[AttemptResult], connection: Connection) -> None:
+    # the workers' progress would interleave in the log, only the outcome gets logged by the generating process
+    logging.getLogger().setLevel(logging.WARNING)
+    fill_seed = derive_fill_seed(multiworld.seed, attempt)
+    try:
+        reseed_fill(multiworld, fill_seed)
+        fill(multiworld, attempt)
+    except Exception as e:
+        results.put(AttemptResult(attempt, fill_seed, _describe_error(e), ""))
+        return
+    results.put(AttemptResult(attempt, fill_seed, None, placement_digest(multiworld)))
+    # the generating process either asks for the multiworld or terminates this worker
+    path = connection.recv()
+    try:
+        save_checkpoint(multiworld, "portfolio", path)
+    except Exception as e:
+        connection.send(_describe_error(e))
+    else:
+        connection.send(None)
+
+
+def _receive_multiworld(connection: Connection) -> typing.Optional[MultiWorld]:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "attempt.checkpoint")
+        connection.send(path)
+        try:
+            error = connection.recv()
+        except EOFError:
+            error = "The worker exited."
+        if error is None:
+            try:
+                return load_checkpoint(path)[0]
+            except Exception as e:
+                error = _describe_error(e)
+    logger.warning(f"Could not receive the multiworld of the successful fill attempt. {error}")
+    return None
+
+
+def run_portfolio(multiworld: MultiWorld, attempts: int, fill: typing.Callable[[MultiWorld, int], None]
+                  ) -> typing.Tuple[typing.Optional[MultiWorld], AttemptResult]:
+    """
+    Runs `fill(multiworld, attempt)` for `attempts` fill seeds, attempt 0 on `multiworld` itself and the others on
+    forked copies, and returns the multiworld of the first one that succeeds together with its result.
+    The multiworld is None if the winning worker could not send it back, in which case the caller has to replay the
+    winning fill seed on a newly set up multiworld, as `multiworld` got filled by the failed attempt 0.
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        logger.warning("Portfolio generation requires forking processes, which this platform does not support. "
+                       "Continuing with a single attempt.")
+        fill(multiworld, 0)
+        return multiworld, AttemptResult(0, None, None, "")
+
+    context = multiprocessing.get_context("fork")
+    results: Queue[AttemptResult] = context.Queue()
+    connections: typing.List[Connection] = []
+    workers: typing.List[multiprocessing.process.BaseProcess] = []
+    logger.info(f"Running {attempts} fill attempts in parallel.")
+    # the workers get forked before attempt 0 starts changing the multiworld
+    for attempt in range(1, attempts):
+        connection, worker_connection = context.Pipe()
+        worker = context.Process(target=_run_attempt, args=(multiworld, attempt, fill, results, worker_connection),
+                                 name=f"Portfolio attempt {attempt}", daemon=True)
+        worker.start()
+        # so receiving from a worker that died raises EOFError
+        worker_connection.close()
+        connections.append(connection)
+        workers.append(worker)
+    errors: typing.List[str] = []
+    try:
+        try:
+            fill(multiworld, 0)
+        except Exception as e:
+            errors.append(f"Attempt 0: {_describe_error(e)}")
+            logger.info(f"Fill attempt 0 failed: {_describe_error(e)}")
+        else:
+            logger.info("Fill attempt 0 succeeded.")
+            return multiworld, AttemptResult(0, None, None, "")
+
+        pending = attempts - 1
+        while pending:
+            try:
+                result = results.get(timeout=1)
+            except queue.Empty:
+                if any(worker.is_alive() for worker in workers):
+                    continue
+                errors.append(f"{pending} attempts exited without a result.")
+                break
+            pending -= 1
+            if result.error is None:
+                logger.info(f"Fill attempt {result.attempt} succeeded with fill seed {result.fill_seed}.")
+                return _receive_multiworld(connections[result.attempt - 1]), result
+            errors.append(f"Attempt {result.attempt} (fill seed {result.fill_seed}): {result.error}")
+            logger.info(f"Fill attempt {result.attempt} failed: {result.error}")
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+        for connection in connections:
+            connection.close()
+        results.close()
+    raise PortfolioError(f"All {attempts} fill attempts failed.\n" + "\n".join(sorted(errors)))
@@ -0,0 +1,184 @@
+"""
+Opt-in profiling of Location and Entrance rules over a full generation.
+
+The profiler swaps the rules of every Location and Entrance for a wrapper that counts calls and sums up the time spent
+in them, so the rules dominating fill, progression balancing and output can be found in a real multiworld instead of
+one world at a time, like test/benchmark/locations.py does.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import time
+import typing
+
+if typing.TYPE_CHECKING:
+    from BaseClasses import Entrance, Location, MultiWorld
+
+__all__ = ["RuleProfiler"]
+
+logger = logging.getLogger("RuleProfiler")
+
+
+class RuleStats:
+    __slots__ = ("player", "kind", "name", "rule_name", "calls", "time")
+
+    player: int
+    kind: str
+    """"Location" or "Entrance" """
+    name: str
+    rule_name: str
+    """name of the wrapped attribute, "access_rule" or "item_rule" """
+    calls: int
+    time: float
+
+    def __init__(self, player: int, kind: str, name: str, rule_name: str) -> None:
+        self.player = player
+        self.kind = kind
+        self.name = name
+        self.rule_name = rule_name
+        self.calls = 0
+        self.time = 0.
+
+
+class ProfiledRule:
+    """Callable standing in for a rule, forwarding to it and recording the call in its RuleStats."""
+    __slots__ = ("rule", "stats")
+
+    rule: typing.Callable[..., bool]
+    stats: RuleStats
+
+    def __init__(self, rule: typing.Callable[..., bool], stats: RuleStats) -> None:
+        self.rule = rule
+        self.stats = stats
+
+    def __call__(self, *args: typing.Any) -> bool:
+        start = time.perf_counter()
+        try:
+            return self.rule(*args)
+        finally:
+            stats = self.stats
+            stats.calls += 1
+            stats.time += time.perf_counter() - start
+
+
+class RuleProfiler:
+    """
+    Collects rule evaluation statistics for a MultiWorld.
+
+    Usage is `install` once the rules are set, `set_stage` whenever generation moves on to the next step, and
+    `write_report` followed by `uninstall` at the end. Rules that still are the class default are left alone, as are
+    rules that get replaced after `install`. Times are inclusive, so a rule checking `state.can_reach` includes the
+    time of the entrance rules evaluated for it.
+    """
+    multiworld: MultiWorld
+    rules: typing.List[RuleStats]
+    stages: typing.Dict[str, typing.List[float]]
+    """calls and time per generation stage"""
+    stage: typing.Optional[str]
+    _stage_start: typing.Tuple[int, float]
+    _wrapped: typing.List[typing.Tuple[typing.Union[Location, Entrance], str, ProfiledRule]]
+
+    rule_names: typing.ClassVar[typing.Dict[str, typing.Tuple[str, ...]]] = {
+        "Location": ("access_rule", "item_rule"),
+        "Entrance": ("access_rule",),
+    }
+
+    def __init__(self, multiworld: MultiWorld) -> None:
+        self.multiworld = multiworld
+        self.rules = []
+        self.stages = {}
+        self.stage = None
+        self._stage_start = (0, 0.)
+        self._wrapped = []
+
+    def install(self) -> None:
+        from BaseClasses import Entrance, Location
+
+        for kind, default, spots in (("Location", Location, self.multiworld.get_locations()),
+                                     ("Entrance", Entrance, self.multiworld.get_entrances())):
+            for spot in spots:
+                for rule_name in self.rule_names[kind]:
+                    rule = getattr(spot, rule_name)
+                    if rule is getattr(default, rule_name) or isinstance(rule, ProfiledRule):
+                        continue
+                    stats = RuleStats(spot.player, kind, spot.name, rule_name)
+                    wrapper = ProfiledRule(rule, stats)
+                    setattr(spot, rule_name, wrapper)
+                    self.rules.append(stats)
+                    self._wrapped.append((spot, rule_name, wrapper))
+        logger.info(f"Profiling {len(self.rules)} rules.")
+
+    def uninstall(self) -> None:
+        """Puts back the original rules, unless they were replaced since."""
+        self.set_stage(None)
+        for spot, rule_name, wrapper in self._wrapped:
+            if getattr(spot, rule_name) is wrapper:
+                setattr(spot, rule_name, wrapper.rule)
+        self._wrapped.clear()
+
+    def _totals(self) -> typing.Tuple[int, float]:
+        return sum(stats.calls for stats in self.rules), sum(stats.time for stats in self.rules)
+
+    def set_stage(self, stage: typing.Optional[str]) -> None:
+        """Attributes the rule evaluations since the last call to the previous stage and starts counting for `stage`."""
+        calls, total_time = self._totals()
+        if self.stage is not None:
+            stage_stats = self.stages.setdefault(self.stage, [0, 0.])
+            stage_stats[0] += calls - self._stage_start[0]
+            stage_stats[1] += total_time - self._stage_start[1]
+        self.stage = stage
+        self._stage_start = calls, total_time
+
+    def get_report(self) -> typing.Dict[str, typing.Any]:
+        multiworld = self.multiworld
+        calls, total_time = self._totals()
+        worlds: typing.Dict[int, typing.List[float]] = {player: [0, 0.] for player in multiworld.player_ids}
+        for stats in self.rules:
+            world_stats = worlds.setdefault(stats.player, [0, 0.])
+            world_stats[0] += stats.calls
+            world_stats[1] += stats.time
+        return {
+            "seed": multiworld.seed_name,
+            "calls": calls,
+            "time": total_time,
+            "stages": [{"stage": stage, "calls": stage_calls, "time": stage_time}
+                       for stage, (stage_calls, stage_time) in self.stages.items()],
+            "worlds": [{"player": player, "name": multiworld.get_player_name(player), "game": multiworld.game[player],
+                        "calls": world_calls, "time": world_time}
+                       for player, (world_calls, world_time) in sorted(worlds.items(),
+                                                                       key=lambda entry: entry[1][1], reverse=True)],
+            "rules": [{"player": stats.player, "game": multiworld.game[stats.player], "type": stats.kind,
+                       "name": stats.name, "rule": stats.rule_name, "calls": stats.calls, "time": stats.time}
+                      for stats in sorted(self.rules, key=lambda stats: (-stats.time, -stats.calls))
+                      if stats.calls],
+        }
+
+    @staticmethod
+    def format_report(report: typing.Dict[str, typing.Any], top: int = 50) -> str:
+        lines = [f"Rule profile for seed {report['seed']}: {report['calls']} calls, {report['time']:.4f}s total.",
+                 "Times include nested rules, e.g. entrance rules evaluated through state.can_reach.",
+                 "", "Stages:"]
+        lines.extend(f"  {entry['time']:10.4f}s {entry['calls']:12} calls  {entry['stage']}"
+                     for entry in report["stages"])
+        lines.extend(("", "Worlds:"))
+        lines.extend(f"  {entry['time']:10.4f}s {entry['calls']:12} calls  "
+                     f"{entry['name']} (player {entry['player']}, {entry['game']})"
+                     for entry in report["worlds"])
+        lines.extend(("", f"Top {min(top, len(report['rules']))} of {len(report['rules'])} rules:"))
+        lines.extend(f"  {entry['time']:10.4f}s {entry['calls']:12} calls  "
+                     f"{entry['type']} {entry['name']} {entry['rule']} (player {entry['player']}, {entry['game']})"
+                     for entry in report["rules"][:top])
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, base_path: str) -> typing.Tuple[str, str]:
+        """Writes `base_path`.json and `base_path`.txt and returns their paths."""
+        self.set_stage(self.stage)
+        report = self.get_report()
+        json_path = base_path + ".json"
+        text_path = base_path + ".txt"
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        with open(text_path, "w", encoding="utf-8") as f:
+            f.write(self.format_report(report))
+        return json_path, text_path
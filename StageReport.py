@@ -0,0 +1,193 @@
+"""
+Opt-in timing and memory report of the stages of a generation, written as JSON next to the output.
+
+Every stage records its wall time, the CPU time of the whole process and the resident set size of the process when it
+finished. If tracemalloc is tracing, for example through PYTHONTRACEMALLOC=1, the peak of traced Python allocations
+during the stage is recorded as well. Tracing is not started here, as it slows down generation considerably.
+Stages can be nested, like the steps of fill inside of fill.
+
+Work running on other threads, like generate_output, is recorded as tasks instead, with the CPU time of its thread.
+The methods of each world are recorded per player through AutoWorld's call_single and call_stage.
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import typing
+
+from Utils import version_tuple
+
+if typing.TYPE_CHECKING:
+    from BaseClasses import MultiWorld
+
+__all__ = ["StageReport", "report_stage", "report_task"]
+
+logger = logging.getLogger("StageReport")
+
+
+def _rss() -> typing.Tuple[typing.Optional[int], typing.Optional[int]]:
+    """Current and peak resident set size of the process in bytes, None where the platform can't tell."""
+    current: typing.Optional[int] = None
+    peak: typing.Optional[int] = None
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        pass
+    else:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform != "darwin":  # kilobytes everywhere but macOS
+            peak *= 1024
+    return current, peak
+
+
+class StageStats:
+    __slots__ = ("name", "parent", "thread", "wall", "cpu", "rss", "rss_peak", "tracemalloc_peak")
+
+    name: str
+    parent: typing.Optional[str]
+    thread: bool
+    """whether this is a task on another thread, whose cpu time only counts its own thread"""
+    wall: float
+    cpu: float
+    rss: typing.Optional[int]
+    rss_peak: typing.Optional[int]
+    tracemalloc_peak: typing.Optional[int]
+
+    def __init__(self, name: str, parent: typing.Optional[str], thread: bool) -> None:
+        self.name = name
+        self.parent = parent
+        self.thread = thread
+        self.wall = 0.
+        self.cpu = 0.
+        self.rss = None
+        self.rss_peak = None
+        self.tracemalloc_peak = None
+
+
+class StageReport:
+    """
+    Collects the stages of a generation. Main creates one per generation with --stage_report and sets it as
+    `multiworld.stage_report`, `report_stage` and `report_task` record to it from anywhere that has the multiworld.
+    """
+    stages: typing.List[StageStats]
+    world_calls: typing.Dict[typing.Tuple[str, int, str], typing.List[float]]
+    """wall and cpu time per game, player and method; player 0 for stage_ methods of a world type"""
+    _open: typing.List[StageStats]
+    """sequential stages currently running, innermost last"""
+    _peaks: typing.List[int]
+    """tracemalloc peak of each open stage up to its last nested stage"""
+    _lock: threading.Lock
+    _start: typing.Tuple[float, float]
+
+    def __init__(self) -> None:
+        self.stages = []
+        self.world_calls = {}
+        self._open = []
+        self._peaks = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter(), time.process_time()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> typing.Iterator[StageStats]:
+        """Records a stage run by the generating thread. Stages entered while it runs are nested into it."""
+        stats = StageStats(name, self._open[-1].name if self._open else None, False)
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self._open.append(stats)
+        self._peaks.append(0)
+        with self._lock:
+            self.stages.append(stats)
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield stats
+        finally:
+            stats.wall = time.perf_counter() - start_wall
+            stats.cpu = time.process_time() - start_cpu
+            stats.rss, stats.rss_peak = _rss()
+            self._open.pop()
+            peak = self._peaks.pop()
+            if tracing and tracemalloc.is_tracing():
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                stats.tracemalloc_peak = peak
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+
+    @contextlib.contextmanager
+    def task(self, name: str, parent: typing.Optional[str]) -> typing.Iterator[StageStats]:
+        """Records work running on a thread of its own, like one of the output files."""
+        stats = StageStats(name, parent, True)
+        with self._lock:
+            self.stages.append(stats)
+        start_wall, start_cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield stats
+        finally:
+            stats.wall = time.perf_counter() - start_wall
+            stats.cpu = time.thread_time() - start_cpu
+            stats.rss, stats.rss_peak = _rss()
+
+    def record_world_call(self, game: str, player: int, method_name: str, wall: float, cpu: float) -> None:
+        with self._lock:
+            times = self.world_calls.setdefault((game, player, method_name), [0., 0.])
+            times[0] += wall
+            times[1] += cpu
+
+    def get_report(self, multiworld: MultiWorld) -> typing.Dict[str, typing.Any]:
+        wall = time.perf_counter() - self._start[0]
+        cpu = time.process_time() - self._start[1]
+        rss, rss_peak = _rss()
+        games: typing.Dict[str, int] = {}
+        for player in multiworld.player_ids:
+            games[multiworld.game[player]] = games.get(multiworld.game[player], 0) + 1
+        with self._lock:
+            stages = list(self.stages)
+            world_calls = sorted(self.world_calls.items(), key=lambda entry: entry[0][1:])
+        return {
+            "seed": multiworld.seed_name,
+            "version": list(version_tuple),
+            "python": sys.version,
+            "players": len(multiworld.player_ids),
+            "games": games,
+            "tracemalloc": tracemalloc.is_tracing(),
+            "wall": wall,
+            "cpu": cpu,
+            "rss": rss,
+            "rss_peak": rss_peak,
+            "stages": [{slot: getattr(stats, slot) for slot in StageStats.__slots__} for stats in stages],
+            "worlds": [{"player": player, "name": multiworld.player_name.get(player) if player else None,
+                        "game": game, "method": method_name, "wall": call_wall, "cpu": call_cpu}
+                       for (game, player, method_name), (call_wall, call_cpu) in world_calls],
+        }
+
+    def write_report(self, multiworld: MultiWorld, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.get_report(multiworld), f, indent=1)
+
+
+def report_stage(multiworld: MultiWorld, name: str) -> typing.ContextManager[typing.Optional[StageStats]]:
+    """Records the enclosed code as stage `name` if the multiworld has a StageReport, otherwise does nothing."""
+    if multiworld.stage_report:
+        return multiworld.stage_report.stage(name)
+    return contextlib.nullcontext()
+
+
+def report_task(multiworld: MultiWorld, name: str,
+                parent: typing.Optional[str] = None) -> typing.ContextManager[typing.Optional[StageStats]]:
+    """Like report_stage, for work running on a thread other than the generating one."""
+    if multiworld.stage_report:
+        return multiworld.stage_report.task(name, parent)
+    return contextlib.nullcontext()
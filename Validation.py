@@ -0,0 +1,143 @@
+"""
+Sanity checks run during generation, at a configurable cost.
+
+off: no checks.
+cheap: checks that run in linear time, using identity sets and address maps. (Default)
+exhaustive: additionally cross-references items and locations against the rest of the multiworld and location
+    addresses against the worlds' name to id mappings. Still linear per check, but walks the whole item pool and all
+    locations. Item references shared between locations are logged as warnings.
+"""
+from __future__ import annotations
+
+import logging
+import typing
+from enum import IntEnum
+
+if typing.TYPE_CHECKING:
+    from BaseClasses import Item, MultiWorld
+
+__all__ = ["ValidationLevel", "ValidationError", "NewItemValidation", "validate_new_items", "validate_placements"]
+
+logger = logging.getLogger("Validation")
+
+
+class ValidationLevel(IntEnum):
+    off = 0
+    cheap = 1
+    exhaustive = 2
+
+    @classmethod
+    def from_any(cls, value: typing.Union[str, int, ValidationLevel]) -> ValidationLevel:
+        if isinstance(value, str):
+            try:
+                return cls[value.strip().lower()]
+            except KeyError:
+                raise ValueError(f"Validation level {value} not recognized. "
+                                 f"Valid levels are: {', '.join(level.name for level in cls)}") from None
+        return cls(value)
+
+
+class ValidationError(Exception):
+    pass
+
+
+def validate_new_items(multiworld: MultiWorld, player: int, new_items: typing.Sequence[Item],
+                       known_items: typing.Optional[typing.Set[int]] = None) -> None:
+    """
+    Checks the items a world added to the item pool in one step.
+    `known_items` are the ids of the items that were in the item pool or start inventories before.
+    The exhaustive level adds the ids of `new_items` to it, so it can be passed on to the check of the next step.
+    """
+    if multiworld.validation < ValidationLevel.cheap:
+        return
+    seen: typing.Set[int] = set()
+    for item in new_items:
+        if id(item) in seen:
+            raise ValidationError(
+                f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
+                f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+        seen.add(id(item))
+
+    if multiworld.validation >= ValidationLevel.exhaustive:
+        if known_items is None:
+            previous_items = multiworld.itempool[:-len(new_items)] if new_items else multiworld.itempool
+            known_items = {id(item) for items in (previous_items, *multiworld.precollected_items.values())
+                           for item in items}
+        for item in new_items:
+            if item.player not in multiworld.worlds:  # players and groups
+                raise ValidationError(f"Item \"{item.name}\" created by player \"{multiworld.player_name[player]}\" "
+                                      f"belongs to unknown player {item.player}.")
+            if id(item) in known_items:
+                raise ValidationError(
+                    f"Item \"{item.name}\" added by player \"{multiworld.player_name[player]}\" "
+                    f"is already in the item pool or start inventory. Please make a copy instead.")
+        known_items.update(seen)
+
+
+class NewItemValidation:
+    """
+    Checks the items each world adds to the item pool in the steps of one stage, see AutoWorld.call_all.
+    The exhaustive level indexes the item pool and start inventories once for the stage instead of once per step.
+    """
+    multiworld: MultiWorld
+    known_items: typing.Optional[typing.Set[int]]
+    """ids of the items in the item pool and start inventories, for the exhaustive level"""
+    precollected_counts: typing.Dict[int, int]
+
+    def __init__(self, multiworld: MultiWorld) -> None:
+        self.multiworld = multiworld
+        self.known_items = None
+        self.precollected_counts = {}
+        if multiworld.validation >= ValidationLevel.exhaustive:
+            self.known_items = {id(item) for items in (multiworld.itempool, *multiworld.precollected_items.values())
+                                for item in items}
+            self.precollected_counts = {player: len(items)
+                                        for player, items in multiworld.precollected_items.items()}
+
+    def validate_step(self, player: int, new_items: typing.Sequence[Item]) -> None:
+        validate_new_items(self.multiworld, player, new_items, self.known_items)
+
+    def finish(self) -> None:
+        """Checks the items added to the start inventories during the stage."""
+        if self.known_items is None:
+            return
+        for player, items in self.multiworld.precollected_items.items():
+            for item in items[self.precollected_counts.get(player, 0):]:
+                if id(item) in self.known_items:
+                    raise ValidationError(
+                        f"Item \"{item.name}\" added to the start inventory of player "
+                        f"\"{self.multiworld.player_name[player]}\" is already in the item pool or a start "
+                        f"inventory. Please make a copy instead.")
+                self.known_items.add(id(item))
+
+
+def validate_placements(multiworld: MultiWorld) -> None:
+    """Checks the filled locations that will be written to multidata."""
+    if multiworld.validation < ValidationLevel.cheap:
+        return
+    exhaustive = multiworld.validation >= ValidationLevel.exhaustive
+    addresses: typing.Dict[int, typing.Dict[int, typing.Any]] = {player: {} for player in multiworld.player_ids}
+    placed_items: typing.Set[int] = set()
+    for location in multiworld.get_filled_locations():
+        if exhaustive:
+            # reusing an Item works out as long as nothing modifies it later, so these only get reported
+            if id(location.item) in placed_items:
+                logger.warning(f"Item {location.item} is placed at more than one location, one being {location}.")
+            elif location.item.location is not location:
+                logger.warning(f"Item {location.item} at {location} thinks it is at {location.item.location}.")
+            placed_items.add(id(location.item))
+        if type(location.address) is not int:
+            continue
+        if location.item.code is None:
+            raise ValidationError(f"item code None should be event, location.address should then also be None. "
+                                  f"Location: {location}, Item: {location.item}")
+        player_addresses = addresses[location.player]
+        if location.address in player_addresses:
+            raise ValidationError(f"Locations with duplicate address. {location} and "
+                                  f"{player_addresses[location.address]}")
+        player_addresses[location.address] = location
+        if exhaustive:
+            location_world = multiworld.worlds[location.player]
+            if location_world.location_name_to_id.get(location.name, location.address) != location.address:
+                raise ValidationError(f"{location} has address {location.address}, but its world lists "
+                                      f"{location_world.location_name_to_id[location.name]}.")
@@ -19,10 +19,11 @@ from pony.orm import commit, db_session, select
 
 import Utils
 
+from DataPackageStore import data_package_store
 from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert
 from Utils import restricted_loads, cache_argsless
 from .locker import Locker
-from .models import Command, GameDataPackage, Room, db
+from .models import Command, Room, db, load_game_data_package
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -126,9 +127,12 @@ class WebHostContext(Context):
                     # games package could be dropped from static data once all rooms embed data package
                     del multidata["datapackage"][game]
                 else:
-                    row = GameDataPackage.get(checksum=game_data["checksum"])
-                    if row:  # None if rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
-                        game_data_packages[game] = Utils.restricted_loads(row.data)
+                    # shared with the other rooms of this process
+                    data_package = data_package_store.load(game_data["checksum"], functools.partial(
+                        load_game_data_package, game_data["checksum"]))
+                    # None if rolled on >= 0.3.9 but uploaded to <= 0.3.8. multidata should be complete
+                    if data_package:
+                        game_data_packages[game] = data_package
                         continue
                     else:
                         self.logger.warning(f"Did not find game_data_package for {game}: {game_data['checksum']}")
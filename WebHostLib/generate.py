@@ -16,7 +16,7 @@ from Generate import PlandoOptions, handle_name
 from Main import main as ERmain
 from Utils import __version__
 from WebHostLib import app
-from settings import ServerOptions, GeneratorOptions
+from settings import ServerOptions, GeneratorOptions, get_settings
 from worlds.alttp.EntranceRandomizer import parse_arguments
 from .check import get_yaml_data, roll_options
 from .models import Generation, STATE_ERROR, STATE_QUEUED, Seed, UUID
@@ -135,6 +135,16 @@ def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=Non
                                                                        {"bosses", "items", "connections", "texts"}))
         erargs.skip_prog_balancing = False
         erargs.skip_output = False
+        erargs.profile_rules = False
+        erargs.stage_report = False
+        erargs.validation = get_settings().generator.validation
+        erargs.fill_seed = None
+        # generation already runs in a pool of worker processes
+        erargs.portfolio = 0
+        erargs.sphere_workers = 0
+        erargs.output_processes = 0
+        erargs.checkpoint = None
+        erargs.resume = None
         erargs.csv_output = False
 
         name_counter = Counter()
@@ -1,3 +1,4 @@
+import typing
 from datetime import datetime
 from uuid import UUID, uuid4
 from pony.orm import Database, PrimaryKey, Required, Set, Optional, buffer, LongStr
@@ -61,3 +62,10 @@ class Generation(db.Entity):
 class GameDataPackage(db.Entity):
     checksum = PrimaryKey(str)
     data = Required(bytes)
+
+
+def load_game_data_package(checksum: str) -> typing.Optional[dict]:
+    """Loads the data package with `checksum` from the database. None if it's not there."""
+    from Utils import restricted_loads
+    row = GameDataPackage.get(checksum=checksum)
+    return restricted_loads(row.data) if row else None
@@ -1,5 +1,6 @@
 import datetime
 import collections
+import functools
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
 from uuid import UUID
@@ -8,11 +9,12 @@ from email.utils import parsedate_to_datetime
 from flask import make_response, render_template, request, Request, Response
 from werkzeug.exceptions import abort
 
+from DataPackageStore import data_package_store
 from MultiServer import Context, get_saving_second
 from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
 from Utils import restricted_loads, KeyedDefaultDict
 from . import app, cache
-from .models import GameDataPackage, Room
+from .models import Room, load_game_data_package
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
@@ -71,7 +73,9 @@ class TrackerData:
             game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
         })
         for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
+            # shared with the other trackers and rooms of this process
+            game_package = data_package_store.load(game_package["checksum"],
+                                                   functools.partial(load_game_data_package, game_package["checksum"]))
             self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
                 id: name for name, id in game_package["item_name_to_id"].items()})
             self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
@@ -4,7 +4,6 @@ import pickle
 import typing
 import uuid
 import zipfile
-import zlib
 
 from io import BytesIO
 from flask import request, flash, redirect, url_for, session, render_template, abort
@@ -14,6 +13,7 @@ from pony.orm.core import TransactionIntegrityError
 import schema
 
 import MultiServer
+from Multidata import dump_multidata
 from NetUtils import SlotType
 from Utils import VersionException, __version__
 from worlds import GamesPackage
@@ -59,6 +59,7 @@ def process_multidata(compressed_multidata, files={}):
         game_data_packages: typing.List[GameDataPackage] = []
         for game, game_data in decompressed_multidata["datapackage"].items():
             if game_data.get("checksum"):
+                game_data = dict(game_data)  # shared with the rest of the process
                 original_checksum = game_data.pop("checksum")
                 game_data = games_package_schema.validate(game_data)
                 game_data = {key: value for key, value in sorted(game_data.items())}
@@ -92,7 +93,7 @@ def process_multidata(compressed_multidata, files={}):
                            game=slot_info.game))
         flush()  # commit slots
 
-    compressed_multidata = compressed_multidata[0:1] + zlib.compress(pickle.dumps(decompressed_multidata), 9)
+    compressed_multidata = dump_multidata(decompressed_multidata, compressed_multidata[0])
     return slots, compressed_multidata
 
 
@@ -11,7 +11,7 @@ This is deliberately .pyx because using a non-compiled "pure python" may be slow
 import cython
 import warnings
 from cpython cimport PyObject
-from typing import Any, Dict, Iterable, Iterator, Generator, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
+from typing import Any, Dict, Iterable, Iterator, Generator, Mapping, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
 from cymem.cymem cimport Pool
 from libc.stdint cimport int64_t, uint32_t
 from collections import defaultdict
@@ -108,13 +108,104 @@ cdef class LocationStore:
         size += sizeof(self._raw_proxies[0]) * self.sender_index_size
         return size
 
-    def __init__(self, locations_dict: Dict[int, Dict[int, Sequence[int]]]) -> None:
+    def __init__(self, locations_dict: Mapping[int, Mapping[int, Sequence[int]]]) -> None:
         self._mem = Pool()
         cdef object key
         self._keys = []
         self._items = []
         self._proxies = []
 
+        # the locations of a v4 multidata are columns that we can copy without creating python objects
+        columns = getattr(locations_dict, "columns", None)
+        if columns is not None:
+            senders, sender, location, item, receiver, flags = columns
+            self._init_columns(senders, sender, location, item, receiver, flags)
+        else:
+            self._init_dict(locations_dict)
+
+        # build pyobject caches
+        cdef size_t max_sender = self.sender_index_size - 1
+        cdef size_t count = self.entry_count
+        self._proxies.append(None)  # player 0
+        assert self.sender_index[0].count == 0
+        for i in range(1, max_sender + 1):
+            assert self.sender_index[i].count == 0 or (
+                    self.sender_index[i].start < count and
+                    self.sender_index[i].start + self.sender_index[i].count <= count)
+            key = i  # allocate python integer
+            proxy = PlayerLocationProxy(self, i)
+            self._keys.append(key)
+            self._items.append((key, proxy))
+            self._proxies.append(proxy)
+            self._raw_proxies[i] = <PyObject*>proxy
+
+    cdef _alloc(self, size_t max_sender, size_t count):
+        # allocate the arrays and invalidate index (0xff...)
+        if count:
+            # leaving entries as NULL if there are none, makes potential memory errors more visible
+            self.entries = <LocationEntry*>self._mem.alloc(count, sizeof(LocationEntry))
+        self.sender_index = <IndexEntry*>self._mem.alloc(max_sender + 1, sizeof(IndexEntry))
+        self._raw_proxies = <PyObject**>self._mem.alloc(max_sender + 1, sizeof(PyObject*))
+
+        assert (not self.entries) == (not count)
+        assert self.sender_index
+        assert self._raw_proxies
+
+        self.sender_index_size = max_sender + 1
+        self.entry_count = count
+        self._len = max_sender
+
+    cdef _init_columns(self, const uint32_t[:] senders, const uint32_t[:] sender_column,
+                       const int64_t[:] location_column, const int64_t[:] item_column,
+                       const uint32_t[:] receiver_column, const uint32_t[:] flags_column):
+        cdef Py_ssize_t sender_count = senders.shape[0]
+        cdef Py_ssize_t count = sender_column.shape[0]
+        cdef Py_ssize_t i
+        cdef ap_player_t sender
+        cdef ap_player_t receiver
+        cdef ap_player_t last_sender = 0
+        cdef ap_id_t location
+        cdef ap_id_t last_location = 0
+
+        if not sender_count:
+            raise ValueError(f"Rejecting game with 0 players")
+        if sender_count > MAX_PLAYER_ID:
+            raise ValueError(f"Invalid player id {sender_count} for location")
+        for i in range(sender_count):
+            if senders[i] != <ap_player_t>(i + 1):
+                raise ValueError("Player IDs not continuous")
+        if (location_column.shape[0] != count or item_column.shape[0] != count or
+                receiver_column.shape[0] != count or flags_column.shape[0] != count):
+            raise ValueError("Location columns differ in length")
+
+        if not count:
+            warnings.warn("Game has no locations")
+
+        self._alloc(sender_count, count)
+
+        # the columns are sorted by sender, then location, like the entries
+        for i in range(count):
+            sender = sender_column[i]
+            location = location_column[i]
+            receiver = receiver_column[i]
+            if sender < 1 or sender > <ap_player_t>sender_count:
+                raise ValueError(f"Invalid player id {sender} for location")
+            if receiver < 1 or receiver > MAX_PLAYER_ID:
+                raise ValueError(f"Invalid player id {receiver} for item")
+            if sender < last_sender or (sender == last_sender and location <= last_location):
+                raise ValueError("Location columns not sorted")
+            if sender != last_sender:
+                self.sender_index[sender].start = i
+            self.sender_index[sender].count += 1
+            self.entries[i].sender = sender
+            self.entries[i].location = location
+            self.entries[i].item = item_column[i]
+            self.entries[i].receiver = receiver
+            self.entries[i].flags = flags_column[i]
+            last_sender = sender
+            last_location = location
+
+    cdef _init_dict(self, object locations_dict):
         # iterate over everything to get all maxima and validate everything
         cdef size_t max_sender = INVALID_SIZE  # keep track of highest used player id for indexing
         cdef size_t sender_count = 0
@@ -144,16 +235,7 @@ cdef class LocationStore:
         if not count:
             warnings.warn("Game has no locations")
 
-        # allocate the arrays and invalidate index (0xff...)
-        if count:
-            # leaving entries as NULL if there are none, makes potential memory errors more visible
-            self.entries = <LocationEntry*>self._mem.alloc(count, sizeof(LocationEntry))
-        self.sender_index = <IndexEntry*>self._mem.alloc(max_sender + 1, sizeof(IndexEntry))
-        self._raw_proxies = <PyObject**>self._mem.alloc(max_sender + 1, sizeof(PyObject*))
-
-        assert (not self.entries) == (not count)
-        assert self.sender_index
-        assert self._raw_proxies
+        self._alloc(max_sender, count)
 
         # build entries and index
         cdef size_t i = 0
@@ -172,24 +254,6 @@ cdef class LocationStore:
                 self.sender_index[sender].count += 1
                 i += 1
 
-        # build pyobject caches
-        self._proxies.append(None)  # player 0
-        assert self.sender_index[0].count == 0
-        for i in range(1, max_sender + 1):
-            assert self.sender_index[i].count == 0 or (
-                    self.sender_index[i].start < count and
-                    self.sender_index[i].start + self.sender_index[i].count <= count)
-            key = i  # allocate python integer
-            proxy = PlayerLocationProxy(self, i)
-            self._keys.append(key)
-            self._items.append((key, proxy))
-            self._proxies.append(proxy)
-            self._raw_proxies[i] = <PyObject*>proxy
-
-        self.sender_index_size = max_sender + 1
-        self.entry_count = count
-        self._len = sender_count
-
     # fake dict access
     def __len__(self) -> int:
         return self._len
@@ -674,6 +674,64 @@ class GeneratorOptions(Group):
         start_inventory -> Move remaining items to start_inventory, generate additional filler items to fill locations.
         """
 
+    class Validation(str):
+        """
+        How thoroughly to check the generated multiworld for errors made by worlds.
+        off -> No checks.
+        cheap -> Checks that take linear time, like duplicate item references and location addresses. (Default)
+        exhaustive -> Also cross-check items and locations against the whole multiworld and the worlds' ids.
+        """
+
+    class Portfolio(int):
+        """
+        Number of fill attempts to run in parallel processes, each with a seed derived from the generation seed.
+        The first one that succeeds is kept, its fill seed is logged and written to the spoiler to reproduce it.
+        0 or 1 to fill once. Requires a platform that can fork processes.
+        """
+
+    class SphereWorkers(int):
+        """
+        Number of cores to check location rules on while computing spheres, for example for the playthrough and the
+        accessibility check. Only pays off for multiworlds with thousands of locations. The spheres are the same as
+        with a single core. 0 or 1 to use a single core.
+        """
+
+    class OutputProcesses(int):
+        """
+        Number of processes to run the output of worlds in, for worlds that support it. Pays off for seeds with many
+        ROMs to patch, which output threads would patch one after another. 0 or 1 to output in threads only.
+        Requires a platform that can fork processes.
+        """
+
+    class ZipCompressionLevel(int):
+        """
+        Deflate level from 0 to 9 to compress the output zip with, 0 to only store files.
+        Patch files and other files that are compressed already are always stored.
+        """
+
+    class MultidataFormat(int):
+        """
+        Format of the multidata (.archipelago) in the output. 3 can be hosted by every MultiServer and WebHost.
+        4 splits it into sections, so hosting large seeds loads faster and takes less memory,
+        but needs a host of this version or newer.
+        """
+
+    class YamlWorkers(int):
+        """
+        Number of processes to parse and roll player files in. Pays off for hundreds of player files.
+        Any number above 0 rolls each player file with its own seed drawn from the generation seed, so the results
+        differ from 0 but not between different numbers of processes. 0 to parse and roll one file after another.
+        Requires a platform that can fork processes, otherwise all files are parsed and rolled in one process.
+        """
+
+    class YamlCache(Bool):
+        """
+        Keep parsed player files in the "yaml" folder of the user cache directory (for example ~/.cache/Archipelago/yaml
+        on Linux), so generating the same player files again skips parsing them. Entries are pickle files, keyed by the
+        hash of the file content and the Archipelago and PyYAML versions, and only ever get loaded as plain yaml data.
+        Nothing removes old entries, delete the folder to clear it.
+        """
+
     enemizer_path: EnemizerPath = EnemizerPath("EnemizerCLI/EnemizerCLI.Core")  # + ".exe" is implied on Windows
     player_files_path: PlayerFilesPath = PlayerFilesPath("Players")
     players: Players = Players(0)
@@ -683,6 +741,14 @@ class GeneratorOptions(Group):
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
+    validation: Validation = Validation("cheap")
+    portfolio: Portfolio = Portfolio(0)
+    sphere_workers: SphereWorkers = SphereWorkers(0)
+    output_processes: OutputProcesses = OutputProcesses(0)
+    zip_compression_level: ZipCompressionLevel = ZipCompressionLevel(9)
+    multidata_format: MultidataFormat = MultidataFormat(3)
+    yaml_workers: YamlWorkers = YamlWorkers(0)
+    yaml_cache: Union[YamlCache, bool] = False
     loglevel: str = "info"
     logtime: bool = False
 
@@ -5,3 +5,5 @@ if __name__ == "__main__":
     load_worlds.run_load_worlds_benchmark()
     import locations
     locations.run_locations_benchmark()
+    import validation
+    validation.run_validation_benchmark()
@@ -0,0 +1,62 @@
+def run_spheres_benchmark():
+    """Time the sphere loops of a large multiworld on one core and on several cores."""
+    import argparse
+    import logging
+    import os
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from BaseClasses import CollectionState, MultiWorld
+    from Fill import distribute_items_restrictive
+    from ParallelReach import parallel_mode
+    from worlds import AutoWorld
+    from worlds.AutoWorld import call_all
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--game", default="Timespinner")
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    with TimeIt(f"Generating {args.players} players of {args.game}", logger):
+        multiworld = MultiWorld(args.players)
+        multiworld.game = {player: args.game for player in multiworld.player_ids}
+        multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+        multiworld.set_seed(0)
+        multiworld.state = CollectionState(multiworld)
+        options = argparse.Namespace()
+        for name, option in AutoWorld.AutoWorldRegister.world_types[args.game].options_dataclass.type_hints.items():
+            setattr(options, name, {player: option.from_any(option.default) for player in multiworld.player_ids})
+        multiworld.set_options(options)
+        for step in ("generate_early", "create_regions", "create_items", "set_rules", "connect_entrances",
+                     "generate_basic", "pre_fill"):
+            call_all(multiworld, step)
+        distribute_items_restrictive(multiworld)
+        call_all(multiworld, "post_fill")
+    logger.info(f"{len(multiworld.get_filled_locations())} filled locations, "
+                f"checking them in parallel with {parallel_mode()}")
+
+    results = {}
+    for workers in (1, args.workers):
+        multiworld.sphere_workers = workers
+        multiworld.sphere_cache.invalidate()
+        with TimeIt(f"get_spheres with {workers} workers", logger) as t:
+            spheres = list(multiworld.get_spheres())
+        with TimeIt(f"can_beat_game with {workers} workers", logger) as t_beat:
+            beatable = multiworld.can_beat_game(CollectionState(multiworld))
+        with TimeIt(f"fulfills_accessibility with {workers} workers", logger) as t_access:
+            accessible = multiworld.fulfills_accessibility()
+        results[workers] = spheres, beatable, accessible
+        logger.info(f"{workers} workers: get_spheres {t.dif:.2f}s ({len(spheres)} spheres), "
+                    f"can_beat_game {t_beat.dif:.2f}s, fulfills_accessibility {t_access.dif:.2f}s")
+    assert results[1] == results[args.workers], "spheres differ between one core and several cores"
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_spheres_benchmark()
@@ -0,0 +1,100 @@
+def run_validation_benchmark():
+    """Time the generation sanity checks of each validation level for growing item pools and location counts."""
+    import argparse
+    import logging
+    import typing
+
+    from time_it import TimeIt
+
+    from Utils import init_logging
+    from BaseClasses import CollectionState, Item, ItemClassification, Location, MultiWorld, Region
+    from Validation import ValidationLevel, validate_placements
+    from worlds import AutoWorld
+    from worlds.AutoWorld import call_all
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    pool_sizes = (1_000, 2_000, 4_000, 8_000, 16_000, 32_000)
+    quadratic_limit = 4_000  # the previous check takes minutes past this
+    repeats = 10
+
+    def quadratic_check(multiworld: MultiWorld, player: int, new_items: typing.List[Item]) -> None:
+        """The nested loop call_all used to run when __debug__ was set."""
+        for i, item in enumerate(new_items):
+            for other in new_items[i + 1:]:
+                assert item is not other, (
+                    f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
+                    f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+
+    def create_multiworld(size: int, players: int = 1) -> MultiWorld:
+        multiworld = MultiWorld(players)
+        multiworld.game = {player: "Archipelago" for player in multiworld.player_ids}
+        multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+        multiworld.set_seed(0)
+        multiworld.state = CollectionState(multiworld)
+        args = argparse.Namespace()
+        for name, option in AutoWorld.AutoWorldRegister.world_types["Archipelago"].options_dataclass.type_hints.items():
+            setattr(args, name, {player: option.from_any(option.default) for player in multiworld.player_ids})
+        multiworld.set_options(args)
+        for player in multiworld.player_ids:
+            region = Region("Menu", player, multiworld)
+            multiworld.regions.append(region)
+            start = (player - 1) * size // players
+            end = player * size // players
+            items = [Item(f"Item {i}", ItemClassification.filler, i, player) for i in range(start, end)]
+            locations = [Location(player, f"Location {i}", i, region) for i in range(start, end)]
+            region.locations += locations
+            for location, item in zip(locations, items):
+                location.place_locked_item(item)
+
+            def create_items(items: typing.List[Item] = items) -> None:
+                multiworld.itempool += items
+
+            multiworld.worlds[player].create_items = create_items
+        return multiworld
+
+    for size in pool_sizes:
+        multiworld = create_multiworld(size)
+        results: typing.Dict[str, float] = {}
+        for level in ValidationLevel:
+            multiworld.validation = level
+            with TimeIt(f"{size} items call_all at {level.name}") as t:
+                for _ in range(repeats):
+                    multiworld.itempool.clear()
+                    call_all(multiworld, "create_items")
+            results[f"call_all {level.name}"] = t.dif / repeats
+            with TimeIt(f"{size} locations validate_placements at {level.name}") as t:
+                for _ in range(repeats):
+                    validate_placements(multiworld)
+            results[f"placements {level.name}"] = t.dif / repeats
+        if size <= quadratic_limit:
+            with TimeIt(f"{size} items previous __debug__ check") as t:
+                quadratic_check(multiworld, 1, multiworld.itempool)
+            results["previous __debug__ check"] = t.dif
+
+        baseline = results["call_all off"]
+        logger.info(f"{size} items: " + ", ".join(
+            f"{name} {(time - baseline if name.startswith('call_all') else time) * 1000:.3f}ms"
+            for name, time in results.items()))
+
+    # the exhaustive checks should grow with the item pool, not with the item pool times the players adding to it
+    size = pool_sizes[-1]
+    for players in (1, 10, 100, 1000):
+        multiworld = create_multiworld(size, players)
+        results = {}
+        for level in ValidationLevel:
+            multiworld.validation = level
+            with TimeIt(f"{size} items of {players} players call_all at {level.name}") as t:
+                for _ in range(repeats):
+                    multiworld.itempool.clear()
+                    call_all(multiworld, "create_items")
+            results[level.name] = t.dif / repeats
+        logger.info(f"{size} items of {players} players: " + ", ".join(
+            f"call_all {name} {(time - results['off']) * 1000:.3f}ms" for name, time in results.items()))
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_validation_benchmark()
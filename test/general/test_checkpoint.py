@@ -0,0 +1,93 @@
+import os
+import pickle
+import sys
+import threading
+import unittest
+import zlib
+from tempfile import TemporaryDirectory
+
+from BaseClasses import MultiWorld, Region
+from Checkpoint import CheckpointError, load_checkpoint, save_checkpoint
+from Fill import distribute_items_restrictive
+from Portfolio import placement_digest
+from worlds import AutoWorldRegister
+from . import generate_locations, generate_test_multiworld, setup_solo_multiworld
+
+
+class TestCheckpoint(unittest.TestCase):
+    temp_dir: TemporaryDirectory
+    path: str
+
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "test.checkpoint")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def round_trip(self, multiworld: MultiWorld) -> MultiWorld:
+        save_checkpoint(multiworld, "pre_fill", self.path)
+        loaded, stage = load_checkpoint(self.path)
+        self.assertEqual(stage, "pre_fill")
+        return loaded
+
+    def test_rule_closures(self) -> None:
+        """Tests that lambdas and closures keep what they reference, including the multiworld itself"""
+        multiworld = setup_solo_multiworld(AutoWorldRegister.world_types["A Link to the Past"])
+        loaded = self.round_trip(multiworld)
+        self.assertIsNot(loaded, multiworld)
+        for location in loaded.get_locations():
+            original = multiworld.get_location(location.name, location.player)
+            self.assertEqual(location.access_rule(loaded.state), original.access_rule(multiworld.state),
+                             location.name)
+        state = loaded.get_all_state(False)
+        self.assertTrue(all(location.can_reach(state) for location in loaded.get_locations()))
+
+    def test_same_fill(self) -> None:
+        """Tests that fill continues the same way from a checkpoint as it would have without saving one"""
+        for game in ("Hollow Knight", "Ocarina of Time"):
+            with self.subTest(game):
+                multiworld = setup_solo_multiworld(AutoWorldRegister.world_types[game], seed=1)
+                loaded = self.round_trip(multiworld)
+                distribute_items_restrictive(multiworld)
+                distribute_items_restrictive(loaded)
+                self.assertEqual(placement_digest(loaded), placement_digest(multiworld))
+
+    def test_long_region_chain(self) -> None:
+        """Tests that a chain of regions far longer than the recursion limit gets saved and loaded"""
+        multiworld = generate_test_multiworld(1)
+        region = multiworld.get_region("Menu", 1)
+        length = sys.getrecursionlimit() * 5
+        for index in range(length):
+            next_region = Region(f"Region {index}", 1, multiworld)
+            multiworld.regions.append(next_region)
+            generate_locations(1, 1, next_region, None, f"_{index}")
+            region.connect(next_region)
+            region = next_region
+        loaded = self.round_trip(multiworld)
+        state = loaded.get_all_state(False)
+        self.assertTrue(loaded.get_region(f"Region {length - 1}", 1).can_reach(state))
+        self.assertEqual(len(loaded.get_locations()), length)
+
+    def test_locks(self) -> None:
+        """Tests that locks get recreated"""
+        multiworld = setup_solo_multiworld(AutoWorldRegister.world_types["A Link to the Past"], ())
+        multiworld.test_lock = threading.Lock()
+        multiworld.test_lock.acquire()
+        loaded = self.round_trip(multiworld)
+        self.assertTrue(loaded.test_lock.acquire(blocking=False))
+
+    def test_unpicklable(self) -> None:
+        """Tests that something that can't be pickled is reported"""
+        multiworld = setup_solo_multiworld(AutoWorldRegister.world_types["A Link to the Past"], ())
+        multiworld.test_generator = (i for i in range(1))
+        with self.assertRaises(CheckpointError):
+            save_checkpoint(multiworld, "pre_fill", self.path)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_other_version(self) -> None:
+        """Tests that checkpoints of other versions don't get loaded"""
+        with open(self.path, "wb") as f:
+            f.write(zlib.compress(pickle.dumps({"version": (0, 0, 0), "python": "", "stage": "pre_fill"})))
+        with self.assertRaises(CheckpointError):
+            load_checkpoint(self.path)
@@ -0,0 +1,178 @@
+import unittest
+from typing import List
+
+from BaseClasses import CollectionState, Entrance, Item, ItemClassification, MultiWorld, Region, _RecordingPlayerData, \
+    _RuleRecorder
+from worlds.generic.Rules import set_rule
+from . import generate_items, generate_locations, generate_test_multiworld
+
+
+def generate_chain_multiworld(players: int = 3, length: int = 4) -> MultiWorld:
+    """
+    Creates a multiworld in which each player has a chain of regions, each unlocked by the item found in the previous
+    region, and places those items so that the chain can be walked.
+    """
+    multiworld = generate_test_multiworld(players)
+    for player in multiworld.player_ids:
+        items = generate_items(length, player, True)
+        parent = multiworld.get_region("Menu", player)
+        for index, item in enumerate(items):
+            location = generate_locations(1, player, parent, None, f"_chain{index}")[0]
+            location.place_locked_item(item)
+            region = Region(f"player{player}_chain_region{index}", player, multiworld)
+            multiworld.regions.append(region)
+            entrance = Entrance(player, f"player{player}_chain_entrance{index}", parent)
+            parent.exits.append(entrance)
+            entrance.connect(region)
+            set_rule(entrance, lambda state, item_name=item.name, player_=player: state.has(item_name, player_))
+            parent = region
+        generate_locations(1, player, parent, None, "_chain_end")
+        multiworld.completion_condition[player] = \
+            lambda state, region_name=parent.name, player_=player: state.can_reach(region_name, "Region", player_)
+    return multiworld
+
+
+class TestRuleDependencies(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_chain_multiworld()
+        for world in self.multiworld.worlds.values():
+            world.track_rule_dependencies = True
+        self.multiworld.state = CollectionState(self.multiworld)
+
+    def test_sweep_matches_untracked_state(self) -> None:
+        """Tests that tracking rule dependencies reaches the same regions and locations as not tracking them"""
+        state = self.multiworld.state.copy()
+        state.sweep_for_advancements()
+        for world in self.multiworld.worlds.values():
+            world.track_rule_dependencies = False
+        untracked_state = CollectionState(self.multiworld)
+        untracked_state.sweep_for_advancements()
+        for player in self.multiworld.player_ids:
+            state.update_reachable_regions(player)
+            untracked_state.update_reachable_regions(player)
+            self.assertEqual(state.reachable_regions[player], untracked_state.reachable_regions[player])
+        self.assertEqual(state.advancements, untracked_state.advancements)
+        self.assertTrue(self.multiworld.has_beaten_game(state))
+
+    def test_only_affected_rules_are_retried(self) -> None:
+        """Tests that a blocked entrance is only evaluated again once an item its rule read was collected"""
+        calls: List[str] = []
+        entrance = self.multiworld.get_entrance("player1_chain_entrance1", 1)
+        rule = entrance.access_rule
+        entrance.access_rule = lambda state: calls.append(entrance.name) or rule(state)
+        state = self.multiworld.state
+        state.collect(generate_items(1, 1, True)[0], True)
+        state.update_reachable_regions(1)
+        self.assertEqual(len(calls), 1)
+
+        unrelated_item = Item("Unrelated", ItemClassification.progression, None, 1)
+        state.collect(unrelated_item, True)
+        state.update_reachable_regions(1)
+        self.assertEqual(len(calls), 1)
+
+        state.remove(unrelated_item)
+        state.update_reachable_regions(1)
+        self.assertEqual(len(calls), 2)
+
+    def test_sweep_only_retests_affected_locations(self) -> None:
+        """Tests that a sweep only re-tests a location once an item or region its rule read changed"""
+        calls: List[str] = []
+        menu = self.multiworld.get_region("Menu", 1)
+        last_item_name = generate_items(4, 1, True)[3].name
+        location = generate_locations(1, 1, menu, None, "_late")[0]
+        location.place_locked_item(Item("Late Event", ItemClassification.progression, None, 1))
+        location.access_rule = lambda state: calls.append(location.name) or state.has(last_item_name, 1)
+        state = self.multiworld.state
+        state.sweep_for_advancements()
+        self.assertIn(location, state.advancements)
+        self.assertEqual(len(calls), 2)
+
+    def test_region_dependency(self) -> None:
+        """Tests that a rule reading a region is retried when that region becomes reachable,
+        without an indirect condition being registered"""
+        menu = self.multiworld.get_region("Menu", 1)
+        target = Region("player1_target", 1, self.multiworld)
+        self.multiworld.regions.append(target)
+        menu.connect(target, "player1_target_entrance",
+                     lambda state: state.can_reach_region("player1_chain_region1", 1))
+        state = self.multiworld.state
+        state.update_reachable_regions(1)
+        self.assertNotIn(target, state.reachable_regions[1])
+        state.collect(generate_items(1, 1, True)[0], True)
+        state.update_reachable_regions(1)
+        self.assertNotIn(target, state.reachable_regions[1])
+        state.collect(generate_items(2, 1, True)[1], True)
+        state.update_reachable_regions(1)
+        self.assertIn(target, state.reachable_regions[1])
+
+    def test_collect_override_changes_are_tracked(self) -> None:
+        """Tests that item names a World.collect override changes besides the collected item retry rules reading them"""
+        world = self.multiworld.worlds[1]
+        collect = world.collect
+
+        def collect_with_bonus(state: CollectionState, item: Item) -> bool:
+            state.prog_items[1]["Bonus"] += 1
+            return collect(state, item)
+
+        world.collect = collect_with_bonus
+        menu = self.multiworld.get_region("Menu", 1)
+        target = Region("player1_target", 1, self.multiworld)
+        self.multiworld.regions.append(target)
+        menu.connect(target, "player1_target_entrance", lambda state: state.has("Bonus", 1))
+        state = self.multiworld.state
+        state.update_reachable_regions(1)
+        self.assertNotIn(target, state.reachable_regions[1])
+        state.collect(Item("Unrelated", ItemClassification.progression, None, 1), True)
+        state.update_reachable_regions(1)
+        self.assertIn(target, state.reachable_regions[1])
+
+    def test_untracked_reads(self) -> None:
+        """Tests that rules reading anything but the player's items and regions are not tracked"""
+        menu = self.multiworld.get_region("Menu", 1)
+        state = self.multiworld.state
+        state.update_reachable_regions(1)
+        location = generate_locations(1, 1, menu, None, "_untracked")[0]
+        recorder = _RuleRecorder(1)
+        location.access_rule = lambda state_: state_.has_all(("Missing", "Missing 2"), 1) \
+            or state_.can_reach_region("Menu", 1) and state_.count("Missing 3", 1) > 1
+        self.assertEqual(state._can_reach_recorded(location, recorder),
+                         (False, frozenset((menu, "Missing", "Missing 3"))))
+        for rule in (lambda state_: state_.has("Missing", 2),
+                     lambda state_: bool(state_.advancements),
+                     lambda state_: getattr(state_, "_test_cache", False),
+                     lambda state_: state_.prog_items[1].total() > 100):
+            location.access_rule = rule
+            self.assertEqual(state._can_reach_recorded(location, recorder), (False, None))
+        self.assertIs(type(state), CollectionState)
+        self.assertNotIsInstance(state.prog_items, _RecordingPlayerData)
+
+    def test_rules_get_a_stand_in(self) -> None:
+        """Tests that rules see a stand-in of the state's class, and that writes and errors leave the state intact"""
+        class AliasState(CollectionState):
+            def has(self, item: str, player: int, count: int = 1) -> bool:
+                return super().has(f"{item} Alias", player, count)
+
+        menu = self.multiworld.get_region("Menu", 1)
+        state = AliasState(self.multiworld)
+        state.update_reachable_regions(1)
+        location = generate_locations(1, 1, menu, None, "_stand_in")[0]
+        recorder = _RuleRecorder(1)
+        location.access_rule = lambda state_: state_.has("Missing", 1)
+        self.assertEqual(state._can_reach_recorded(location, recorder), (False, frozenset((menu, "Missing Alias"))))
+
+        def write_cache(state_: CollectionState) -> bool:
+            state_._test_cache = True
+            return False
+
+        location.access_rule = write_cache
+        self.assertEqual(state._can_reach_recorded(location, recorder), (False, None))
+        self.assertTrue(state.__dict__["_test_cache"])
+
+        location.access_rule = lambda state_: 1 / 0
+        with self.assertRaises(ZeroDivisionError):
+            state._can_reach_recorded(location, recorder)
+        self.assertIs(type(state), AliasState)
+        self.assertNotIsInstance(state.prog_items, _RecordingPlayerData)
+        location.access_rule = lambda state_: state_.has("Missing", 1)
+        self.assertEqual(state._can_reach_recorded(location, recorder), (False, frozenset((menu, "Missing Alias"))))
+
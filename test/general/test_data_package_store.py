@@ -0,0 +1,100 @@
+import unittest
+
+import Multidata
+from DataPackageStore import DataPackageStore
+from Multidata import dump_multidata, load_multidata
+from worlds import AutoWorldRegister
+
+
+def get_data_package(game: str) -> dict:
+    return AutoWorldRegister.world_types[game].get_data_package_data()
+
+
+class TestDataPackageStore(unittest.TestCase):
+    store: DataPackageStore
+
+    def setUp(self) -> None:
+        self.store = DataPackageStore()
+        self.original_store = Multidata.data_package_store
+        Multidata.data_package_store = self.store
+
+    def tearDown(self) -> None:
+        Multidata.data_package_store = self.original_store
+
+    def test_add(self) -> None:
+        """Tests that the first data package with a checksum is kept and the ones after are replaced with it"""
+        data_package = get_data_package("Archipelago")
+        self.assertIs(self.store.add(data_package), data_package)
+        self.assertIs(self.store.add(get_data_package("Archipelago")), data_package)
+        self.assertIs(self.store.get(data_package["checksum"]), data_package)
+
+    def test_eviction(self) -> None:
+        """Tests that the least recently used data packages are released once the store is full"""
+        self.store.max_size = 2
+        data_packages = [get_data_package(game) for game in ("Archipelago", "Clique", "ChecksFinder")]
+        self.store.add(data_packages[0])
+        self.store.add(data_packages[1])
+        self.assertIs(self.store.get(data_packages[0]["checksum"]), data_packages[0])
+        self.store.add(data_packages[2])
+        self.assertEqual(len(self.store), 2)
+        self.assertNotIn(data_packages[1]["checksum"], self.store)
+        self.assertIn(data_packages[0]["checksum"], self.store)
+        self.assertIn(data_packages[2]["checksum"], self.store)
+        # a released data package gets stored again once it is loaded again
+        reloaded = self.store.load(data_packages[1]["checksum"], lambda: get_data_package("Clique"))
+        self.assertIsNot(reloaded, data_packages[1])
+        self.assertNotIn(data_packages[0]["checksum"], self.store)
+
+    def test_mismatching_checksum(self) -> None:
+        """Tests that data packages that don't match their checksum are used but not kept"""
+        data_package = get_data_package("Archipelago")
+        data_package["item_name_to_id"] = {"Nothing": 1}
+        self.assertIs(self.store.add(data_package), data_package)
+        self.assertNotIn(data_package["checksum"], self.store)
+        reference = {"checksum": "abc"}
+        self.assertIs(self.store.add(reference), reference)
+        self.assertEqual(len(self.store), 0)
+
+    def test_load(self) -> None:
+        """Tests that the loader is only called for data packages not stored yet"""
+        data_package = get_data_package("Archipelago")
+        calls = []
+
+        def loader() -> dict:
+            calls.append(data_package["checksum"])
+            return get_data_package("Archipelago")
+
+        first = self.store.load(data_package["checksum"], loader)
+        self.assertIs(self.store.load(data_package["checksum"], loader), first)
+        self.assertEqual(calls, [data_package["checksum"]])
+        self.assertIsNone(self.store.load("missing", lambda: None))
+        with self.assertRaises(ValueError):
+            self.store.load("other", loader)
+
+    def test_multidata(self) -> None:
+        """Tests that multidata share their data packages, reading them once"""
+        data_package = get_data_package("Archipelago")
+        multidata = {"locations": {1: {}}, "datapackage": {"Archipelago": data_package}}
+        for version in (3, 4):
+            with self.subTest(version=version):
+                self.store.clear()
+                first = load_multidata(dump_multidata(multidata, version))["datapackage"]["Archipelago"]
+                second = load_multidata(dump_multidata(multidata, version))["datapackage"]["Archipelago"]
+                self.assertEqual(first, data_package)
+                self.assertIs(first, second)
+
+        # the data package section isn't read once the data package is stored
+        data = bytearray(dump_multidata(multidata, 4))
+        offset, size, _ = Multidata._read_toc(data)[f"datapackage.{data_package['checksum']}"]
+        data[offset:offset + size] = bytes(size)
+        self.assertIs(load_multidata(data)["datapackage"]["Archipelago"], first)
+
+    def test_references(self) -> None:
+        """Tests that data packages only referenced by checksum, like those stripped by the WebHost, stay as they are"""
+        reference = {"version": 0, "checksum": get_data_package("Archipelago")["checksum"]}
+        multidata = {"locations": {1: {}}, "datapackage": {"Archipelago": reference}}
+        for version in (3, 4):
+            with self.subTest(version=version):
+                self.assertEqual(load_multidata(dump_multidata(multidata, version))["datapackage"],
+                                 {"Archipelago": reference})
+        self.assertEqual(len(self.store), 0)
@@ -3,8 +3,8 @@ import unittest
 
 from Options import Accessibility
 from test.general import generate_items, generate_locations, generate_test_multiworld
-from Fill import FillError, balance_multiworld_progression, fill_restrictive, \
-    distribute_early_items, distribute_items_restrictive
+from Fill import FillError, LocationIndex, _SphereFrontier, balance_multiworld_progression, fill_restrictive, \
+    distribute_early_items, distribute_items_restrictive, distribute_planned, remaining_fill
 from BaseClasses import Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
     ItemClassification
 from worlds.generic.Rules import CollectionRule, add_item_rule, locality_rules, set_rule
@@ -387,10 +387,12 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertTrue(sphere1_loc.can_fill(None, allowed_item, False), "Test is flawed")
         self.assertFalse(sphere1_loc.can_fill(None, items[2], False), "Test is flawed")
         # fill has to place items[1] in locations[0] which will result in a swap because of placement order
-        fill_restrictive(multiworld, multiworld.state, player1.locations, player1.prog_items)
+        with self.assertLogs(level="INFO") as logs:
+            fill_restrictive(multiworld, multiworld.state, player1.locations, player1.prog_items)
         # assert swap happened
         self.assertTrue(sphere1_loc.item, "Did not swap required item into Sphere 1")
         self.assertEqual(sphere1_loc.item, allowed_item, "Wrong item in Sphere 1")
+        self.assertRegex(logs.output[-1], r"Swaps: [1-9]\d* done", "Swap was not reported")
 
     def test_swap_to_earlier_location_with_item_rule2(self):
         """Test that swap works before all items are placed"""
@@ -464,6 +466,190 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertIsNot(loc0.item, player1.prog_items[0], "Filled item was still present in item pool")
 
 
+class TestLocationIndex(unittest.TestCase):
+    def test_same_spot_as_scan(self) -> None:
+        """Test that the index returns the first location of the list that can be filled and keeps the list in sync"""
+        multiworld = generate_test_multiworld(2)
+        locations: List[Location] = []
+        own_items_only = [lambda item, player=player: item.player == player for player in (1, 2)]
+        for player in (1, 2):
+            region = multiworld.get_region("Menu", player)
+            for i, location in enumerate(generate_locations(12, player, region)):
+                if i % 3 == 0:
+                    location.item_rule = own_items_only[player - 1]
+                elif i % 3 == 1:
+                    location.progress_type = LocationProgressType.EXCLUDED
+                    location.item_rule = own_items_only[player - 1]
+                elif i % 2:
+                    set_rule(location, lambda state: False)
+                locations.append(location)
+        multiworld.random.shuffle(locations)
+        items = generate_items(8, 1, True) + generate_items(8, 2) + generate_items(4, 1) + generate_items(4, 2, True)
+        multiworld.random.shuffle(items)
+
+        index = LocationIndex(locations)
+        for item in items:
+            with self.subTest(item=item):
+                expected = next((location for location in locations
+                                 if location.can_fill(multiworld.state, item)), None)
+                self.assertIs(index.find(multiworld.state, item), expected)
+                expected = next((location for location in locations if location.item_rule(item)), None)
+                self.assertIs(index.find(multiworld.state, item, item_rule_only=True), expected)
+                expected = next((location for location in locations if location.player == item.player
+                                 and location.can_fill(multiworld.state, item, False)), None)
+                self.assertIs(index.find(multiworld.state, item, False, item.player), expected)
+                if expected:
+                    index.remove(expected)
+                    self.assertNotIn(expected, locations)
+
+    def test_remove_first(self) -> None:
+        """Test that removing the front of the list keeps the index in sync"""
+        multiworld = generate_test_multiworld(2)
+        locations: List[Location] = []
+        for player in (1, 2):
+            locations += generate_locations(10, player, multiworld.get_region("Menu", player))
+        multiworld.random.shuffle(locations)
+        index = LocationIndex(locations)
+        expected = locations[:5]
+        self.assertEqual(index.remove_first(5), expected)
+        self.assertEqual(len(locations), 15)
+        item = generate_items(1, 2)[0]
+        self.assertIs(index.find(multiworld.state, item, False, 2), next(location for location in locations
+                                                                           if location.player == 2))
+        index.remove(locations[3])
+        expected = locations[:3]
+        self.assertEqual(index.remove_first(3), expected)
+        self.assertEqual(len(locations), 11)
+        self.assertTrue(all(location not in locations for location in expected))
+
+
+class TestRemainingFill(unittest.TestCase):
+    def test_same_placements_as_scan(self) -> None:
+        """Test that filling runs of locations without item rules at once places like scanning for every item"""
+        placements: List[List[str]] = []
+        for bulk in (True, False):
+            multiworld = generate_test_multiworld(2)
+            locations: List[Location] = []
+            for player in (1, 2):
+                region = multiworld.get_region("Menu", player)
+                for i, location in enumerate(generate_locations(320, player, region)):
+                    if i % 7 == 0:
+                        location.item_rule = lambda item, player=player: item.player == player
+                    elif i % 11 == 0:
+                        location.item_rule = lambda item: item.name.endswith("3")
+                    locations.append(location)
+            items = generate_items(300, 1) + generate_items(300, 2)
+            multiworld.random.shuffle(locations)
+            multiworld.random.shuffle(items)
+            if bulk:
+                remaining_fill(multiworld, locations, items)
+            else:
+                while locations and items:
+                    item = items.pop()
+                    location = next(location for location in locations if location.item_rule(item))
+                    locations.remove(location)
+                    multiworld.push_item(location, item, False)
+            self.assertFalse(items)
+            placements.append([location.item and location.item.name for location in multiworld.get_locations()])
+        self.assertEqual(placements[0], placements[1])
+
+
+class TestSphereFrontier(unittest.TestCase):
+    def test_same_spheres_as_scan(self) -> None:
+        """Test that the frontier used by progression balancing finds the same spheres as testing every location"""
+        class UnreachableLocation(Location):
+            def can_reach(self, state) -> bool:
+                return False
+
+        multiworld = generate_test_multiworld(1)
+        player1 = generate_player_data(multiworld, 1, 0, 12)
+        menu = player1.menu
+        locations = generate_locations(4, 1, menu)
+        gated = player1.generate_region(menu, 4, lambda state: state.has(player1.prog_items[0].name, 1))
+        locations += gated.locations
+        deep = player1.generate_region(gated, 4, lambda state: state.has(player1.prog_items[1].name, 1))
+        locations += deep.locations
+        for location, item in zip(locations, player1.prog_items):
+            location.place_locked_item(item)
+        set_rule(locations[1], lambda state: state.has(player1.prog_items[5].name, 1))
+        set_rule(deep.locations[0], lambda state: state.has(player1.prog_items[9].name, 1))
+        unreachable = UnreachableLocation(1, "Unreachable", None, menu)
+        menu.locations.append(unreachable)
+        locations.append(unreachable)
+
+        frontier = _SphereFrontier(locations)
+        remaining = set(locations)
+        state = multiworld.state.copy()
+        spheres = 0
+        while remaining:
+            expected = {location for location in remaining if location.can_reach(state)}
+            self.assertEqual(frontier.pop_sphere(state), expected)
+            if not expected:
+                break
+            spheres += 1
+            remaining -= expected
+            self.assertEqual(frontier.locations, remaining)
+            for location in expected:
+                state.collect(location.item, True, location)
+        self.assertEqual(remaining, {unreachable})
+        self.assertGreater(spheres, 3, "Test is flawed")
+
+
+class TestDistributePlanned(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(2)
+        for player in (1, 2):
+            region = self.multiworld.get_region("Menu", player)
+            generate_locations(6, player, region)
+            items = generate_items(6, player)
+            for item in items[:3]:
+                item.name = f"player{player}_item"
+            self.multiworld.itempool += items
+            self.multiworld.worlds[player].create_item = \
+                lambda name, player=player: Item(name, ItemClassification.filler, None, player)
+
+    def test_from_pool(self) -> None:
+        """Test that items placed from the pool leave it, including all copies of an item when asked for"""
+        self.multiworld.plando_items[1] = [
+            {"items": {"player1_item": True}, "locations": ["player1_location0", "player1_location1",
+                                                            "player1_location2", "player1_location3"]},
+        ]
+        self.multiworld.plando_items[2] = [
+            {"item": "player2_item", "location": "player1_location5", "world": True},
+        ]
+        pool = self.multiworld.itempool[:]
+        distribute_planned(self.multiworld)
+
+        placed = self.multiworld.get_filled_locations()
+        self.assertEqual(len(placed), 4)
+        player1_spots = {location.name for location in placed if location.item.player == 1}
+        self.assertEqual(len(player1_spots), 3)
+        self.assertLessEqual(player1_spots, {"player1_location0", "player1_location1", "player1_location2",
+                                             "player1_location3"})
+        self.assertTrue(all(location.locked for location in placed))
+        self.assertEqual(self.multiworld.get_location("player1_location5", 1).item.name, "player2_item")
+        self.assertEqual(self.multiworld.itempool, [item for item in pool if not item.location])
+        self.assertEqual(len(self.multiworld.itempool), 8)
+
+    def test_blocks_without_locations(self) -> None:
+        """Test that blocks without locations and with early locations only place into unfilled locations"""
+        self.multiworld.plando_items[1] = [
+            {"items": ["player1_item"] * 3, "world": None, "force": True},
+            {"items": {"player1_item": 1}, "locations": ["early_locations"], "force": True},
+        ]
+        self.multiworld.plando_items[2] = [
+            {"items": ["player2_item"] * 3, "world": 1, "force": True},
+        ]
+        distribute_planned(self.multiworld)
+
+        placed = self.multiworld.get_filled_locations()
+        self.assertEqual(len(placed), 7)
+        self.assertEqual(len(set(placed)), 7)
+        self.assertEqual(sum(location.player == 1 for location in placed if location.item.player == 2), 3)
+        # only 3 copies were in the pool, the rest got created
+        self.assertEqual(len(self.multiworld.itempool), 6)
+
+
 class TestDistributeItemsRestrictive(unittest.TestCase):
     def test_basic_distribute(self):
         """Test that distribute_items_restrictive is deterministic"""
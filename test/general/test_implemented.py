@@ -82,6 +82,8 @@ class TestImplemented(unittest.TestCase):
                 explicit_spheres = list(multiworld.get_spheres())
                 # Disable explicit indirect conditions and produce a second list of spheres.
                 world.explicit_indirect_conditions = False
+                # Spheres are cached for the current placement, which changing rule behavior does not invalidate.
+                multiworld.sphere_cache.invalidate()
                 implicit_spheres = list(multiworld.get_spheres())
 
                 # Both lists should be identical.
@@ -0,0 +1,84 @@
+import mmap
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+from Multidata import LocationColumns, dump_multidata, load_multidata, load_multidata_section
+from Utils import VersionException
+
+multidata = {
+    "seed_name": "12345",
+    "locations": {
+        1: {3: (7, 2, 1), 1: (-5, 1, 0), 2: (1 << 40, 2, 4)},
+        2: {},
+        3: {1: (8, 3, 0)},
+    },
+    "slot_data": {1: {"goal": 1}, 2: {}, 3: {"option": [1, 2]}},
+    "precollected_hints": {1: set(), 2: set(), 3: set()},
+    "er_hint_data": {1: {3: "Entrance"}},
+    "datapackage": {"Archipelago": {"checksum": "abc"}},
+    "spheres": [{1: {1}}],
+}
+
+
+class TestMultidata(unittest.TestCase):
+    def assertMultidata(self, loaded: dict) -> None:
+        self.assertEqual({**loaded, "locations": dict(loaded["locations"])}, multidata)
+
+    def test_format_4(self) -> None:
+        """Tests that format 4 round trips, with the locations as columns sorted by sender, then location"""
+        data = dump_multidata(multidata, 4)
+        self.assertEqual(data[0], 4)
+        loaded = load_multidata(data)
+        self.assertMultidata(loaded)
+        locations = loaded["locations"]
+        self.assertIsInstance(locations, LocationColumns)
+        self.assertEqual([list(column) for column in locations.columns], [
+            [1, 2, 3],  # senders
+            [1, 1, 1, 3],  # sender
+            [1, 2, 3, 1],  # location
+            [-5, 1 << 40, 7, 8],  # item
+            [1, 2, 2, 3],  # receiver
+            [0, 4, 1, 0],  # flags
+        ])
+        self.assertEqual(list(locations), [1, 2, 3])
+        self.assertEqual(locations[2], {})
+        with self.assertRaises(KeyError):
+            _ = locations[4]
+
+    def test_format_3(self) -> None:
+        """Tests that format 3 is written by default and round trips, also from multidata loaded from format 4"""
+        data = dump_multidata(multidata)
+        self.assertEqual(data[0], 3)
+        self.assertEqual(load_multidata(data), multidata)
+        self.assertEqual(load_multidata(dump_multidata(load_multidata(data))), multidata)
+        self.assertEqual(load_multidata(dump_multidata(load_multidata(dump_multidata(multidata, 4)), 3)), multidata)
+        self.assertEqual(load_multidata(dump_multidata(load_multidata(data), 4))["seed_name"], "12345")
+
+    def test_sections(self) -> None:
+        """Tests that single keys can be read on their own"""
+        for version in (3, 4):
+            with self.subTest(version=version):
+                data = dump_multidata(multidata, version)
+                self.assertEqual(load_multidata_section(data, "slot_data"), multidata["slot_data"])
+                self.assertEqual(load_multidata_section(data, "seed_name"), "12345")
+                self.assertEqual(dict(load_multidata_section(data, "locations")), multidata["locations"])
+                with self.assertRaises(KeyError):
+                    load_multidata_section(dump_multidata({"locations": {1: {}}}, version), "slot_data")
+
+    def test_mmap(self) -> None:
+        """Tests that format 4 loads from a memory mapped file, which can be closed once the columns are released"""
+        with TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "AP_12345.archipelago")
+            with open(path, "wb") as f:
+                f.write(dump_multidata(multidata, 4))
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            loaded = load_multidata(data)
+            self.assertMultidata(loaded)
+            loaded["locations"].release()
+            data.close()
+
+    def test_newer_format(self) -> None:
+        with self.assertRaises(VersionException):
+            load_multidata(bytes([5]) + dump_multidata(multidata, 4)[1:])
@@ -0,0 +1,86 @@
+import os
+import unittest
+import zipfile
+from tempfile import TemporaryDirectory
+
+from OutputArchive import OutputArchive, is_compressed
+
+
+class TestOutputArchive(unittest.TestCase):
+    temp_dir: TemporaryDirectory
+    files: TemporaryDirectory
+    path: str
+
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory()
+        self.files = TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "AP_test.zip")
+        self.contents = {
+            "AP_test_P1_Player.aplttp": os.urandom(3000),
+            "AP_test_P2_Player.bsdiff4": os.urandom(2000),
+            "AP_test.archipelago": os.urandom(1000),
+            "AP_test_Spoiler.txt": b"Spoiler\n" * 100000,
+            "empty.txt": b"",
+        }
+        for name, data in self.contents.items():
+            with open(os.path.join(self.files.name, name), "wb") as f:
+                f.write(data)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+        self.files.cleanup()
+
+    def test_is_compressed(self) -> None:
+        self.assertTrue(is_compressed("AP_1_P1_Player.apz5"))
+        self.assertTrue(is_compressed("AP_1_P1_Player.BSDIFF4"))
+        self.assertFalse(is_compressed("AP_1_Spoiler.txt"))
+        self.assertFalse(is_compressed("AP_1_P1_Player.sfc"))
+
+    def test_archive(self) -> None:
+        """Tests that the archive has every file, compressing only those that aren't already"""
+        with OutputArchive(self.path, 9, compressors=3) as archive:
+            archive.add_directory(self.files.name)
+        self.assertEqual(os.listdir(self.temp_dir.name), ["AP_test.zip"])
+        with zipfile.ZipFile(self.path) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual({name: zf.read(name) for name in zf.namelist()}, self.contents)
+            compress_types = {info.filename: info.compress_type for info in zf.infolist()}
+        self.assertEqual(compress_types, {
+            "AP_test_P1_Player.aplttp": zipfile.ZIP_STORED,
+            "AP_test_P2_Player.bsdiff4": zipfile.ZIP_STORED,
+            "AP_test.archipelago": zipfile.ZIP_DEFLATED,
+            "AP_test_Spoiler.txt": zipfile.ZIP_DEFLATED,
+            "empty.txt": zipfile.ZIP_DEFLATED,
+        })
+
+    def test_store_only(self) -> None:
+        """Tests that compression level 0 stores all files"""
+        with OutputArchive(self.path, 0) as archive:
+            archive.add_directory(self.files.name)
+        with zipfile.ZipFile(self.path) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual({info.compress_type for info in zf.infolist()}, {zipfile.ZIP_STORED})
+
+    def test_discard(self) -> None:
+        """Tests that no archive is left behind if the output fails"""
+        with self.assertRaises(ValueError):
+            with OutputArchive(self.path, 9) as archive:
+                archive.add_directory(self.files.name)
+                raise ValueError("output failed")
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+        archive = OutputArchive(self.path, 9)
+        archive.add(os.path.join(self.files.name, "missing.txt"), "missing.txt")
+        with self.assertRaises(FileNotFoundError):
+            archive.close()
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_duplicate_arcname(self) -> None:
+        """Tests that adding a second file under the same name is rejected"""
+        with OutputArchive(self.path, 9) as archive:
+            archive.add(os.path.join(self.files.name, "empty.txt"), "empty.txt")
+            with self.assertRaises(ValueError):
+                archive.add(os.path.join(self.files.name, "AP_test_Spoiler.txt"), "empty.txt")
+        with zipfile.ZipFile(self.path) as zf:
+            self.assertEqual(zf.read("empty.txt"), b"")
+            self.assertEqual(len(zf.infolist()), 1)
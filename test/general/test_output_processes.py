@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+import sys
+import threading
+import unittest
+from tempfile import TemporaryDirectory
+
+from BaseClasses import MultiWorld
+from OutputProcesses import OutputProcessPool, process_output_players
+from . import generate_test_multiworld
+
+
+@unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "output processes require forking")
+class TestOutputProcesses(unittest.TestCase):
+    multiworld: MultiWorld
+    temp_dir: TemporaryDirectory
+
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(3)
+        self.temp_dir = TemporaryDirectory()
+        for world in self.multiworld.worlds.values():
+            world.output_process_attributes = ("rom_name",)
+            world.rom_name_available_event = threading.Event()
+            world.unrelated_event = threading.Event()
+
+            def generate_output(output_directory: str, world=world) -> None:
+                try:
+                    with open(os.path.join(output_directory, f"P{world.player}.txt"), "w") as f:
+                        f.write(str(os.getpid()))
+                    world.rom_name = f"ROM{world.player}".encode()
+                finally:
+                    world.rom_name_available_event.set()
+
+            world.generate_output = generate_output
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_results(self) -> None:
+        """Tests that the output runs in other processes and that the declared attributes and set events come back"""
+        players = process_output_players(self.multiworld, self.multiworld.player_ids, 2)
+        self.assertEqual(players, [1, 2, 3])
+        with OutputProcessPool(self.multiworld, dict.fromkeys(players, self.temp_dir.name), 2) as pool:
+            for player in players:
+                pool.result(player)
+        for player, world in self.multiworld.worlds.items():
+            with open(os.path.join(self.temp_dir.name, f"P{player}.txt")) as f:
+                self.assertNotEqual(int(f.read()), os.getpid())
+            self.assertEqual(world.rom_name, f"ROM{player}".encode())
+            self.assertTrue(world.rom_name_available_event.is_set())
+            self.assertFalse(world.unrelated_event.is_set())
+
+    def test_only_supporting_worlds(self) -> None:
+        """Tests that worlds not declaring what to copy back and single processes stay in threads"""
+        self.multiworld.worlds[2].output_process_attributes = None
+        self.assertEqual(process_output_players(self.multiworld, self.multiworld.player_ids, 2), [1, 3])
+        self.assertEqual(process_output_players(self.multiworld, self.multiworld.player_ids, 1), [])
+
+    def test_errors(self) -> None:
+        """Tests that errors get raised in the generating process, after the events got set"""
+        class Unpicklable(Exception):
+            pass
+
+        def raise_error(output_directory: str, world=self.multiworld.worlds[1]) -> None:
+            try:
+                raise ValueError("broken ROM")
+            finally:
+                world.rom_name_available_event.set()
+
+        def raise_unpicklable(output_directory: str) -> None:
+            raise Unpicklable("local class")
+
+        self.multiworld.worlds[1].generate_output = raise_error
+        self.multiworld.worlds[2].generate_output = raise_unpicklable
+        with OutputProcessPool(self.multiworld, dict.fromkeys([1, 2, 3], self.temp_dir.name), 3) as pool:
+            with self.assertRaisesRegex(ValueError, "broken ROM") as context:
+                pool.result(1)
+            self.assertTrue(self.multiworld.worlds[1].rom_name_available_event.is_set())
+            self.assertIn("raise ValueError", str(context.exception.__cause__))
+            if sys.version_info >= (3, 11, 0):
+                self.assertTrue(any("player 1" in note for note in context.exception.__notes__))
+            with self.assertRaisesRegex(RuntimeError, "Unpicklable: local class"):
+                pool.result(2)
+            pool.result(3)
@@ -0,0 +1,107 @@
+import os
+import threading
+import typing
+import unittest
+from unittest import mock
+
+import ParallelReach
+from BaseClasses import CollectionState, Location, MultiWorld
+from ParallelReach import parallel_mode, reachable_locations
+from . import generate_items, generate_locations, generate_test_multiworld
+
+
+@unittest.skipUnless(parallel_mode(), "checking locations in parallel requires fork or a free-threaded build")
+class TestParallelReach(unittest.TestCase):
+    multiworld: MultiWorld
+
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(5)
+        for player in self.multiworld.player_ids:
+            region = self.multiworld.get_region("Menu", player)
+            items = generate_items(30, player, True)
+            locations = generate_locations(30 * player, player, region)
+            # each item unlocks the next group of locations, spread over the players' spheres
+            for index, location in enumerate(locations):
+                required = items[index % 30].name
+                location.access_rule = lambda state, required=required, player=player: state.has(required, player)
+            for index, location in enumerate(locations[:30]):
+                location.place_locked_item(items[(index + 1) % 30] if index else items[0])
+            self.multiworld.itempool += items
+        self.multiworld.state = CollectionState(self.multiworld)
+
+    @staticmethod
+    def always_parallel() -> typing.ContextManager[None]:
+        """Checks in parallel no matter how few locations there are or how quick checking them is"""
+        return mock.patch.multiple(ParallelReach, min_locations=0, fork_seconds=lambda: 0.0)
+
+    def test_same_as_one_core(self) -> None:
+        """Tests that the reachable locations come out the same and in the same order"""
+        locations = list(self.multiworld.get_locations())
+        state = CollectionState(self.multiworld)
+        for item in self.multiworld.itempool[::3]:
+            state.collect(item, True)
+        expected = [location for location in locations if location.can_reach(state)]
+        self.assertTrue(expected)
+        self.assertLess(len(expected), len(locations))
+        with self.always_parallel():
+            self.assertEqual(reachable_locations(state, locations, 3), expected)
+
+    def test_same_spheres(self) -> None:
+        """Tests that sphere loops give the same spheres with workers"""
+        spheres = list(self.multiworld.get_spheres())
+        self.multiworld.sphere_cache.invalidate()
+        self.multiworld.sphere_workers = 4
+        with self.always_parallel():
+            self.assertEqual(list(self.multiworld.get_spheres()), spheres)
+            self.assertTrue(self.multiworld.can_beat_game(CollectionState(self.multiworld)))
+
+    def test_threads_only_read_only_rules(self) -> None:
+        """Tests that threads only check locations of worlds with read-only rules, the others get checked after"""
+        locations = list(self.multiworld.get_locations())
+        state = CollectionState(self.multiworld)
+        for item in self.multiworld.itempool[::2]:
+            state.collect(item, True)
+        expected = [location for location in locations if location.can_reach(state)]
+        threads = set()
+
+        def writes_to_state(rule: typing.Callable[[CollectionState], bool]) -> typing.Callable[[CollectionState], bool]:
+            def access_rule(state: CollectionState) -> bool:
+                threads.add(threading.current_thread())
+                return rule(state)
+            return access_rule
+
+        for location in locations:
+            if location.player == 5:
+                location.access_rule = writes_to_state(location.access_rule)
+        for player in range(1, 5):
+            self.multiworld.worlds[player].read_only_rules = True
+        with mock.patch.object(ParallelReach, "min_locations", 0), \
+                mock.patch.object(ParallelReach, "parallel_mode", lambda: "threads"):
+            self.assertEqual(reachable_locations(state, locations, 3), expected)
+        self.assertEqual(threads, {threading.current_thread()})
+
+    @unittest.skipUnless(parallel_mode() == "fork", "only forked workers can fail on their own")
+    def test_failed_worker(self) -> None:
+        """Tests that partitions of failed child processes are checked again by the generating process"""
+        generating_process = os.getpid()
+
+        def only_here(state: CollectionState) -> bool:
+            if os.getpid() != generating_process:
+                raise RuntimeError("failed in a child process")
+            return True
+
+        locations = list(self.multiworld.get_locations())
+        for location in locations:
+            location.access_rule = only_here
+        with self.always_parallel():
+            self.assertEqual(reachable_locations(self.multiworld.state, locations, 3), locations)
+
+    @unittest.skipUnless(parallel_mode() == "fork", "only checking in child processes has to make up for forking")
+    def test_quick_checks_not_forked(self) -> None:
+        """Tests that no children get forked while checking takes less time than forking them"""
+        locations = list(self.multiworld.get_locations())
+        expected = [location for location in locations if location.can_reach(self.multiworld.state)]
+        self.assertGreater(ParallelReach.fork_seconds(), 0)
+        with mock.patch.object(ParallelReach, "fork_seconds", lambda: 60.0), \
+                mock.patch.object(os, "fork", side_effect=AssertionError("forked")):
+            self.assertEqual(reachable_locations(self.multiworld.state, locations, 3), expected)
@@ -0,0 +1,79 @@
+import multiprocessing
+import unittest
+
+from BaseClasses import MultiWorld
+from Fill import FillError, fill_restrictive
+from Portfolio import PortfolioError, derive_fill_seed, placement_digest, reseed_fill, run_portfolio
+from . import generate_items, generate_locations, generate_test_multiworld
+
+
+def random_fill(multiworld: MultiWorld, attempt: int = 0) -> None:
+    """Places the items of player 1 in a random order, which depends on the fill seed"""
+    items = multiworld.itempool[:]
+    multiworld.random.shuffle(items)
+    fill_restrictive(multiworld, multiworld.state, multiworld.get_unfilled_locations(1), items)
+
+
+def fill_with_fill_seed(multiworld: MultiWorld, attempt: int = 0) -> None:
+    """Fails unless the random state got reseeded, like a seed that can't be filled"""
+    if multiworld.fill_seed is None:
+        raise FillError("No more spots to place items.")
+    random_fill(multiworld)
+
+
+def fail_fill(multiworld: MultiWorld, attempt: int = 0) -> None:
+    raise FillError("No more spots to place items.", multiworld=multiworld)
+
+
+@unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "portfolio generation requires fork")
+class TestPortfolio(unittest.TestCase):
+    multiworld: MultiWorld
+
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(1)
+        region = self.multiworld.get_region("Menu", 1)
+        generate_locations(10, 1, region)
+        self.multiworld.itempool += generate_items(10, 1, True)
+
+    def test_derived_seeds(self) -> None:
+        """Tests that attempt 0 keeps the seed and the others derive distinct seeds reproducibly"""
+        self.assertIsNone(derive_fill_seed(0, 0))
+        fill_seeds = [derive_fill_seed(0, attempt) for attempt in range(1, 10)]
+        self.assertEqual(fill_seeds, [derive_fill_seed(0, attempt) for attempt in range(1, 10)])
+        self.assertEqual(len(set(fill_seeds)), len(fill_seeds))
+        self.assertNotEqual(fill_seeds, [derive_fill_seed(1, attempt) for attempt in range(1, 10)])
+
+    def test_attempt_0_wins(self) -> None:
+        """Tests that a successful attempt 0 keeps the fill of the generating process"""
+        multiworld, result = run_portfolio(self.multiworld, 3, random_fill)
+        self.assertIs(multiworld, self.multiworld)
+        self.assertEqual(result.attempt, 0)
+        self.assertIsNone(multiworld.fill_seed)
+        self.assertEqual(len(multiworld.get_filled_locations()), 10)
+
+    def test_first_success_wins(self) -> None:
+        """Tests that failed attempts are skipped and that the winner gets sent back and can be replayed"""
+        multiworld, result = run_portfolio(self.multiworld, 3, fill_with_fill_seed)
+        self.assertIn(result.attempt, (1, 2))
+        self.assertEqual(result.fill_seed, derive_fill_seed(self.multiworld.seed, result.attempt))
+        self.assertIsNotNone(multiworld)
+        self.assertIsNot(multiworld, self.multiworld)
+        self.assertEqual(multiworld.fill_seed, result.fill_seed)
+        self.assertEqual(placement_digest(multiworld), result.digest)
+
+        replay = generate_test_multiworld(1)
+        generate_locations(10, 1, replay.get_region("Menu", 1))
+        replay.itempool += generate_items(10, 1, True)
+        reseed_fill(replay, result.fill_seed)
+        fill_with_fill_seed(replay)
+        self.assertEqual(placement_digest(replay), result.digest)
+
+    def test_all_attempts_failed(self) -> None:
+        """Tests that the errors of all attempts are reported"""
+        with self.assertRaises(PortfolioError) as context:
+            run_portfolio(self.multiworld, 2, fail_fill)
+        message = str(context.exception)
+        self.assertIn("Attempt 0", message)
+        self.assertIn("Attempt 1", message)
+        # the placements that FillError appends are left out
+        self.assertNotIn("All Placements", message)
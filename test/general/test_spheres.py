@@ -0,0 +1,130 @@
+import unittest
+
+from typing import List
+
+from BaseClasses import CollectionState, Item, ItemClassification, MultiWorld
+from Fill import distribute_items_restrictive
+from Options import Accessibility
+from worlds.AutoWorld import AutoWorldRegister
+from worlds.generic.Rules import set_rule
+from . import generate_locations, setup_solo_multiworld
+from .test_collection_state import generate_chain_multiworld
+
+
+class TestSphereCache(unittest.TestCase):
+    multiworld: MultiWorld
+
+    def setUp(self) -> None:
+        self.multiworld = generate_chain_multiworld(players=2, length=3)
+
+    def test_spheres_are_computed_once(self) -> None:
+        """Tests that consumers of spheres share one computation for an unchanged placement"""
+        spheres = self.multiworld.sphere_cache.get_spheres()
+        self.assertEqual(len(spheres.spheres), 3)
+        self.assertFalse(spheres.unreachable)
+        self.assertEqual(list(self.multiworld.get_spheres()), spheres.spheres)
+        self.assertIs(self.multiworld.sphere_cache.get_spheres(), spheres)
+        self.assertTrue(self.multiworld.can_beat_game())
+        progression_spheres = self.multiworld.sphere_cache.get_progression_spheres()
+        self.assertEqual(len(progression_spheres.spheres), 3)
+        self.assertTrue(self.multiworld.can_beat_game())
+        self.assertIs(self.multiworld.sphere_cache.get_progression_spheres(), progression_spheres)
+
+    def test_state_before_sphere(self) -> None:
+        """Tests that the state before a sphere holds exactly the items of the spheres before it"""
+        spheres = self.multiworld.sphere_cache.get_spheres()
+        state = spheres.get_state_before(self.multiworld, 2)
+        self.assertEqual(state.locations_checked, spheres.spheres[0] | spheres.spheres[1])
+        self.assertTrue(all(location.can_reach(state) for location in spheres.spheres[2]))
+        self.assertFalse(self.multiworld.has_beaten_game(state))
+        self.assertTrue(self.multiworld.has_beaten_game(spheres.state))
+
+    def test_results_match_fresh_state(self) -> None:
+        """Tests that cached results match the results of sweeping a supplied state"""
+        self.assertEqual(self.multiworld.fulfills_accessibility(),
+                         self.multiworld.fulfills_accessibility(CollectionState(self.multiworld)))
+        self.assertEqual(self.multiworld.can_beat_game(), self.multiworld.can_beat_game(CollectionState(self.multiworld)))
+
+    def test_moving_items_invalidates(self) -> None:
+        """Tests that spheres are recomputed once an item is moved or removed"""
+        spheres = self.multiworld.sphere_cache.get_spheres()
+        first = self.multiworld.get_location("player1_chain0_location0", 1)
+        last = self.multiworld.get_location("player1_chain2_location0", 1)
+        first.item, last.item = last.item, first.item
+        new_spheres = self.multiworld.sphere_cache.get_spheres()
+        self.assertIsNot(new_spheres, spheres)
+        self.assertTrue(new_spheres.unreachable)
+        self.assertFalse(self.multiworld.can_beat_game())
+        with self.assertLogs(level="WARNING"):
+            self.assertFalse(self.multiworld.fulfills_accessibility())
+
+    def test_accessibility_skips_unrequired_items(self) -> None:
+        """
+        Tests that the accessibility check only collects the items of locations it has to check,
+        even if the world counts items that aren't progression
+        """
+        world = self.multiworld.worlds[1]
+        world.options.accessibility.value = Accessibility.option_minimal
+        world.collect_item = lambda state, item, remove=False: item.name
+        menu = self.multiworld.get_region("Menu", 1)
+        filler_location, gated_location = generate_locations(2, 1, menu, None, "_gated")
+        filler_location.place_locked_item(Item("Filler", ItemClassification.filler, None, 1))
+        gated_location.place_locked_item(Item("Gated", ItemClassification.progression, None, 2))
+        set_rule(gated_location, lambda state: state.has("Filler", 1))
+        self.assertTrue(self.multiworld.can_beat_game())
+        with self.assertLogs(level="WARNING"):
+            self.assertFalse(self.multiworld.fulfills_accessibility())
+        self.assertNotIn(gated_location, self.multiworld.sphere_cache.get_spheres().unreachable)
+
+    def test_changing_yielded_sphere(self) -> None:
+        """Tests that get_spheres continues like an uncached sweep if the caller changes the sphere it was given"""
+        demoted = []
+        spheres = []
+        for sphere in self.multiworld.get_spheres():
+            spheres.append(sphere)
+            if len(spheres) > 1:
+                continue
+            for location in sphere:
+                if location.player == 1 and location.item.advancement:
+                    location.item.classification = ItemClassification.filler
+                    demoted.append(location)
+        # player 1's chain can't be walked anymore, so its remaining locations are unreachable
+        self.assertEqual(len(demoted), 1)
+        self.assertEqual(len(spheres), 5)
+        self.assertEqual(spheres[-2], set())
+        self.assertTrue(all(location.player == 1 for location in spheres[-1]))
+        self.assertFalse(self.multiworld.can_beat_game())
+
+
+class TestPlaythroughCulling(unittest.TestCase):
+    def test_playthrough_is_minimal(self) -> None:
+        """Tests that the playthrough keeps the required items and drops the rest"""
+        multiworld = generate_chain_multiworld(players=2, length=3)
+        extra_items: List[Item] = []
+        for player in multiworld.player_ids:
+            location = generate_locations(1, player, multiworld.get_region("Menu", player), None, "_extra")[0]
+            item = Item(f"player{player}_extra_item", ItemClassification.progression, None, player)
+            location.place_locked_item(item)
+            extra_items.append(item)
+        multiworld.spoiler.create_playthrough(create_paths=False)
+        playthrough = multiworld.spoiler.playthrough
+        self.assertEqual(len(playthrough), 4)
+        self.assertEqual(sum(len(sphere) for sphere in playthrough.values()), 6)
+        self.assertFalse(any(str(item) in sphere.values() for item in extra_items
+                             for sphere in playthrough.values() if isinstance(sphere, dict)))
+        # the culled items got put back afterwards
+        self.assertTrue(all(item.location.item is item for item in extra_items))
+
+    def test_culling_sweep_matches_can_beat_game(self) -> None:
+        """Tests that the sweep used for culling agrees with can_beat_game when removing each progression item"""
+        multiworld = setup_solo_multiworld(AutoWorldRegister.world_types["Timespinner"])
+        distribute_items_restrictive(multiworld)
+        locations = [location for location in multiworld.get_filled_locations() if location.item.advancement]
+        for location in locations:
+            with self.subTest(location=location.name):
+                item = location.item
+                location.item = None
+                self.assertEqual(
+                    multiworld.spoiler._can_beat_game_from(CollectionState(multiworld), locations),
+                    multiworld.can_beat_game(CollectionState(multiworld)))
+                location.item = item
@@ -0,0 +1,77 @@
+import unittest
+
+from BaseClasses import MultiWorld
+from Validation import ValidationError, ValidationLevel, validate_placements
+from worlds.AutoWorld import call_all
+from . import generate_items, generate_locations, generate_test_multiworld
+
+
+class TestValidation(unittest.TestCase):
+    multiworld: MultiWorld
+
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(2)
+
+    def add_items_in_stage(self, *items_per_player) -> None:
+        """Runs a stage in which each player adds their list of items to the item pool"""
+        for player, items in enumerate(items_per_player, 1):
+            setattr(self.multiworld.worlds[player], "create_items",
+                    lambda items=items: self.multiworld.itempool.extend(items))
+        call_all(self.multiworld, "create_items")
+
+    def test_level_from_text(self) -> None:
+        self.assertEqual(ValidationLevel.from_any("Exhaustive"), ValidationLevel.exhaustive)
+        self.assertEqual(ValidationLevel.from_any(0), ValidationLevel.off)
+        with self.assertRaises(ValueError):
+            ValidationLevel.from_any("thorough")
+
+    def test_duplicate_item_reference(self) -> None:
+        """Tests that a world adding the same item twice in one step is caught unless validation is off"""
+        item = generate_items(1, 1)[0]
+        for level in (ValidationLevel.cheap, ValidationLevel.exhaustive):
+            with self.subTest(level=level.name):
+                self.multiworld.validation = level
+                self.multiworld.itempool.clear()
+                with self.assertRaises(ValidationError):
+                    self.add_items_in_stage([item, item], [])
+        self.multiworld.validation = ValidationLevel.off
+        self.multiworld.itempool.clear()
+        self.add_items_in_stage([item, item], [])
+        self.assertEqual(len(self.multiworld.itempool), 2)
+
+    def test_item_reused_across_players(self) -> None:
+        """Tests that only exhaustive validation catches an item added again by a later world"""
+        item = generate_items(1, 1)[0]
+        self.multiworld.validation = ValidationLevel.cheap
+        self.add_items_in_stage([item], [item])
+        self.multiworld.validation = ValidationLevel.exhaustive
+        self.multiworld.itempool.clear()
+        with self.assertRaises(ValidationError):
+            self.add_items_in_stage([item], [item])
+
+    def test_item_reused_in_start_inventory(self) -> None:
+        """Tests that exhaustive validation catches an item in both the item pool and a start inventory"""
+        self.multiworld.validation = ValidationLevel.exhaustive
+        item = generate_items(1, 1)[0]
+        setattr(self.multiworld.worlds[1], "create_items", lambda: self.multiworld.itempool.append(item))
+        setattr(self.multiworld.worlds[2], "create_items", lambda: self.multiworld.push_precollected(item))
+        with self.assertRaisesRegex(ValidationError, "start inventory"):
+            call_all(self.multiworld, "create_items")
+
+    def test_placements(self) -> None:
+        """Tests the checks of filled locations before they get written to multidata"""
+        region = self.multiworld.get_region("Menu", 1)
+        locations = generate_locations(2, 1, region, 1)
+        for location, item in zip(locations, generate_items(2, 1, code=1)):
+            location.place_locked_item(item)
+        self.multiworld.validation = ValidationLevel.off
+        validate_placements(self.multiworld)
+        self.multiworld.validation = ValidationLevel.cheap
+        with self.assertRaisesRegex(ValidationError, "duplicate address"):
+            validate_placements(self.multiworld)
+
+        locations[1].address = 2
+        validate_placements(self.multiworld)
+        locations[1].item.code = None
+        with self.assertRaisesRegex(ValidationError, "item code None"):
+            validate_placements(self.multiworld)
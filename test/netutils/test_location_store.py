@@ -3,6 +3,7 @@ import os
 import typing
 import unittest
 import warnings
+from Multidata import LocationColumns, dump_multidata, load_multidata
 from NetUtils import LocationStore, _LocationStore
 
 State = typing.Dict[typing.Tuple[int, int], typing.Set[int]]
@@ -45,6 +46,11 @@ one_state: State = {
 }
 
 
+def load_columns(locations: RawLocations) -> LocationColumns:
+    """Returns the locations as read from a multidata of the current format."""
+    return load_multidata(dump_multidata({"locations": locations}, 4))["locations"]
+
+
 class Base:
     class TestLocationStore(unittest.TestCase):
         """Test method calls on a loaded store."""
@@ -298,3 +304,53 @@ class TestSpeedupsLocationStoreConstructor(Base.TestLocationStoreConstructor):
             self.type({
                 1: {1: None},
             })
+
+
+class TestPurePythonLocationStoreColumns(Base.TestLocationStore):
+    """Run base method tests for the pure python implementation loaded from multidata columns."""
+    def setUp(self) -> None:
+        self.store = _LocationStore(load_columns(sample_data))
+        super().setUp()
+
+
+class TestPurePythonLocationStoreColumnsConstructor(Base.TestLocationStoreConstructor):
+    """Run base constructor tests for the pure python implementation loaded from multidata columns."""
+    def setUp(self) -> None:
+        self.type = lambda locations: _LocationStore(load_columns(locations))
+        super().setUp()
+
+
+@unittest.skipIf(LocationStore is _LocationStore and not ci, "_speedups not available")
+class TestSpeedupsLocationStoreColumns(Base.TestLocationStore):
+    """Run base method tests for cython implementation loaded from multidata columns."""
+    def setUp(self) -> None:
+        self.assertFalse(LocationStore is _LocationStore, "Failed to load _speedups")
+        self.store = LocationStore(load_columns(sample_data))
+        super().setUp()
+
+
+@unittest.skipIf(LocationStore is _LocationStore and not ci, "_speedups not available")
+class TestSpeedupsLocationStoreColumnsConstructor(Base.TestLocationStoreConstructor):
+    """Run base constructor tests and tests the column constraints for cython implementation."""
+    def setUp(self) -> None:
+        self.assertFalse(LocationStore is _LocationStore, "Failed to load _speedups")
+        self.type = lambda locations: LocationStore(load_columns(locations))
+        super().setUp()
+
+    def test_unsorted(self) -> None:
+        columns = LocationColumns.from_dict(sample_data).columns
+        columns[2][0], columns[2][1] = columns[2][1], columns[2][0]
+        with self.assertRaises(ValueError):
+            LocationStore(LocationColumns(columns))
+
+    def test_sender_out_of_range(self) -> None:
+        columns = LocationColumns.from_dict(sample_data).columns
+        columns[1][-1] = 6
+        with self.assertRaises(ValueError):
+            LocationStore(LocationColumns(columns))
+
+    def test_length_mismatch(self) -> None:
+        columns = LocationColumns.from_dict(sample_data).columns
+        columns[5].pop()
+        with self.assertRaises(ValueError):
+            LocationStore(LocationColumns(columns))
@@ -1,5 +1,6 @@
 # Tests for Generate.py (ArchipelagoGenerate.exe)
 
+import json
 import unittest
 import os
 import os.path
@@ -10,6 +11,8 @@ from tempfile import TemporaryDirectory
 
 import Generate
 import Main
+from Portfolio import derive_fill_seed, placement_digest
+from RuleProfiler import ProfiledRule
 
 
 class TestGenerateMain(unittest.TestCase):
@@ -72,6 +75,113 @@ class TestGenerateMain(unittest.TestCase):
 
         self.assertOutput(self.output_tempdir.name)
 
+    def test_generate_profile_rules(self):
+        sys.argv = [sys.argv[0], '--seed', '0',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name,
+                    '--profile_rules']
+        print(f'Testing Generate.py {sys.argv} in {os.getcwd()}')
+        multiworld = Main.main(*Generate.main())
+
+        self.assertOutput(self.output_tempdir.name)
+        output_path = Path(self.output_tempdir.name)
+        with open(output_path / f"AP_{multiworld.seed_name}_rule_profile.json", encoding="utf-8") as f:
+            report = json.load(f)
+        self.assertTrue((output_path / f"AP_{multiworld.seed_name}_rule_profile.txt").exists())
+        self.assertEqual([stage["stage"] for stage in report["stages"]],
+                         ["pre_fill", "fill", "post_fill", "balancing", "output"])
+        self.assertTrue(report["rules"])
+        self.assertEqual(report["calls"], sum(rule["calls"] for rule in report["rules"]))
+        # the rules are restored afterwards
+        self.assertFalse(any(isinstance(location.access_rule, ProfiledRule)
+                             for location in multiworld.get_locations()))
+
+    def test_generate_stage_report(self):
+        sys.argv = [sys.argv[0], '--seed', '0',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name,
+                    '--stage_report']
+        print(f'Testing Generate.py {sys.argv} in {os.getcwd()}')
+        multiworld = Main.main(*Generate.main())
+
+        self.assertOutput(self.output_tempdir.name)
+        with open(Path(self.output_tempdir.name) / f"AP_{multiworld.seed_name}_stage_report.json",
+                  encoding="utf-8") as f:
+            report = json.load(f)
+        stages = [stage["name"] for stage in report["stages"] if stage["parent"] is None]
+        # balancing is skipped for a single player
+        self.assertEqual(stages, ["generate_early", "create_regions", "create_items", "set_rules", "connect_entrances",
+                                  "generate_basic", "plando", "pre_fill", "fill", "post_fill", "output",
+                                  "playthrough", "spoiler", "zip"])
+        fill_steps = [stage["name"] for stage in report["stages"] if stage["parent"] == "fill"]
+        self.assertIn("fill_progression", fill_steps)
+        self.assertIn("fill_remaining", fill_steps)
+        output_tasks = {stage["name"] for stage in report["stages"] if stage["parent"] == "output"}
+        self.assertTrue({"fulfills_accessibility", "write_multidata"} <= output_tasks)
+        for stage in report["stages"]:
+            self.assertGreaterEqual(stage["wall"], 0)
+            self.assertGreaterEqual(stage["cpu"], 0)
+        for player in multiworld.player_ids:
+            self.assertIn(("create_regions", multiworld.game[player]),
+                          {(call["method"], call["game"]) for call in report["worlds"] if call["player"] == player})
+
+    def test_generate_portfolio(self):
+        sys.argv = [sys.argv[0], '--seed', '0',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name,
+                    '--portfolio', '2']
+        print(f'Testing Generate.py {sys.argv} in {os.getcwd()}')
+        multiworld = Main.main(*Generate.main())
+
+        self.assertOutput(self.output_tempdir.name)
+        self.assertIn(multiworld.fill_seed, (None, derive_fill_seed(0, 1)))
+
+    def test_generate_checkpoint(self):
+        sys.argv = [sys.argv[0], '--seed', '0',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name,
+                    '--checkpoint', 'pre_fill']
+        print(f'Testing Generate.py {sys.argv} in {os.getcwd()}')
+        multiworld = Main.main(*Generate.main())
+        checkpoint_path = Path(self.output_tempdir.name) / f"AP_{multiworld.seed_name}_pre_fill.checkpoint"
+        self.assertTrue(checkpoint_path.exists())
+
+        # resuming continues with the same random state
+        sys.argv = [sys.argv[0], '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name,
+                    '--resume', str(checkpoint_path)]
+        print(f'Testing Generate.py {sys.argv} in {os.getcwd()}')
+        resumed_multiworld = Main.main(*Generate.main())
+
+        self.assertOutput(self.output_tempdir.name)
+        self.assertEqual(resumed_multiworld.seed_name, multiworld.seed_name)
+        self.assertEqual(placement_digest(resumed_multiworld), placement_digest(multiworld))
+
+    def test_generate_yaml_workers(self):
+        """Tests that rolling in processes doesn't depend on their number and that cached yaml roll the same"""
+        cache_dir = TemporaryDirectory(prefix="AP_cache_")
+        original_cache_path = getattr(Generate.Utils.cache_path, "cached_path", None)
+        Generate.Utils.cache_path.cached_path = cache_dir.name
+        results = []
+        try:
+            for workers, cache in (("1", "--no-yaml_cache"), ("2", "--yaml_cache"), ("2", "--yaml_cache")):
+                sys.argv = [sys.argv[0], "--seed", "0", "--player_files_path", str(self.abs_input_dir),
+                            "--yaml_workers", workers, cache]
+                namespace, seed = Generate.main()
+                results.append({player: (namespace.game[player], namespace.name[player],
+                                         namespace.accessibility[player].value,
+                                         namespace.progression_balancing[player].value)
+                                 for player in range(1, namespace.multi + 1)})
+            self.assertTrue(os.listdir(os.path.join(cache_dir.name, "yaml")))
+        finally:
+            if original_cache_path is None:
+                del Generate.Utils.cache_path.cached_path
+            else:
+                Generate.Utils.cache_path.cached_path = original_cache_path
+            cache_dir.cleanup()
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0], results[2])
+
     def test_generate_yaml(self):
         # override host.yaml
         from settings import get_settings
@@ -108,6 +218,10 @@ class TestGenerateWeights(TestGenerateMain):
     # don't need to run these tests
     test_generate_absolute = None
     test_generate_relative = None
+    test_generate_profile_rules = None
+    test_generate_stage_report = None
+    test_generate_portfolio = None
+    test_generate_checkpoint = None
 
     def test_generate_yaml(self):
         from settings import get_settings
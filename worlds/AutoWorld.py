@@ -12,6 +12,7 @@ from typing import (Any, Callable, ClassVar, Dict, FrozenSet, Iterable, List, Ma
 
 from Options import item_and_loc_options, ItemsAccessibility, OptionGroup, PerGameCommonOptions
 from BaseClasses import CollectionState
+from Validation import NewItemValidation
 
 if TYPE_CHECKING:
     from BaseClasses import MultiWorld, Item, Location, Tutorial, Region, Entrance
@@ -148,10 +149,15 @@ class WebWorldRegister(type):
 
 
 def _timed_call(method: Callable[..., Any], *args: Any,
-                multiworld: Optional["MultiWorld"] = None, player: Optional[int] = None) -> Any:
+                multiworld: Optional["MultiWorld"] = None, player: Optional[int] = None,
+                game: Optional[str] = None) -> Any:
     start = time.perf_counter()
+    start_cpu = time.thread_time()
     ret = method(*args)
     taken = time.perf_counter() - start
+    if multiworld and multiworld.stage_report:
+        multiworld.stage_report.record_world_call(game or multiworld.game[player], player or 0, method.__name__,
+                                                  taken, time.thread_time() - start_cpu)
     if taken > 1.0:
         if player and multiworld:
             perf_logger.info(f"Took {taken:.4f} seconds in {method.__qualname__} for player {player}, "
@@ -178,19 +184,19 @@ def call_single(multiworld: "MultiWorld", method_name: str, player: int, *args:
 
 def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     world_types: Set[AutoWorldRegister] = set()
+    validation = NewItemValidation(multiworld) if multiworld.validation else None
     for player in multiworld.player_ids:
         prev_item_count = len(multiworld.itempool)
         world_types.add(multiworld.worlds[player].__class__)
         call_single(multiworld, method_name, player, *args)
-        if __debug__:
-            new_items = multiworld.itempool[prev_item_count:]
-            for i, item in enumerate(new_items):
-                for other in new_items[i+1:]:
-                    assert item is not other, (
-                        f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
-                        f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+        if validation:
+            validation.validate_step(player, multiworld.itempool[prev_item_count:])
+    if validation:
+        validation.finish()
 
     call_stage(multiworld, method_name, *args)
+    # worlds may change logic in any step, e.g. after looking at the spheres of the placement in post_fill
+    multiworld.sphere_cache.invalidate()
 
 
 def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
@@ -198,7 +204,7 @@ def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     for world_type in sorted(world_types, key=lambda world: world.__name__):
         stage_callable = getattr(world_type, f"stage_{method_name}", None)
         if stage_callable:
-            _timed_call(stage_callable, multiworld, *args)
+            _timed_call(stage_callable, multiworld, *args, multiworld=multiworld, game=world_type.game)
 
 
 class WebWorld(metaclass=WebWorldRegister):
@@ -303,6 +309,23 @@ class World(metaclass=AutoWorldRegister):
     If False, everything is rechecked at every step, which is slower computationally, 
     but may be desirable in complex/dynamic worlds."""
 
+    track_rule_dependencies: bool = False
+    """If True, CollectionState records which items and regions the access rule of a blocked Entrance read,
+    and only retries that Entrance once one of those changed. Indirect conditions are then not needed.
+    Requires access rules to only read state through its item methods, prog_items and can_reach of the same player;
+    anything else, such as another player's items, is treated as unknown and gets retried on every update."""
+
+    read_only_rules: ClassVar[bool] = False
+    """If True, the location rules of this world only read the CollectionState, without storing caches or anything
+    else on it or on the world, so ParallelReach may check them in threads sharing the state on free-threaded
+    Python builds."""
+
+    output_process_attributes: ClassVar[Optional[Tuple[str, ...]]] = None
+    """If not None, generate_output may run in a worker process forked after fill, see OutputProcesses.py.
+    The attributes named here are copied back to the world afterwards, as are threading.Events of the world that
+    got set.
+    Leave None if generate_output changes anything else that later steps, like fill_slot_data, rely on."""
+
     multiworld: "MultiWorld"
     """autoset on creation. The MultiWorld object for the currently generating multiworld."""
     player: int
@@ -43,6 +43,7 @@ class DOOM1993World(World):
     game = "DOOM 1993"
     web = DOOM1993Web()
     required_client_version = (0, 3, 9)
+    read_only_rules = True  # rules only check for items
 
     item_name_to_id = {data["name"]: item_id for item_id, data in Items.item_table.items()}
     item_name_groups = Items.item_name_groups
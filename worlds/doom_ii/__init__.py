@@ -44,6 +44,7 @@ class DOOM2World(World):
     game = "DOOM II"
     web = DOOM2Web()
     required_client_version = (0, 3, 9)
+    read_only_rules = True  # rules only check for items
 
     item_name_to_id = {data["name"]: item_id for item_id, data in Items.item_table.items()}
     item_name_groups = Items.item_name_groups
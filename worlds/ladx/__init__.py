@@ -92,6 +92,7 @@ class LinksAwakeningWorld(World):
     options: LinksAwakeningOptions
     settings: typing.ClassVar[LinksAwakeningSettings]
     topology_present = True  # show path to required location checks in spoiler
+    output_process_attributes = ()
 
     # ID of first item and location, could be hard-coded but code may be easier
     # to read with this as a propery.
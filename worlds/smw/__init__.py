@@ -64,6 +64,7 @@ class SMWWorld(World):
 
     topology_present = False
     required_client_version = (0, 4, 5)
+    output_process_attributes = ("rom_name",)
 
     item_name_to_id = {name: data.code for name, data in item_table.items()}
     location_name_to_id = all_locations
@@ -51,6 +51,7 @@ class YoshisIslandWorld(World):
     game = "Yoshi's Island"
     option_definitions = YoshisIslandOptions
     required_client_version = (0, 4, 4)
+    output_process_attributes = ("rom_name",)
 
     item_name_to_id = {item: item_table[item].code for item in item_table}
     location_name_to_id = {location.name: location.code for location in get_locations(None)}